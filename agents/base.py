@@ -1,23 +1,151 @@
-from core.llm import generate
-from memory.memory import save_agent_memory, load_agent_memory
+from core.llm import generate, LLMSession, deadline, current_deadline, stream_tokens
+from memory.memory import queue_agent_memory, load_agent_memory
 from core.logger import get_logger
-from core.timer import Timer
+from core.timer import Timer, profiler
 from core.clean_output import remove_think_tags
-from prompts.prompt_loader import load_prompt
+from prompts.prompt_loader import load_prompt, read_prompt_file
 from core.agent_config import load_agent_config
 from tools.classifier import classify_task
-from core.task import Task, TaskMapping, TaskDifficulty
+from core.task import Priority, Task, TaskMapping, TaskDifficulty
+from memory.vector_store import VectorStore
+from core.caste import Caste, get_caste_traits
+from core.tracing import tracer
+from core.registry import freeze
+from core.prompt_builder import PromptBuilder, budget_for, count_tokens
+from core.scheduler import TaskShed, scheduled
+from core.logger import TaggedLogger
+from collections import deque
+import contextvars
+import json
+import os
+import queue
+import threading
+import weakref
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from contextlib import contextmanager, nullcontext
+from typing import Iterable, Iterator, TYPE_CHECKING
 from uuid import uuid4
 import time
 
-from core.llm import generate
-from memory.memory import save_agent_memory, load_agent_memory
-from core.logger import get_logger
-from core.timer import Timer
-from core.clean_output import remove_think_tags
-from prompts.prompt_loader import load_prompt, read_prompt_file
-from core.agent_config import load_agent_config
-from concurrent.futures import ThreadPoolExecutor, as_completed
+if TYPE_CHECKING:
+    from tools.document_parser import Chunk
+
+DEFAULT_REUSE_THRESHOLD = 0.8
+# Seconds a subtask attempt may run before it is handed to another agent; 0 disables the lease
+QUEEN_SUBTASK_LEASE = float(os.getenv("QUEEN_SUBTASK_LEASE", "300"))
+QUEEN_MAX_REASSIGNMENTS = int(os.getenv("QUEEN_MAX_REASSIGNMENTS", "2"))
+
+# Guards the busy flag of every agent, so claiming an agent for a task is atomic
+_claim_lock = threading.Lock()
+# Receives the assignment events of the subtask run in the current context
+_event_sink = contextvars.ContextVar("subtask_events", default=None)
+
+
+@contextmanager
+def _subtask_events(emit):
+    token = _event_sink.set(emit)
+    try:
+        yield
+    finally:
+        _event_sink.reset(token)
+
+
+def _notify(event: str, **fields):
+    emit = _event_sink.get()
+    if emit is not None:
+        emit(event, **fields)
+
+
+class AgentBusy(RuntimeError):
+    """Raised by Agent.think when the agent is already running another task."""
+
+
+class ReuseStats:
+    """Counters for semantic response reuse of a single agent.
+
+    Latency saved is estimated against the agent's average full generation time,
+    so it only becomes meaningful after the agent has generated at least once.
+    """
+    def __init__(self):
+        self.lookups = 0
+        self.hits = 0               # Stored response returned as is
+        self.hinted = 0             # Stored response passed as a hint to a cheaper model
+        self.generations = 0        # Full generations
+        self.generation_time = 0.0
+        self.saved_time = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of lookups that were served from memory (returned or hinted)."""
+        return (self.hits + self.hinted) / self.lookups if self.lookups else 0.0
+
+    @property
+    def avg_generation_time(self) -> float:
+        """Average seconds per full generation."""
+        return self.generation_time / self.generations if self.generations else 0.0
+
+    def record_generation(self, elapsed: float):
+        self.generations += 1
+        self.generation_time += elapsed
+
+    def record_reuse(self, elapsed: float, hinted: bool = False):
+        if hinted:
+            self.hinted += 1
+        else:
+            self.hits += 1
+        if self.generations:
+            self.saved_time += self.avg_generation_time - elapsed
+
+    def as_dict(self) -> dict:
+        return {
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hinted": self.hinted,
+            "hit_rate": round(self.hit_rate, 4),
+            "saved_seconds": round(self.saved_time, 3),
+        }
+
+    def __str__(self):
+        return (f"lookups={self.lookups} hits={self.hits} hinted={self.hinted} "
+                f"hit_rate={self.hit_rate:.0%} saved~{self.saved_time:.2f}s")
+
+
+class AgentProfile:
+    """Role-level agent state shared by every agent with the same role and configuration.
+
+    Profiles are interned, so a swarm of identical minors holds one copy of
+    their role, task type and (frozen) configs instead of one per agent.
+    """
+    __slots__ = ("role", "task_type", "llm_config", "reuse_config", "persistent", "history", "__weakref__")
+
+    def __init__(self, role: str, config):
+        self.role = role or config.get("role", "assistant")
+        self.task_type = config.get("task_type", "generic")
+        self.llm_config = config.get("llm") or freeze({})
+        self.reuse_config = config.get("reuse") or freeze({})
+        traits = get_caste_traits(self.llm_config.get("caste", Caste.MINOR.value))
+        self.persistent = traits["memory"]
+        self.history = traits["history"]
+
+    def to_config(self) -> dict:
+        """Return a plain configuration dict that recreates this profile."""
+        return json.loads(json.dumps(
+            {"task_type": self.task_type, "llm": self.llm_config, "reuse": self.reuse_config}, default=dict
+        ))
+
+
+_profiles = weakref.WeakValueDictionary()   # (role, config key) -> AgentProfile
+_profiles_lock = threading.Lock()
+
+def get_profile(role: str, config) -> AgentProfile:
+    """Return the shared profile for a role and configuration, creating it if needed."""
+    config = freeze(config)
+    key = (role, json.dumps(config, sort_keys=True, default=dict))
+    with _profiles_lock:
+        profile = _profiles.get(key)
+        if profile is None:
+            profile = _profiles[key] = AgentProfile(role, config)
+    return profile
 
 
 class Agent:
@@ -26,29 +154,158 @@ class Agent:
     This class provides the core functionality for an agent, including initialization,
     thinking capabilities, and memory management.
     """
-    def __init__(self, name: str, role: str = "assistant", config: dict = None):
+    __slots__ = ("name", "busy", "timer", "spawned", "_profile", "_id", "_memory", "_logger",
+                 "_reuse_stats", "_reuse_index", "_llm_session")
+    _logger_name = "agent"
+
+    def __init__(self, name: str, role: str = "assistant", config: dict = None, spawned: bool = False):
         """Initialize a new Agent instance.
 
         Args:
             name (str): The name of the agent
             role (str, optional): The role of the agent. Defaults to "assistant".
             config (dict, optional): Optional configuration dictionary. If not provided, it will be loaded.
+            spawned (bool, optional): Whether the agent is a throwaway specialist spawned by the Queen.
+                Spawned agents share one logger instead of registering their own. Defaults to False.
 
         Note:
             Loads agent configuration, system prompt, and memory from storage.
+            Memory retention follows the caste traits: castes without `memory`
+            never touch the disk, and castes with a `history` limit keep only
+            their latest tasks in a ring buffer. Older tasks of persistent
+            castes move to the cold archive, so their history on disk is complete.
+
+            Agents are kept small so a swarm can hold very many idle ones: the
+            role-level state lives in a shared AgentProfile, the system prompt
+            comes from the shared registry, and the id, logger and memory are
+            only created when first used.
+        """
+        self._init_state(name, get_profile(role, config or load_agent_config(name)), spawned)
+
+    @classmethod
+    def from_profile(cls, name: str, profile: AgentProfile, spawned: bool = False) -> "Agent":
+        """Create an agent from an existing profile without loading any configuration.
+
+        Args:
+            name (str): The name of the agent
+            profile (AgentProfile): The shared role-level state
+            spawned (bool, optional): Whether the agent is a spawned specialist. Defaults to False.
+
+        Returns:
+            Agent: The new agent
         """
-        self.id = str(uuid4())
+        agent = cls.__new__(cls)
+        agent._init_state(name, profile, spawned)
+        return agent
+
+    def _init_state(self, name: str, profile: AgentProfile, spawned: bool):
         self.name = name
-        self.system_prompt = load_prompt(name)
-        config = config or load_agent_config(name)
-        self.role = role or config.get("role", "assistant")
-        self.task_type = config.get("task_type", "generic")     # Agent's task's type which it can handle
-        self.llm_config = config.get("llm", {})     # Agent's LLM configuration representing its general settings
-        self.memory = load_agent_memory(name)   # Agent's memory
-        self.logger = get_logger("agent", agent_name=name)
+        self._profile = profile
         self.busy = False   # Indicates if the agent is currently processing a task
         self.timer = None   # Timer for task processing performance measurement
-        
+        self.spawned = spawned
+        self._id = None
+        self._memory = None
+        self._logger = None
+        self._reuse_stats = None
+        self._reuse_index = None    # Similarity index over memory, built on first lookup
+        self._llm_session = None
+
+    @property
+    def id(self) -> str:
+        """Unique agent id, generated on first access."""
+        if self._id is None:
+            self._id = str(uuid4())
+        return self._id
+
+    @property
+    def role(self) -> str:
+        return self._profile.role
+
+    @role.setter
+    def role(self, value: str):
+        self._reconfigure(role=value)
+
+    @property
+    def task_type(self) -> str:
+        """Agent's task's type which it can handle."""
+        return self._profile.task_type
+
+    @task_type.setter
+    def task_type(self, value: str):
+        self._reconfigure(task_type=value)
+
+    @property
+    def llm_config(self):
+        """Agent's LLM configuration representing its general settings."""
+        return self._profile.llm_config
+
+    @llm_config.setter
+    def llm_config(self, value: dict):
+        self._reconfigure(llm=value)
+
+    @property
+    def reuse_config(self):
+        """Opt-in reuse of answers to near-duplicate tasks."""
+        return self._profile.reuse_config
+
+    @reuse_config.setter
+    def reuse_config(self, value: dict):
+        self._reconfigure(reuse=value)
+
+    def _reconfigure(self, role: str = None, **config):
+        """Move the agent to the shared profile with some settings changed.
+
+        Profiles are shared and frozen, so role-level settings cannot be edited
+        in place; assigning `role`, `task_type`, `llm_config` or `reuse_config`
+        switches this agent alone to a profile with the new value.
+        """
+        self._profile = get_profile(role or self._profile.role, {**self._profile.to_config(), **config})
+
+    @property
+    def persistent(self) -> bool:
+        """Whether the agent's memory is saved to disk."""
+        return self._profile.persistent
+
+    @property
+    def memory(self):
+        """Agent's memory, loaded from storage on first access."""
+        if self._memory is None:
+            self._memory = self._working_set(load_agent_memory(self.name) if self.persistent else [])
+        return self._memory
+
+    @memory.setter
+    def memory(self, value):
+        self._memory = value
+
+    @property
+    def logger(self):
+        """Agent's logger, created on first use. Spawned agents share one tagged logger."""
+        if self._logger is None:
+            if self.spawned:
+                self._logger = TaggedLogger(get_logger(self._logger_name, agent_name="spawned"), {"tag": self.name})
+            else:
+                self._logger = get_logger(self._logger_name, agent_name=self.name)
+        return self._logger
+
+    @property
+    def reuse_stats(self) -> "ReuseStats":
+        if self._reuse_stats is None:
+            self._reuse_stats = ReuseStats()
+        return self._reuse_stats
+
+    @property
+    def llm_session(self) -> LLMSession:
+        """Keep-alive and accounting of the agent's backend calls, which reuse its evaluated system prompt."""
+        if self._llm_session is None:
+            self._llm_session = LLMSession()
+        return self._llm_session
+
+    @property
+    def system_prompt(self) -> str:
+        """The agent's system prompt, served from the shared registry so edits apply without a restart."""
+        return load_prompt(self.name)
+
     def start_timer(self) -> float:
         """Set a timer for the agent's tasks."""
         self.timer = Timer()
@@ -65,7 +322,103 @@ class Agent:
         if isinstance(difficulty, str) and difficulty.upper() in TaskDifficulty.__members__:
             return f"\n\n{TaskDifficulty[difficulty.upper()].value}"
         return ""
-        
+
+    def _find_reusable(self, task: Task) -> dict | None:
+        """Look up the most similar past task in memory.
+
+        Returns:
+            dict | None: The remembered {"task", "response"} record if its similarity
+                reaches the configured threshold, otherwise None.
+        """
+        if not self.reuse_config.get("enabled"):
+            return None
+        self.reuse_stats.lookups += 1
+        matches = self.search_memory(task.content)
+        if not matches:
+            return None
+        score, record = matches[0]
+        threshold = self.reuse_config.get("threshold", DEFAULT_REUSE_THRESHOLD)
+        if score < threshold:
+            self.logger.debug(f"[REUSE] Best match {score:.2f} below threshold {threshold}")
+            return None
+        self.logger.info(f"[REUSE] Similar task found ({score:.2f}): {record['task'][:80]}")
+        return record
+
+    def search_memory(self, text: str, k: int = 1) -> list[tuple[float, dict]]:
+        """Return the k remembered records whose tasks are most similar to a text.
+
+        Args:
+            text (str): Query text
+            k (int, optional): Number of results. Defaults to 1.
+
+        Returns:
+            list[tuple[float, dict]]: (similarity, record) pairs, best first
+        """
+        if self._reuse_index is None:
+            self._reuse_index = VectorStore()
+            for record in self.memory:
+                self._reuse_index.add(record["task"], record)
+        return self._reuse_index.search(text, k=k)
+
+    def _retrieve_context(self, task: Task) -> str:
+        """Passages from the local search index for research tasks, or "" if there is no index."""
+        if self.task_type != "research":
+            return ""
+        from tools.search import SEARCH_CONTEXT_K, get_search_index
+        if SEARCH_CONTEXT_K <= 0:
+            return ""
+        index = get_search_index()
+        if index is None:
+            return ""
+        with tracer.span("search.retrieve") as span, profiler.phase("search.retrieve"):
+            hits = index.search(task.content, k=SEARCH_CONTEXT_K)
+            span.set(hits=len(hits))
+        if not hits:
+            return ""
+        passages = "\n\n".join(f"[{hit.id}] {hit.text}" for hit in hits)
+        return f"Relevant passages from the local library:\n{passages}"
+
+    def _working_set(self, records: list):
+        """Hold records in memory, keeping only the latest `history` ones for bounded castes.
+
+        Older records of persistent agents are handed to the cold archive, so
+        the hot file is only ever rewritten without them once they are sealed.
+        """
+        history = self._profile.history
+        if not history:
+            return records if isinstance(records, list) else list(records)
+        records = list(records)
+        overflow, records = records[:-history], records[-history:]
+        memory = deque(records, maxlen=history)
+        if overflow and self.persistent:
+            queue_agent_memory(self.name, memory, evicted=overflow)
+        return memory
+
+    def replace_memory(self, records: list) -> None:
+        """Replace the agent's memory, e.g. with the one it had on another worker.
+
+        Args:
+            records (list): Memory records, oldest first
+        """
+        self._memory = self._working_set(records)
+        self._reuse_index = None
+        if self.persistent:
+            queue_agent_memory(self.name, self._memory)
+
+    def _remember(self, task: Task, response: str):
+        record = {"task": task.content, "response": response, "ts": time.time()}
+        memory = self.memory
+        evicted = []
+        if isinstance(memory, deque) and len(memory) == memory.maxlen:
+            # Make room a quarter of the buffer at a time, so the reuse index is rebuilt rarely
+            evicted = [memory.popleft() for _ in range(max(1, memory.maxlen // 4))]
+            self._reuse_index = None
+        memory.append(record)
+        if self._reuse_index is not None:
+            self._reuse_index.add(record["task"], record)
+        if self.persistent and queue_agent_memory(self.name, memory, evicted=evicted):
+            self._reuse_index = None    # the oldest entries moved to the cold archive
+
     def think(self, task: Task, system_override: str = None) -> str:
         """Process a task and generate a response.
 
@@ -75,31 +428,79 @@ class Agent:
         Returns:
             str: The agent's response to the task
 
+        Raises:
+            AgentBusy: If the agent is already running another task; an agent runs one at a time
+
         Note:
             This method logs the thinking process, times the execution,
-            cleans the response, saves it to memory, and returns the result.
+            cleans the response, hands it to the write-behind memory buffer,
+            and returns the result.
         """
+        if isinstance(task, str):
+            raise ValueError("Task must be an instance of Task class.")
+        # Spawned specialists come and go, so they are profiled together per task type
+        phase = (profiler.phase("think", agent=f"spawned {self.task_type}" if self.spawned else self.name)
+                 if profiler.enabled else nullcontext())
+        self._claim()
         try:
-            if isinstance(task, str):
-                raise ValueError("Task must be an instance of Task class.")
-            self.logger.info(f"[THINKING] New task: {task.content}")
-            self.busy = True
-            self.start_timer()
+            with tracer.span("think", agent=self.name, task_id=task.id), phase, scheduled(task):
+                self.logger.info(f"[THINKING] New task: {task.content}")
+                self.start_timer()
 
-            extra_instruction = self._append_difficulty_instruction(task.difficulty)
-            full_system_prompt = system_override or (self.system_prompt + extra_instruction)
+                extra_instruction = self._append_difficulty_instruction(task.difficulty)
+                full_system_prompt = system_override or (self.system_prompt + extra_instruction)
 
-            full_response = generate(prompt=task.content, system=full_system_prompt)
-            self.logger.debug(f"[TIMER] Thought in {self.stop_timer():.2f}s")
+                with tracer.span("reuse.lookup"), profiler.phase("reuse.lookup"):
+                    reusable = self._find_reusable(task)
+                if reusable and self.reuse_config.get("mode", "return") == "return":
+                    self.reuse_stats.record_reuse(self.stop_timer())
+                    self.logger.info(f"[REUSE] Returning stored response. {self.reuse_stats}")
+                    return reusable["response"]
 
-            clean_response = remove_think_tags(full_response)
-            self.logger.info(f"[OK] Final response: {clean_response[:80]}...")
-            self.memory.append({"task": task.content, "response": clean_response})
-            save_agent_memory(self.name, self.memory)
-            return clean_response
+                if reusable:
+                    hint_model = self.reuse_config.get("hint_model")
+                    prompt = (
+                        PromptBuilder(model=hint_model, reserved=count_tokens(full_system_prompt), separator="\n\n")
+                        .add(task.content, name="task", priority=1)
+                        .add("An answer to a very similar earlier task is below. "
+                             "Reuse it if it still applies, adjust it if it doesn't.\n"
+                             f"{reusable['response']}", name="hint", shrink="drop")
+                        .build()
+                    )
+                    with tracer.span("llm.generate", hinted=True), profiler.phase("llm.generate"):
+                        full_response = generate(prompt=prompt, system=full_system_prompt, model=hint_model,
+                                                 session=self.llm_session)
+                    self.reuse_stats.record_reuse(self.stop_timer(), hinted=True)
+                    self.logger.info(f"[REUSE] Answered with hint. {self.reuse_stats}")
+                else:
+                    builder = PromptBuilder(reserved=count_tokens(full_system_prompt), separator="\n\n")
+                    context = self._retrieve_context(task)
+                    if context:
+                        builder.add(context, name="context")
+                    prompt = builder.add(task.content, name="task", priority=1).build()
+                    with tracer.span("llm.generate"), profiler.phase("llm.generate"):
+                        full_response = generate(prompt=prompt, system=full_system_prompt,
+                                                 session=self.llm_session)
+                    elapsed = self.stop_timer()
+                    self.reuse_stats.record_generation(elapsed)
+                    self.logger.debug(f"[TIMER] Thought in {elapsed:.2f}s")
+
+                with profiler.phase("clean"):
+                    clean_response = remove_think_tags(full_response)
+                self.logger.info(f"[OK] Final response: {clean_response[:80]}...")
+                with tracer.span("memory.save"), profiler.phase("memory.save"):
+                    self._remember(task, clean_response)
+                return clean_response
         finally:
             self.busy = False
 
+    def _claim(self) -> None:
+        """Mark the agent busy, atomically, or raise AgentBusy if it already is."""
+        with _claim_lock:
+            if self.busy:
+                raise AgentBusy(f"Agent '{self.name}' is busy.")
+            self.busy = True
+
     def can_communicate_with(self, other: "Agent") -> bool:
         """Determine if this agent can communicate with another agent based on caste rules."""
         my_caste = self.llm_config.get("caste", "minor")
@@ -149,27 +550,52 @@ class Queen(Agent):
     """ Queen class representing the highest caste in the agent hierarchy.
     This class is responsible for task classification and delegation to other agents.
     It inherits from the base Agent class and implements specific logic for the Queen agent."""
+    _logger_name = "queen"
     
-    def __init__(self, name="queen", config=None):
+    def __init__(self, name="queen", config=None, prewarm: list[str] = None):
         """Initialize a new Queen instance. Inherits from the Agent class.
         This class is responsible for task classification and delegation to other agents.
         Args:
             name (str): The name of the queen agent.
             config (dict, optional): Optional configuration dictionary. If not provided, it will be loaded.
+            prewarm (list[str], optional): Task types to pre-warm specialists for before returning.
+                Defaults to the POOL_PREWARM setting (every known task type unless set), pre-warmed
+                in the background so the Queen is ready at once.
         """
+        from core.pool import POOL_PREWARM
+
         super().__init__(name=name, config=config)
-        self.logger = get_logger("queen", agent_name=self.name)
-        self.spawned_agents = []
-        self._spawn_limit = 3
+        if prewarm is not None:
+            if prewarm:
+                self.pool.prewarm(prewarm)
+            return
+        prewarm = (TaskMapping().get_all_types() if POOL_PREWARM.strip() == "all"
+                   else [t.strip() for t in POOL_PREWARM.split(",") if t.strip()])
+        if prewarm:
+            threading.Thread(target=self.pool.prewarm, args=(prewarm,), name=f"{name}-prewarm",
+                             daemon=True).start()
+
+    def _init_state(self, name: str, profile: AgentProfile, spawned: bool):
+        super()._init_state(name, profile, spawned)
+        self.subtask_lease = QUEEN_SUBTASK_LEASE
+        self.max_reassignments = QUEEN_MAX_REASSIGNMENTS
+        from core.pool import SpecialistPool
+
+        self.pool = SpecialistPool(self._create_specialist)
+
+    @property
+    def spawned_agents(self) -> list[Agent]:
+        """Specialists currently held by the pool, idle or in use."""
+        return self.pool.agents()
 
     def set_spawn_limit(self, limit: int):
-        """Set the limit for spawning new agents."""
-        self._spawn_limit = limit
-        self.logger.info(f"[SPAWN] Spawn limit set to {self._spawn_limit}")
+        """Set the limit for spawning new agents, per task type."""
+        self.pool.max_size = limit
+        self.logger.info(f"[SPAWN] Spawn limit set to {limit}")
     
     def get_spawn_limit(self) -> int:
-        """Get the current limit for spawning new agents."""
-        return self._spawn_limit
+        """Get the current limit for spawning new agents, per task type."""
+        return self.pool.max_size
         
     def _find_generic_agent(self, agents: list[Agent], task_type: str):
         for agent in agents:
@@ -200,8 +626,9 @@ class Queen(Agent):
             This method relies on the TaskMapping class for task-to-agent type mappings and a helper function `classify_task` for classification logic.
         """
         self.logger.info(f"[DECIDE] Analyzing task type: {task.content}")
-        mapping = TaskMapping().mapping
-        task.type = classify_task(task, mapping)
+        with tracer.span("define_task_type", task_id=task.id), profiler.phase("classify"):
+            mapping = TaskMapping().mapping
+            task.type = classify_task(task, mapping)
         self.logger.info(f"[DECIDE] Classified task as: {task.type}")
         return task.type
 
@@ -222,7 +649,13 @@ class Queen(Agent):
             accepted = agent.receive_task(task.type)
             if accepted.lower() == "accepted":
                 task.assigned_to = agent
-                response = agent.think(task)
+                _notify("assigned", agent=agent.name)
+                try:
+                    response = agent.think(task)
+                except AgentBusy:       # claimed by another caller since the check above
+                    task.assigned_to = None
+                    self.logger.warning(f"[BUSY] Agent {agent.name} is busy.")
+                    return {"executor": None, "output": "Agent is busy."}
                 self.logger.info(f"[ASSIGN] Assigning to {agent.name}")
                 self.logger.debug(f"[ASSIGN] {agent.id} response: {response[:80]}...")
                 return {
@@ -252,20 +685,28 @@ class Queen(Agent):
                 - "output" (str): The response from the agent or an error message if no 
                   agent was available.
         """
-        # Finding the best agent for the task
-        for agent in agents:
-            assignment_result = self.assign_task_to_agent(agent, task)
-            if assignment_result and assignment_result["executor"]:
-                return assignment_result
-
-        # Fallback to generic agent if no exact match found
-        generic_agent = self._find_generic_agent(agents, task.type)
-        if generic_agent:
-            response = generic_agent.think(task)
-            return {"executor": generic_agent, "output": response}
-
-        self.logger.warning(f"[ERROR] No suitable agent found.")
-        return {"executor": None, "output": "No suitable agent available."}
+        with tracer.span("assign_task", task_id=task.id, task_type=task.type) as span, profiler.phase("assign"):
+            # Finding the best agent for the task
+            for agent in agents:
+                assignment_result = self.assign_task_to_agent(agent, task)
+                if assignment_result and assignment_result["executor"]:
+                    span.set(executor=agent.name)
+                    return assignment_result
+
+            # Fallback to generic agent if no exact match found
+            generic_agent = self._find_generic_agent(agents, task.type)
+            if generic_agent:
+                span.set(executor=generic_agent.name, fallback=True)
+                _notify("assigned", agent=generic_agent.name, fallback=True)
+                try:
+                    response = generic_agent.think(task)
+                except AgentBusy:
+                    self.logger.warning(f"[BUSY] Agent {generic_agent.name} is busy.")
+                    return {"executor": None, "output": "Agent is busy."}
+                return {"executor": generic_agent, "output": response}
+
+            self.logger.warning(f"[ERROR] No suitable agent found.")
+            return {"executor": None, "output": "No suitable agent available."}
     
     def split_task(self, task: Task, limit: int) -> list[Task]:
         """
@@ -282,14 +723,18 @@ class Queen(Agent):
             list[Task]: A list of subtasks derived from the main task.
         """
         self.logger.info(f"[PLAN] Splitting task: {task.content} into {limit} subtasks.")
+        system = read_prompt_file("splitter")
         prompt = (
-            "Split the following task into clear and actionable subtasks."
-            f"Limit the number of subtasks to {limit if limit else 1}!\n"
-            "Use 1 line per subtask. Don't include any explanations.\n"
-            f"Task: {task.content}"
+            PromptBuilder(reserved=count_tokens(system), separator="")
+            .add("Split the following task into clear and actionable subtasks."
+                 f"Limit the number of subtasks to {limit if limit else 1}!\n"
+                 "Use 1 line per subtask. Don't include any explanations.\n", shrink="keep")
+            .add(f"Task: {task.content}", name="task")
+            .build()
         )
-        response = generate(prompt=prompt, system=read_prompt_file("splitter"))
-        subtasks = [Task(content=line.strip()) for line in response.splitlines() if line.strip()]
+        with tracer.span("split_task", task_id=task.id, limit=limit), profiler.phase("plan"):
+            response = generate(prompt=prompt, system=system, session=self.llm_session)
+        subtasks = [task.derive(line.strip()) for line in response.splitlines() if line.strip()]
         self.logger.info(f"[PLAN] Subtasks: {[subtask.content for subtask in subtasks]}")
         return subtasks
 
@@ -308,14 +753,19 @@ class Queen(Agent):
             str: Summary text.
         """
         self.logger.info("[SUMMARY] Generating executive summary of all subtasks.")
-        lines = [f"- {output.strip()}" for output in results.values() if output]
-        summary_prompt = (
+        system = "You are an executive assistant summarizer."
+        # Over budget, every result is cut to an equal share instead of losing the last ones
+        builder = PromptBuilder(reserved=count_tokens(system))
+        builder.add(
             "Create a concise executive summary from the following results.\n"
             "Keep it short and informative. Do not change, exagerrate or beautify anything.\n"
-            "Avoid repetition.\n\n" +
-            "\n".join(lines)
+            "Avoid repetition.\n", shrink="keep"
         )
-        response = generate(prompt=summary_prompt, system="You are an executive assistant summarizer.")
+        for i, output in enumerate(output for output in results.values() if output):
+            builder.add(f"- {output.strip()}", name=f"result{i}")
+        summary_prompt = builder.build()
+        with tracer.span("summarize_results_inline", results=len(results)), profiler.phase("summarize"):
+            response = generate(prompt=summary_prompt, system=system, session=self.llm_session)
         self.logger.info(f"[SUMMARY] Completed summary.")
         return remove_think_tags(response)
 
@@ -323,72 +773,271 @@ class Queen(Agent):
         """
         Orchestrate execution of a large task by dividing it and delegating.
 
+        Each subtask attempt runs under a lease of `subtask_lease` seconds. If the
+        agent fails (its backend or worker died) or the lease runs out, the
+        subtask is handed to another agent, up to `max_reassignments` times.
+
         Args:
             task (Task): The main task to process.
             agents (list[Agent]): Available agents.
 
         Returns:
-            dict: A mapping of subtask to result or failure reason.
+            dict: A mapping of subtask to result or failure reason, the summary, and
+                how many times each subtask was reassigned.
         """
-        self.logger.info(f"[EXECUTE] Received high-level task: {task.content}")
-        available_agents = self.get_available_agents(agents)
-        self.logger.info(f"[EXECUTE] Available agents: {len(available_agents)}")
-        subtasks = self.split_task(task, len(available_agents))
-
-        if not available_agents:
-            self.logger.warning("No agents available to process task.")
-            if force:
-                self.spawn_specialist(task.type)
-                self.logger.info(f"[SPAWN] Spawning specialist for task type: {task.type}")
-            else:
-                return {task.content: "[ERROR] No agents available."}
-
-        def process_subtask(index: int, subtask: Task) -> tuple[int, str, str]:
-            subtask.type = self.define_task_type(subtask)
-            subtask.start_time = time.time()
-            result = self.assign_task(subtask, self.get_available_agents(agents))
-            subtask.end_time = time.time()
-            if subtask.start_time is not None and subtask.end_time is not None:
-                subtask.elapsed_time = subtask.end_time - subtask.start_time
-            if result["executor"]:
-                subtask.assign_to(result["executor"].name)
-                return (index, subtask.content, result["output"])
-            elif result["output"] == "Agent is busy.":
-                return (index, subtask.content, "[SKIPPED] Agent busy. Subtask skipped for now.")
-            else:
-                return (index, subtask.content, "[ERROR] No suitable agent found.")
+        for event in self.orchestrate_stream(task, agents, force, tokens=False):
+            if event["event"] == "done":
+                return event["result"]
+
+    def orchestrate_stream(self, task: Task, agents: list[Agent], force: bool = False,
+                           tokens: bool = True) -> Iterator[dict]:
+        """
+        Orchestrate a task like `orchestrate`, yielding progress events as they happen.
+
+        Events are dicts whose "event" key is one of:
+            - "plan": the subtasks were planned ("subtasks": their contents)
+            - "assigned": an agent took subtask "index" ("agent")
+            - "token": a piece of the response to subtask "index" ("text"), as the backend streams it
+            - "reassigned": the agent of subtask "index" failed and it is being handed on ("error")
+            - "subtask_done": subtask "index" finished ("agent", "output", "elapsed")
+            - "summary": the executive summary ("summary")
+            - "done": the last event, with the "result" `orchestrate` returns
+        Every event also carries the "task_id" of the orchestrated task. Subtask
+        events arrive in the order they happen, interleaved across subtasks.
+
+        Closing the iterator early stops the orchestration without waiting for it:
+        subtasks not started yet are cancelled and running ones make no further
+        attempts or reassignments. LLM calls already underway finish in the background.
 
-        with ThreadPoolExecutor(max_workers=len(subtasks)) as executor:
-            futures = [executor.submit(process_subtask, i, task) for i, task in enumerate(subtasks)]
+        Args:
+            task (Task): The main task to process.
+            agents (list[Agent]): Available agents.
+            force (bool, optional): Spawn specialists when no agent is free. Defaults to False.
+            tokens (bool, optional): Stream the subtask responses as "token" events. Defaults to True.
+
+        Returns:
+            Iterator[dict]: The events
+        """
+        events = queue.SimpleQueue()
+        with tracer.span("orchestrate", task_id=task.id, agent=self.name), \
+                profiler.phase("orchestrate", agent=self.name), scheduled(task):
+            self.logger.info(f"[EXECUTE] Received high-level task: {task.content}")
+            available_agents = self.get_available_agents(agents)
+            self.logger.info(f"[EXECUTE] Available agents: {len(available_agents)}")
+            if not available_agents:
+                self.logger.warning("No agents available to process task.")
+                if not force:
+                    yield {"event": "done", "task_id": task.id, "result": {task.content: "[ERROR] No agents available."}}
+                    return
+            subtasks = self.split_task(task, len(available_agents) or self.get_spawn_limit())
+            yield {"event": "plan", "task_id": task.id, "subtasks": [subtask.content for subtask in subtasks]}
+
+            def process_subtask(index: int, subtask: Task) -> tuple[int, str, str]:
+                def emit(event: str, **fields):
+                    events.put({"event": event, "task_id": task.id, "index": index, **fields})
+
+                try:
+                    with tracer.span("subtask", task_id=subtask.id, index=index), profiler.phase("subtask"):
+                        subtask.type = self.define_task_type(subtask)
+                        subtask.start_time = time.time()
+                        with _subtask_events(emit), (stream_tokens(lambda text: emit("token", text=text))
+                                                     if tokens else nullcontext()):
+                            result = self._run_subtask(subtask, agents, force, stop)
+                        subtask.end_time = time.time()
+                    if subtask.start_time is not None and subtask.end_time is not None:
+                        subtask.elapsed_time = subtask.end_time - subtask.start_time
+                    if result["executor"]:
+                        subtask.assign_to(result["executor"].name)
+                        output = result["output"]
+                    elif result["output"] == "Agent is busy.":
+                        output = "[SKIPPED] Agent busy. Subtask skipped for now."
+                    elif result["output"].startswith("[ERROR]"):
+                        output = result["output"]
+                    else:
+                        output = "[ERROR] No suitable agent found."
+                    emit("subtask_done", subtask=subtask.content, output=output,
+                         agent=result["executor"].name if result["executor"] else None,
+                         elapsed=round(subtask.elapsed_time, 3))
+                    return (index, subtask.content, output)
+                finally:
+                    events.put(None)    # this subtask will not emit anything else
+
+            stop = threading.Event()    # set when the consumer stops reading
+            executor = ThreadPoolExecutor(max_workers=len(subtasks))
+            try:
+                # Each subtask runs in a copy of this context, so spans and request deadlines follow it
+                futures = [executor.submit(contextvars.copy_context().run, process_subtask, i, task)
+                           for i, task in enumerate(subtasks)]
+                running = len(futures)
+                while running:
+                    event = events.get()
+                    if event is None:
+                        running -= 1
+                    else:
+                        yield event
+            except BaseException:       # GeneratorExit when the iterator is closed early
+                stop.set()
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+            executor.shutdown()
             # sorting results by index to maintain order
-            ordered_results = sorted((f.result() for f in as_completed(futures)), key=lambda x: x[0])
+            ordered_results = sorted((f.result() for f in futures), key=lambda x: x[0])
+
+            subtask_map = {content: output for _, content, output in ordered_results}
+            summary = self.summarize_results_inline(subtask_map)
+            yield {"event": "summary", "task_id": task.id, "summary": summary}
+            yield {"event": "done", "task_id": task.id,
+                   "result": {"results": subtask_map, "summary": summary,
+                              "reassignments": {subtask.content: subtask.reassignments for subtask in subtasks}}}
+
+    def _run_subtask(self, subtask: Task, agents: list[Agent], force: bool, stop: threading.Event = None) -> dict:
+        """Assign a subtask, handing it to another agent when an attempt fails or outlives its lease.
+
+        No attempt is started once `stop` is set.
+        """
+        outer_deadline = current_deadline()
+        failed = set()      # agents that failed this subtask
+        while True:
+            if stop is not None and stop.is_set():
+                return {"executor": None, "output": "[ERROR] Orchestration stopped."}
+            candidates = [a for a in self.get_available_agents(agents) if a.name not in failed]
+            specialist = None
+            if not candidates and force:
+                specialist = self.spawn_specialist(subtask.type)
+                candidates = [specialist] if specialist else []
+            subtask.assigned_to = None
+            try:
+                if self.subtask_lease:
+                    with deadline(time.monotonic() + self.subtask_lease):
+                        return self.assign_task(subtask, candidates)
+                return self.assign_task(subtask, candidates)
+            except TaskShed as e:
+                # Another agent would queue for the same backend, so the deadline is out of reach for it too
+                self.logger.warning(f"[SHED] Subtask {subtask.id} dropped: {e}")
+                return {"executor": None, "output": f"[ERROR] Subtask shed: {e}"}
+            except (OSError, RuntimeError) as e:
+                # OSError covers backend errors and expired leases (DeadlineExceeded); RuntimeError lost workers
+                if outer_deadline is not None and time.monotonic() >= outer_deadline:
+                    raise       # the caller's own deadline passed, retrying cannot help
+                executor = getattr(subtask.assigned_to, "name", None)
+                if subtask.reassignments >= self.max_reassignments:
+                    self.logger.error(f"[REASSIGN] Giving up on subtask {subtask.id} "
+                                      f"after {subtask.reassignments} reassignments: {e}")
+                    return {"executor": None, "output": f"[ERROR] Subtask failed after "
+                                                        f"{subtask.reassignments} reassignments: {e}"}
+                if executor:
+                    failed.add(executor)
+                subtask.reassignments += 1
+                _notify("reassigned", agent=executor, error=str(e))
+                self.logger.warning(f"[REASSIGN] {executor or 'Agent'} failed subtask {subtask.id}, "
+                                    f"reassigning ({subtask.reassignments}/{self.max_reassignments}): {e}")
+            finally:
+                if specialist:
+                    self.release_specialist(specialist)
+
+    def map_reduce(self, instruction: str, chunks: Iterable["Chunk"], agents: list[Agent], force: bool = False,
+                   priority: int = Priority.NORMAL) -> dict:
+        """
+        Apply an instruction to every chunk of a document in parallel, then combine the outputs.
+
+        Chunks are drawn from the iterable only as agents free up, so a document
+        streamed with `parse_document` is never held in memory. Outputs are
+        combined into a summary; when they do not fit one prompt, groups of them
+        are summarized first, level by level.
+
+        Args:
+            instruction (str): What to do with each chunk, e.g. "List the risks mentioned".
+            chunks (Iterable[Chunk]): Chunks from `parse_document` or `chunk_text`.
+            agents (list[Agent]): Available agents.
+            force (bool, optional): Spawn specialists when no agent is free. Defaults to False.
+            priority (int, optional): Priority of the chunk tasks. Defaults to Priority.NORMAL.
+
+        Returns:
+            dict: A mapping of chunk id to output, the summary, the number of chunks and
+                how many times each chunk was reassigned.
+        """
+        task = Task(instruction, priority=priority, deadline=current_deadline())
+        with tracer.span("map_reduce", agent=self.name) as span, profiler.phase("map_reduce", agent=self.name), \
+                scheduled(task):
+            task_type = self.define_task_type(task)
+            width = len(self.get_available_agents(agents)) or (self.get_spawn_limit() if force else 1)
+            outputs, reassignments = {}, {}
+
+            def process_chunk(chunk: "Chunk") -> tuple["Chunk", Task, dict]:
+                subtask = task.derive(f"{instruction}\n\n{chunk.text}", task_type=task_type)
+                with tracer.span("chunk", task_id=subtask.id, index=chunk.index), profiler.phase("chunk"):
+                    return chunk, subtask, self._run_subtask(subtask, agents, force)
+
+            with ThreadPoolExecutor(max_workers=width) as executor:
+                pending = set()
+                for chunk in chunks:
+                    if len(pending) >= width:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        self._collect_chunks(done, outputs, reassignments)
+                    pending.add(executor.submit(contextvars.copy_context().run, process_chunk, chunk))
+                self._collect_chunks(pending, outputs, reassignments)
+            span.set(chunks=len(outputs))
+            self.logger.info(f"[MAP] Processed {len(outputs)} chunk(s) with up to {width} agent(s)")
+            ordered = sorted(outputs.items(), key=lambda item: item[0][0])
+            results = {chunk_id: output for (_, chunk_id), output in ordered}
+            summary = self._reduce_outputs([output for output in results.values()
+                                            if not output.startswith(("[ERROR]", "[SKIPPED]"))])
+            return {"results": results, "summary": summary, "chunks": len(results), "reassignments": reassignments}
+
+    def _collect_chunks(self, futures, outputs: dict, reassignments: dict):
+        for future in futures:
+            chunk, subtask, result = future.result()
+            output = result["output"] if result["executor"] else (
+                result["output"] if result["output"].startswith("[ERROR]") else "[ERROR] No suitable agent found.")
+            outputs[(chunk.index, chunk.id)] = output
+            reassignments[chunk.id] = subtask.reassignments
+
+    def _reduce_outputs(self, outputs: list[str]) -> str:
+        """Summarize outputs, first in groups that fit half a prompt while they don't fit one together."""
+        budget = budget_for() // 2
+        while len(outputs) > 1 and sum(map(count_tokens, outputs)) > budget:
+            groups, group, size = [], [], 0
+            for output in outputs:
+                tokens = count_tokens(output)
+                if group and size + tokens > budget:
+                    groups.append(group)
+                    group, size = [], 0
+                group.append(output)
+                size += tokens
+            groups.append(group)
+            if len(groups) == len(outputs):
+                break       # every output fills a group on its own; the summary prompt cuts them to fit
+            self.logger.info(f"[REDUCE] Combining {len(outputs)} outputs in {len(groups)} group(s)")
+            outputs = [self.summarize_results_inline(dict(enumerate(group))) for group in groups]
+        return self.summarize_results_inline(dict(enumerate(outputs)))
+
+    def _create_specialist(self, task_type: str) -> Agent:
+        name = f"{task_type}_auto_{uuid4().hex[:4]}"
+        agent = Agent(name=name, role=task_type, config={"task_type": task_type, "llm": {"caste": Caste.LARVA.value}},
+                      spawned=True)
+        self.logger.info(f"[SPAWN] Created specialist: {name} for type: {task_type}")
+        return agent
 
-        subtask_map = {content: output for _, content, output in ordered_results}
-        summary = self.summarize_results_inline(subtask_map)
-        return {"results": subtask_map, "summary": summary}
-    
     def spawn_specialist(self, task_type: str) -> Agent:
         """
-        Spawns a specialist agent for a specific task type.
+        Takes a specialist agent for a specific task type from the specialist pool.
 
-        This method creates a new agent with a unique name and assigns it a role
-        based on the provided task type. The agent is configured with a task type
-        and a default "minor" caste for the LLM configuration.
+        An idle specialist is reused when there is one; otherwise a new agent is
+        created with a unique name, a role based on the task type and the ephemeral
+        "larva" caste, so it never writes memory to disk. Hand the agent back with
+        `release_specialist` once its task is done.
 
         Args:
             task_type (str): The type of task the specialist agent will handle.
 
         Returns:
-            Agent: The newly created specialist agent.
-
-        Logs:
-            Logs the creation of the specialist agent with its name and task type.
+            Agent: The specialist agent, or None if the spawn limit for the task type is reached.
         """
-        if len(self.spawned_agents) >= self.spawn_limit:
+        agent = self.pool.acquire(task_type)
+        if agent is None:
             self.logger.warning("Spawn limit reached.")
-            return None
-        name = f"{task_type}_auto_{uuid4().hex[:4]}"
-        agent = Agent(name=name, role=task_type, config={"task_type": task_type, "llm": {"caste": "minor"}})
-        self.spawned_agents.append(agent)
-        self.logger.info(f"[SPAWN] Created specialist: {name} for type: {task_type}")
         return agent
+
+    def release_specialist(self, agent: Agent) -> None:
+        """Return a specialist taken with `spawn_specialist` to the pool for reuse."""
+        self.pool.release(agent)
@@ -0,0 +1,533 @@
+"""HTTP API for the swarm.
+
+Usage:
+    python -m api.main --host 127.0.0.1 --port 8000
+
+Endpoints:
+    GET    /health                   Queue depth, in-flight requests and rejections
+    GET    /agents                   List agents
+    POST   /agents                   Create an agent: {"name": ..., "role": ..., "config": {...}}
+    GET    /agents/<name>            Describe an agent
+    DELETE /agents/<name>            Remove an agent from the swarm
+    GET    /agents/<name>/memory     Recent memory, ?limit=20, or ?q=<text>&k=3 for similar tasks
+    POST   /agents/<name>/assign     Run a task: {"task": ..., "difficulty": ..., "priority": ..., "timeout": ...};
+                                     tasks of one agent run one at a time, 409 if it is busy orchestrating
+    POST   /orchestrate              Let the Queen run a task: {"task": ..., "force": ..., "priority": ...,
+                                     "timeout": ...}
+
+Assign and orchestrate requests go through a bounded queue served by a fixed
+number of workers; when the queue is full the server answers 429 right away.
+Every queued request has a deadline (its "timeout" field or API_TIMEOUT): it
+answers 504 when the deadline passes, a request still waiting in the queue is
+skipped, and the LLM calls of a running one are aborted. Requests with a higher
+"priority" ("low", "normal" or "high") leave the queue first, and their LLM
+calls are served first by the process-wide scheduler.
+
+An orchestrate request sent with "Accept: text/event-stream" (or "stream": true)
+is answered with server-sent events as the orchestration progresses: plan,
+assigned, token, reassigned, subtask_done, summary and finally done, which
+carries the usual result. Failures after the stream started arrive as an
+error event with the status code the request would have had. When the client
+goes away, subtasks not started yet are cancelled and running ones are not
+retried; the worker is free again without waiting for their LLM calls.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, unquote, urlsplit
+from core.logger import LazyLogger
+from core.task import Priority
+
+logger = LazyLogger("api")
+
+API_HOST = os.getenv("API_HOST", "127.0.0.1")
+API_PORT = int(os.getenv("API_PORT", "8000"))
+API_WORKERS = int(os.getenv("API_WORKERS", "4"))
+API_QUEUE_SIZE = int(os.getenv("API_QUEUE_SIZE", "64"))
+API_TIMEOUT = float(os.getenv("API_TIMEOUT", "120"))
+API_MAX_BODY = int(os.getenv("API_MAX_BODY", str(1024 * 1024)))
+
+REASONS = {200: "OK", 201: "Created", 204: "No Content", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large", 429: "Too Many Requests",
+           500: "Internal Server Error", 502: "Bad Gateway", 504: "Gateway Timeout"}
+
+
+class HTTPError(Exception):
+    """An error answered with its status code and a JSON {"error": message} body."""
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Job:
+    """A queued call with its deadline and the future its request is waiting on.
+
+    Jobs leave the queue by priority, then earliest deadline first. Every job
+    has a deadline, so a low priority job waits at most until it expires.
+    """
+    __slots__ = ("fn", "args", "deadline", "future", "priority", "seq")
+    _seq = itertools.count()
+
+    def __init__(self, fn, args: tuple, deadline: float, future: asyncio.Future,
+                 priority: int = Priority.NORMAL):
+        self.fn = fn
+        self.args = args
+        self.deadline = deadline
+        self.future = future
+        self.priority = priority
+        self.seq = next(Job._seq)
+
+    def __lt__(self, other: "Job") -> bool:
+        return (-self.priority, self.deadline, self.seq) < (-other.priority, other.deadline, other.seq)
+
+
+class EventStream:
+    """Events produced by a worker thread, answered as a text/event-stream.
+
+    The worker hands events over with `emit`; the connection reads them with
+    `events()` until the job finishes, fails or runs out of time.
+    """
+    def __init__(self):
+        self.job = None
+        self.stop = threading.Event()   # set when nobody is reading anymore
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+
+    def emit(self, event: dict) -> None:
+        """Queue an event; safe to call from any thread."""
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, event)
+
+    async def events(self):
+        """Yield the events, then an error event if the job failed or its deadline passed."""
+        future = self.job.future
+        while True:
+            getter = asyncio.ensure_future(self._queue.get())
+            await asyncio.wait({getter, future}, timeout=max(0.0, self.job.deadline - time.monotonic()),
+                               return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                yield getter.result()
+                continue
+            getter.cancel()
+            break
+        # Events emitted before the job returned are already queued
+        while not self._queue.empty():
+            yield self._queue.get_nowait()
+        if not future.done() or future.cancelled():
+            self.close()
+            yield {"event": "error", "status": 504, "error": "Deadline exceeded."}
+        elif future.exception() is not None:
+            error = future.exception()
+            status, message = (error.status, error.message) if isinstance(error, HTTPError) else (500, str(error))
+            yield {"event": "error", "status": status, "error": message}
+
+    def close(self) -> None:
+        """Stop the job early and drop it from the queue if it has not started."""
+        self.stop.set()
+        if not self.job.future.done():
+            self.job.future.cancel()
+
+    @staticmethod
+    def encode(event: dict) -> bytes:
+        return f"event: {event['event']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+class ApiServer:
+    """Asynchronous HTTP front end for a Swarm and its Queen.
+
+    The event loop only parses requests and answers cheap ones; LLM work is run
+    by `workers` threads fed from a queue of at most `queue_size` requests.
+    """
+    def __init__(self, swarm=None, workers: int = API_WORKERS, queue_size: int = API_QUEUE_SIZE,
+                 timeout: float = API_TIMEOUT):
+        """Initialize an ApiServer.
+
+        Args:
+            swarm (Swarm, optional): The swarm to serve. Defaults to a new, empty Swarm.
+            workers (int, optional): Requests processed concurrently. Defaults to API_WORKERS.
+            queue_size (int, optional): Requests allowed to wait for a worker. Defaults to API_QUEUE_SIZE.
+            timeout (float, optional): Default deadline in seconds. Defaults to API_TIMEOUT.
+        """
+        if swarm is None:
+            from core.swarm import Swarm
+            swarm = Swarm()
+        self.swarm = swarm
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.queen = None
+        self._agent_locks = {}      # agent name -> lock held while one of its assigned tasks runs
+        self.in_flight = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._queue = None
+        self._executor = None
+        self._worker_tasks = []
+        self._server = None
+        self._routes = [
+            ("GET", re.compile(r"/health"), self.health),
+            ("GET", re.compile(r"/agents"), self.list_agents),
+            ("POST", re.compile(r"/agents"), self.create_agent),
+            ("GET", re.compile(r"/agents/(?P<name>[^/]+)"), self.get_agent),
+            ("DELETE", re.compile(r"/agents/(?P<name>[^/]+)"), self.delete_agent),
+            ("GET", re.compile(r"/agents/(?P<name>[^/]+)/memory"), self.agent_memory),
+            ("POST", re.compile(r"/agents/(?P<name>[^/]+)/assign"), self.assign),
+            ("POST", re.compile(r"/orchestrate"), self.orchestrate),
+        ]
+
+    async def start(self, host: str = API_HOST, port: int = API_PORT) -> tuple[str, int]:
+        """Start listening and start the workers.
+
+        Returns:
+            tuple[str, int]: The bound address, useful with port 0
+        """
+        self._queue = asyncio.PriorityQueue(maxsize=self.queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="api-worker")
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        address = self._server.sockets[0].getsockname()[:2]
+        logger.info(f"[API] Listening on http://{address[0]}:{address[1]} "
+                    f"({self.workers} workers, queue {self.queue_size})")
+        return address
+
+    async def serve_forever(self) -> None:
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self) -> None:
+        """Stop accepting connections and shut the workers down."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # Admission control
+
+    async def submit(self, fn, *args, timeout: float = None, priority: int = Priority.NORMAL):
+        """Queue a blocking call and wait for its result within the deadline.
+
+        Raises:
+            HTTPError: 429 if the queue is full, 504 if the deadline passes
+        """
+        timeout = self.timeout if timeout is None else timeout
+        job = self._enqueue(fn, *args, timeout=timeout, priority=priority)
+        try:
+            return await asyncio.wait_for(asyncio.shield(job.future), timeout)
+        except asyncio.TimeoutError:
+            job.future.cancel()
+            self.timed_out += 1
+            raise HTTPError(504, f"Deadline of {timeout}s exceeded.")
+
+    def _enqueue(self, fn, *args, timeout: float, priority: int = Priority.NORMAL) -> Job:
+        """Queue a blocking call without waiting for it.
+
+        Raises:
+            HTTPError: 429 if the queue is full
+        """
+        job = Job(fn, args, time.monotonic() + timeout, asyncio.get_running_loop().create_future(), priority)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise HTTPError(429, "Server is saturated, retry later.")
+        return job
+
+    async def _worker(self):
+        from core.llm import DeadlineExceeded
+
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.future.done() or time.monotonic() >= job.deadline:
+                    continue    # its request already gave up
+                self.in_flight += 1
+                try:
+                    result = await loop.run_in_executor(self._executor, self._run, job)
+                except DeadlineExceeded:
+                    if not job.future.done():
+                        job.future.set_exception(HTTPError(504, "Deadline exceeded."))
+                except OSError as e:   # includes the requests exceptions raised for the LLM backend
+                    if not job.future.done():
+                        job.future.set_exception(HTTPError(502, f"LLM backend error: {e}"))
+                except Exception as e:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                else:
+                    if not job.future.done():
+                        job.future.set_result(result)
+                finally:
+                    self.in_flight -= 1
+            finally:
+                self._queue.task_done()
+
+    @staticmethod
+    def _run(job: Job):
+        from core.llm import deadline
+
+        with deadline(job.deadline):
+            return job.fn(*job.args)
+
+    # HTTP plumbing
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            status, payload = await self._read_and_dispatch(reader)
+        except HTTPError as e:
+            status, payload = e.status, {"error": e.message}
+        except Exception as e:
+            logger.error(f"[API] Request failed: {e}")
+            status, payload = 500, {"error": str(e)}
+        if isinstance(payload, EventStream):
+            return await self._write_events(writer, payload)
+        body = b"" if status == 204 else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        headers = [f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+                   "Content-Type: application/json",
+                   f"Content-Length: {len(body)}",
+                   "Connection: close"]
+        if status == 429:
+            headers.append("Retry-After: 1")
+        try:
+            writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + body)
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+    async def _write_events(self, writer: asyncio.StreamWriter, stream: EventStream):
+        head = ("HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                "Connection: close\r\n\r\n")
+        try:
+            writer.write(head.encode("latin-1"))
+            async for event in stream.events():
+                if event["event"] == "error" and event["status"] == 504:
+                    self.timed_out += 1
+                writer.write(stream.encode(event))
+                await writer.drain()     # one event per write, so the client sees it right away
+            writer.close()
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+        finally:
+            stream.close()
+
+    async def _read_and_dispatch(self, reader: asyncio.StreamReader) -> tuple[int, object]:
+        try:
+            method, target, _ = (await reader.readline()).decode("latin-1").split(" ", 2)
+            headers = {}
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                key, _, value = line.decode("latin-1").partition(":")
+                headers[key.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HTTPError(400, "Malformed request.")
+        if length > API_MAX_BODY:
+            raise HTTPError(413, f"Body larger than {API_MAX_BODY} bytes.")
+        try:
+            body = json.loads(await reader.readexactly(length)) if length else {}
+        except (ValueError, asyncio.IncompleteReadError):
+            raise HTTPError(400, "Body must be JSON.")
+        if not isinstance(body, dict):
+            raise HTTPError(400, "Body must be a JSON object.")
+
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        allowed = False
+        for route_method, pattern, handler in self._routes:
+            match = pattern.fullmatch(url.path.rstrip("/") or "/")
+            if match:
+                allowed = True
+                if route_method == method:
+                    params = {k: unquote(v) for k, v in match.groupdict().items()}
+                    return await handler(body=body, query=query, headers=headers, **params)
+        raise HTTPError(405 if allowed else 404, f"No route for {method} {url.path}")
+
+    def _agent(self, name: str):
+        if name not in self.swarm.agents:
+            raise HTTPError(404, f"Agent '{name}' not found.")
+        return self.swarm.agents[name]
+
+    @staticmethod
+    def _timeout(body: dict) -> float | None:
+        timeout = body.get("timeout")
+        if timeout is not None and (not isinstance(timeout, (int, float)) or timeout <= 0):
+            raise HTTPError(400, "'timeout' must be a positive number of seconds.")
+        return timeout
+
+    def _task(self, body: dict):
+        """Build the task of a request; its deadline is the request's."""
+        from core.task import Task, TaskDifficulty
+
+        content = body.get("task")
+        if not isinstance(content, str) or not content.strip():
+            raise HTTPError(400, "'task' must be a non-empty string.")
+        difficulty = body.get("difficulty", TaskDifficulty.EASY.name.lower())
+        if str(difficulty).upper() not in TaskDifficulty.__members__:
+            raise HTTPError(400, f"Unknown difficulty '{difficulty}'.")
+        priority = body.get("priority", Priority.NORMAL.name.lower())
+        if str(priority).upper() not in Priority.__members__:
+            raise HTTPError(400, f"Unknown priority '{priority}'.")
+        timeout = self._timeout(body)
+        return Task(content=content, difficulty=difficulty, priority=Priority[str(priority).upper()],
+                    deadline=time.monotonic() + (self.timeout if timeout is None else timeout))
+
+    # Handlers
+
+    async def health(self, **_):
+        from core.scheduler import scheduler
+
+        return 200, {"status": "ok", "queued": self._queue.qsize(), "in_flight": self.in_flight,
+                     "workers": self.workers, "queue_size": self.queue_size,
+                     "rejected": self.rejected, "timed_out": self.timed_out, "scheduler": scheduler.stats()}
+
+    async def list_agents(self, **_):
+        return 200, {"agents": self.swarm.list_agents()}
+
+    async def create_agent(self, body: dict, **_):
+        name = body.get("name")
+        if not isinstance(name, str) or not re.fullmatch(r"[\w.-]+", name):
+            raise HTTPError(400, "'name' must contain only letters, digits, '_', '-' and '.'.")
+        config = body.get("config")
+        if config is not None and not isinstance(config, dict):
+            raise HTTPError(400, "'config' must be an object, e.g. {\"task_type\": \"research\"}.")
+        if name in self.swarm.agents:
+            return 200, self._describe(self.swarm.agents[name])
+        if config is None:
+            agent = await asyncio.to_thread(self.swarm.register, name, body.get("role", "assistant"))
+        else:
+            from agents.base import Agent
+            agent = await asyncio.to_thread(
+                lambda: self.swarm.add(Agent(name=name, role=body.get("role", "assistant"), config=config)))
+        return 201, self._describe(agent)
+
+    async def get_agent(self, name: str, **_):
+        return 200, self._describe(self._agent(name))
+
+    async def delete_agent(self, name: str, **_):
+        self._agent(name)
+        self.swarm.remove(name)
+        self._agent_locks.pop(name, None)
+        return 204, None
+
+    async def agent_memory(self, name: str, query: dict, **_):
+        agent = self._agent(name)
+        try:
+            limit = int(query.get("limit", 20))
+            k = int(query.get("k", 3))
+        except ValueError:
+            raise HTTPError(400, "'limit' and 'k' must be integers.")
+        if "q" in query:
+            matches = await asyncio.to_thread(agent.search_memory, query["q"], k)
+            return 200, {"agent": name, "matches": [{"score": round(score, 4), **record} for score, record in matches]}
+        memory = await asyncio.to_thread(lambda: list(agent.memory))
+        return 200, {"agent": name, "total": len(memory), "entries": memory[-limit:] if limit > 0 else []}
+
+    async def assign(self, name: str, body: dict, **_):
+        agent = self._agent(name)
+        task = self._task(body)
+        lock = self._agent_locks.setdefault(name, threading.Lock())
+        response = await self.submit(self._think, agent, lock, task, timeout=self._timeout(body),
+                                     priority=task.priority)
+        return 200, {"agent": name, "task_id": task.id, "response": response}
+
+    @staticmethod
+    def _think(agent, lock: threading.Lock, task):
+        """Run an assigned task once the agent's previous assigned tasks are done.
+
+        An agent's timer, busy flag and statistics belong to one task at a time,
+        so tasks assigned to the same agent wait for each other, within their deadline.
+
+        Raises:
+            HTTPError: 409 if the agent is busy with an orchestration
+        """
+        from agents.base import AgentBusy
+        from core.llm import DeadlineExceeded
+
+        if not lock.acquire(timeout=max(0.0, task.deadline - time.monotonic())):
+            raise DeadlineExceeded(f"Deadline exceeded waiting for agent '{agent.name}'")
+        try:
+            return agent.think(task)
+        except AgentBusy:
+            raise HTTPError(409, f"Agent '{agent.name}' is busy with another task.")
+        finally:
+            lock.release()
+
+    async def orchestrate(self, body: dict, headers: dict, **_):
+        task = self._task(body)
+        timeout = self._timeout(body)
+        force = bool(body.get("force", False))
+        if body.get("stream") is True or "text/event-stream" in headers.get("accept", ""):
+            stream = EventStream()
+            stream.job = self._enqueue(self._orchestrate_events, task, force, stream,
+                                       timeout=self.timeout if timeout is None else timeout, priority=task.priority)
+            return 200, stream
+        result = await self.submit(self._orchestrate, task, force, timeout=timeout, priority=task.priority)
+        return 200, {"task_id": task.id, **result}
+
+    def _orchestrate(self, task, force: bool) -> dict:
+        return self._queen().orchestrate(task, self._queen_agents(), force=force)
+
+    def _orchestrate_events(self, task, force: bool, stream: EventStream) -> None:
+        events = self._queen().orchestrate_stream(task, self._queen_agents(), force=force)
+        try:
+            for event in events:
+                stream.emit(event)
+                if stream.stop.is_set():
+                    break       # the client went away or the deadline passed
+        finally:
+            events.close()
+
+    def _queen(self):
+        if self.queen is None:
+            from agents.base import Queen
+            self.queen = Queen()
+        return self.queen
+
+    def _queen_agents(self) -> list:
+        return [agent for agent in self.swarm.agents.values() if agent is not self.queen]
+
+    @staticmethod
+    def _describe(agent) -> dict:
+        return {"name": agent.name, "role": agent.role, "task_type": agent.task_type,
+                "caste": agent.llm_config.get("caste", "minor"), "busy": agent.busy,
+                "spawned": agent.spawned}
+
+
+async def serve(host: str = API_HOST, port: int = API_PORT, **kwargs) -> None:
+    """Run an ApiServer until cancelled."""
+    server = ApiServer(**kwargs)
+    await server.start(host, port)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=API_WORKERS)
+    parser.add_argument("--queue-size", type=int, default=API_QUEUE_SIZE)
+    parser.add_argument("--timeout", type=float, default=API_TIMEOUT)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, workers=args.workers, queue_size=args.queue_size,
+                          timeout=args.timeout))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Measure the memory cost of idle agents.
+
+Usage:
+    LOG_LEVEL=ERROR python -m benchmarks.agent_footprint --agents 100000 --mode spawned
+"""
+import argparse
+import gc
+import json
+import os
+import resource
+import time
+
+
+def current_rss() -> int:
+    """Return the resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def build_agents(count: int, mode: str) -> list:
+    from agents.base import Agent, Queen
+
+    if mode == "spawned":
+        queen = Queen("queen")
+        queen.set_spawn_limit(count)
+        return [queen.spawn_specialist("research") for _ in range(count)]
+    if mode == "configured":
+        return [Agent(name="analyst") for _ in range(count)]
+    return [Agent(name=f"bench_minor_{i}") for i in range(count)]
+
+
+def measure(count: int, mode: str) -> dict:
+    from agents.base import Agent
+
+    Agent(name="warmup")    # import, registry and logging setup are not per-agent costs
+    gc.collect()
+    before = current_rss()
+    started = time.perf_counter()
+    agents = build_agents(count, mode)
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    after = current_rss()
+    return {
+        "benchmark": "agent_footprint",
+        "mode": mode,
+        "agents": len(agents),
+        "rss_bytes_per_agent": round((after - before) / max(len(agents), 1), 1),
+        "create_us_per_agent": round(elapsed / max(len(agents), 1) * 1e6, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, default=10000)
+    parser.add_argument("--mode", choices=["named", "configured", "spawned"], default="named",
+                        help="named: distinct names without configs, configured: one shared config, "
+                             "spawned: Queen specialists")
+    args = parser.parse_args()
+    result = measure(args.agents, args.mode)
+    from core.logger import flush_logs
+    flush_logs()
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
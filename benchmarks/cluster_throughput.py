@@ -0,0 +1,81 @@
+"""Measure task throughput in-process and with 1..N worker processes.
+
+Runs every task through Agent.think against a local mock Ollama, so the
+numbers reflect the CPU-side work (prompt assembly, cleanup, memory, logging)
+rather than model latency.
+
+Usage:
+    LOG_LEVEL=ERROR python -m benchmarks.cluster_throughput --tasks 2000 --workers 1 2 4
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+CONFIG = {"task_type": "research", "llm": {"caste": "larva"}}
+
+
+def run_in_process(tasks: int, agents: int, concurrency: int) -> float:
+    from agents.base import Agent
+    from core.task import Task
+
+    pool = [Agent(name=f"bench_agent_{i}", config=CONFIG) for i in range(agents)]
+
+    def run_share(index: int):
+        # An agent runs one task at a time, so each works through its share of the tasks in turn
+        for i in range(index, tasks, agents):
+            pool[index].think(Task(f"Find fact number {i}"))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(run_share, range(agents)))
+    return time.perf_counter() - started
+
+
+def run_cluster(tasks: int, agents: int, workers: int, concurrency: int) -> float:
+    from cluster.manager import ClusterManager
+    from core.task import Task
+
+    with ClusterManager(workers=workers, threads=max(concurrency // workers, 1)) as cluster:
+        names = [f"bench_agent_{i}" for i in range(agents)]
+        for name in names:
+            cluster.add_agent(name, config=CONFIG)
+        for name in names:      # wait for the workers to finish starting
+            cluster.submit(name, Task("warm up")).result()
+        started = time.perf_counter()
+        futures = [cluster.submit(names[i % agents], Task(f"Find fact number {i}")) for i in range(tasks)]
+        for future in futures:
+            future.result()
+        return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--agents", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    from benchmarks.mock_ollama import start_mock_ollama, url_of
+    import core.llm
+
+    server = start_mock_ollama()
+    os.environ["LLM_API_URL"] = core.llm.LLM_API_URL = url_of(server)
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+    runs = [("in_process", 0, run_in_process(args.tasks, args.agents, args.concurrency))]
+    for workers in args.workers:
+        runs.append(("cluster", workers, run_cluster(args.tasks, args.agents, workers, args.concurrency)))
+    server.shutdown()
+
+    from core.logger import flush_logs
+    flush_logs()
+    for mode, workers, elapsed in runs:
+        print(json.dumps({"benchmark": "cluster_throughput", "mode": mode, "workers": workers,
+                          "tasks": args.tasks, "tasks_per_s": round(args.tasks / elapsed, 1)}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""A local stand-in for Ollama's /api/generate, for benchmarks.
+
+Every response takes a latency drawn from a distribution (the time to the first
+token), then its tokens are generated at `--tokens-per-s`. Requests with
+"stream": true get one JSON object per token, like Ollama. A share of the
+requests can be made to fail, with a 500 or by dropping the connection.
+
+Planning prompts ("Split the following task ... to N!") are answered with N
+subtasks, so orchestration fans out like it would with a real model.
+
+Usage:
+    python -m benchmarks.mock_ollama --port 11435 --latency lognormal:0.2,0.5 --tokens 50 --tokens-per-s 200
+    python -m benchmarks.mock_ollama --delay 0.05 --failure-rate 0.01 --failure-mode disconnect
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FAILURE_MODES = ("error", "disconnect")
+SUBTASK_LIMIT = re.compile(r"Limit the number of subtasks to (\d+)")
+
+
+def parse_latency(spec: str):
+    """Parse a latency distribution, in seconds.
+
+    Accepted forms: "0.05" or "fixed:0.05", "uniform:LOW,HIGH", "normal:MEAN,STDDEV"
+    (never below 0), "lognormal:MEDIAN,SIGMA" and "exponential:MEAN".
+
+    Args:
+        spec (str): The distribution
+
+    Returns:
+        Callable[[random.Random], float]: Draws one latency
+
+    Raises:
+        ValueError: If the distribution is unknown or its parameters are not numbers
+    """
+    kind, _, params = spec.partition(":") if ":" in spec else ("fixed", "", spec)
+    try:
+        args = [float(value) for value in params.split(",")]
+    except ValueError:
+        raise ValueError(f"Latency parameters must be numbers: {spec!r}")
+    shapes = {
+        "fixed": (1, lambda rng, value: value),
+        "uniform": (2, lambda rng, low, high: rng.uniform(low, high)),
+        "normal": (2, lambda rng, mean, stddev: max(0.0, rng.gauss(mean, stddev))),
+        "lognormal": (2, lambda rng, median, sigma: rng.lognormvariate(math.log(median), sigma) if median else 0.0),
+        "exponential": (1, lambda rng, mean: rng.expovariate(1 / mean) if mean else 0.0),
+    }
+    if kind not in shapes:
+        raise ValueError(f"Unknown latency distribution {kind!r}, expected one of {', '.join(shapes)}")
+    count, draw = shapes[kind]
+    if len(args) != count:
+        raise ValueError(f"{kind} latency takes {count} parameter(s): {spec!r}")
+    return lambda rng: draw(rng, *args)
+
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    """Answers every request like Ollama would, with the latency, speed and failures of its server."""
+    protocol_version = "HTTP/1.1"     # keep-alive, like Ollama
+    disable_nagle_algorithm = True    # headers and body are separate writes; don't stall on delayed ACKs
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        latency, failure = server.draw()
+        started = time.perf_counter()
+        if latency:
+            time.sleep(latency)
+        if failure == "error":
+            return self._send_json(500, {"error": "injected failure"})
+        pieces = re.findall(r"\S+\s*", self._answer(payload.get("prompt", "")))
+        if payload.get("stream"):
+            return self._stream(payload, pieces, started, failure)
+        if failure == "disconnect":
+            self.close_connection = True
+            return
+        if server.tokens_per_s:
+            time.sleep(len(pieces) / server.tokens_per_s)
+        self._send_json(200, self._final(payload, "".join(pieces), len(pieces), started))
+
+    def _answer(self, prompt: str) -> str:
+        limit = SUBTASK_LIMIT.search(prompt)
+        if prompt.startswith("Split") and limit:
+            return "\n".join(f"Find facts about topic {i}" for i in range(int(limit.group(1))))
+        answer = f"mock answer to: {prompt[:40]}"
+        missing = self.server.tokens - len(answer.split())
+        return answer + " lorem" * missing if missing > 0 else answer
+
+    def _final(self, payload: dict, response: str, tokens: int, started: float) -> dict:
+        elapsed = int((time.perf_counter() - started) * 1e9)
+        return {"model": payload.get("model", ""), "response": response, "done": True, "context": [1, 2, 3],
+                "prompt_eval_count": len(payload.get("prompt", "").split()), "eval_count": tokens,
+                "total_duration": elapsed, "eval_duration": elapsed}
+
+    def _stream(self, payload: dict, pieces: list[str], started: float, failure: str | None):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        model = payload.get("model", "")
+        for i, piece in enumerate(pieces):
+            if failure == "disconnect" and i == len(pieces) // 2:
+                self.close_connection = True    # drop the stream halfway through
+                return
+            if self.server.tokens_per_s:
+                time.sleep(1 / self.server.tokens_per_s)
+            self._chunk(json.dumps({"model": model, "response": piece, "done": False}).encode("utf-8") + b"\n")
+        final = {**self._final(payload, "", len(pieces), started), "response": ""}
+        self._chunk(json.dumps(final).encode("utf-8") + b"\n")
+        self._chunk(b"")
+
+    def _chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status: int, data: dict):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class MockOllamaServer(ThreadingHTTPServer):
+    """The mock's server; holds its configuration and counts the requests it answered."""
+    daemon_threads = True
+
+    def __init__(self, address: tuple, latency: str = "0", tokens: int = 0, tokens_per_s: float = 0.0,
+                 failure_rate: float = 0.0, failure_mode: str = "error", seed: int = None):
+        if failure_mode not in FAILURE_MODES:
+            raise ValueError(f"Unknown failure mode {failure_mode!r}, expected one of {', '.join(FAILURE_MODES)}")
+        super().__init__(address, MockOllamaHandler)
+        self.latency = parse_latency(latency)
+        self.tokens = tokens
+        self.tokens_per_s = tokens_per_s
+        self.failure_rate = failure_rate
+        self.failure_mode = failure_mode
+        self.requests = 0
+        self.failures = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self) -> tuple[float, str | None]:
+        """Count a request and draw its latency and whether, and how, it fails."""
+        with self._lock:
+            self.requests += 1
+            failure = self.failure_mode if self._rng.random() < self.failure_rate else None
+            if failure:
+                self.failures += 1
+            return self.latency(self._rng), failure
+
+
+def start_mock_ollama(port: int = 0, delay: float = 0.0, latency: str = None, **options) -> MockOllamaServer:
+    """Serve the mock in a background thread.
+
+    Args:
+        port (int, optional): Port to bind; 0 picks a free one. Defaults to 0.
+        delay (float, optional): Seconds every response takes. Defaults to 0.
+        latency (str, optional): Latency distribution, see `parse_latency`; replaces `delay`. Defaults to None.
+        **options: tokens, tokens_per_s, failure_rate, failure_mode and seed, see MockOllamaServer
+
+    Returns:
+        MockOllamaServer: The running server; its URL is `url_of(server)`
+    """
+    server = MockOllamaServer(("127.0.0.1", port), latency=latency or str(delay), **options)
+    threading.Thread(target=server.serve_forever, name="mock-ollama", daemon=True).start()
+    return server
+
+
+def url_of(server: ThreadingHTTPServer) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}/api/generate"
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser):
+    """Add the options of the mock server to a benchmark's command line."""
+    parser.add_argument("--delay", type=float, default=0.0, help="Fixed latency in seconds")
+    parser.add_argument("--latency", default=None,
+                        help="Latency distribution, e.g. uniform:0.01,0.1 or lognormal:0.2,0.5; replaces --delay")
+    parser.add_argument("--tokens", type=int, default=0, help="Pad answers to this many tokens")
+    parser.add_argument("--tokens-per-s", type=float, default=0.0, help="Generation speed; 0 is instant")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of requests that fail")
+    parser.add_argument("--failure-mode", choices=FAILURE_MODES, default="error",
+                        help="Answer failures with a 500, or drop the connection")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for latencies and failures")
+
+
+def mock_options(args: argparse.Namespace) -> dict:
+    """Return the keyword arguments of `start_mock_ollama` given on a command line."""
+    return {"delay": args.delay, "latency": args.latency, "tokens": args.tokens, "tokens_per_s": args.tokens_per_s,
+            "failure_rate": args.failure_rate, "failure_mode": args.failure_mode, "seed": args.seed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=11435)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+    server = start_mock_ollama(args.port, **mock_options(args))
+    print(f"Mock Ollama on {url_of(server)}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
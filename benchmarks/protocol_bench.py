@@ -0,0 +1,104 @@
+"""Compare the binary cluster protocol with JSON over HTTP for task round trips.
+
+Both sides send the same task and get the same answer back from a server that
+does no work: the binary protocol over TCP and a Unix socket (sequential, then
+with `--window` requests pipelined on one connection), and JSON over a
+keep-alive HTTP/1.1 connection to the mock Ollama server.
+
+Usage:
+    python -m benchmarks.protocol_bench --requests 20000 --window 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import uuid
+
+TASK = {"id": str(uuid.uuid4()), "content": "Find facts about the foraging behaviour of leafcutter ants",
+        "type": "research", "difficulty": "medium"}
+ANSWER = "mock answer to: Find facts about the foraging behaviour of"
+
+
+async def run_binary(address: str, requests: int, window: int) -> float:
+    from cluster.protocols import MessageType, connect, decode_task, serve, server_address
+
+    async def handler(frame):
+        decode_task(frame)
+        return MessageType.RESULT, (ANSWER,)
+
+    server = await serve(address, handler)
+    client = await connect(server_address(server))
+    fields = ("bench_agent", uuid.UUID(TASK["id"]).bytes, TASK["type"], TASK["difficulty"], TASK["content"])
+
+    async def lane(count: int):
+        for _ in range(count):
+            await client.request(MessageType.TASK, fields)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(lane(requests // window) for _ in range(window)))
+    elapsed = time.perf_counter() - started
+    await client.close()
+    server.close()
+    await server.wait_closed()
+    return elapsed
+
+
+def run_http(requests: int) -> float:
+    import requests as http
+    from benchmarks.mock_ollama import start_mock_ollama, url_of
+
+    server = start_mock_ollama()
+    session, url = http.Session(), url_of(server)
+    payload = {"agent": "bench_agent", **TASK}
+    started = time.perf_counter()
+    for _ in range(requests):
+        session.post(url, json=payload).json()
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+    return elapsed
+
+
+def wire_sizes() -> dict:
+    from cluster.protocols import MessageType, encode_frame, encode_task
+
+    binary = len(encode_task(1, "bench_agent", TASK)) + len(encode_frame(MessageType.RESULT, 1, (ANSWER,)))
+    body = json.dumps({"agent": "bench_agent", **TASK}).encode()
+    answer = json.dumps({"model": "", "response": ANSWER, "done": True}).encode()
+    # Headers as sent by requests and BaseHTTPRequestHandler
+    request_head = (f"POST /api/generate HTTP/1.1\r\nHost: 127.0.0.1:11434\r\nUser-Agent: python-requests\r\n"
+                    f"Accept-Encoding: gzip, deflate\r\nAccept: */*\r\nConnection: keep-alive\r\n"
+                    f"Content-Length: {len(body)}\r\nContent-Type: application/json\r\n\r\n")
+    response_head = (f"HTTP/1.1 200 OK\r\nServer: BaseHTTP/0.6 Python\r\nDate: Mon, 19 Oct 2026 00:00:00 GMT\r\n"
+                     f"Content-Type: application/json\r\nContent-Length: {len(answer)}\r\n\r\n")
+    return {"binary": binary, "json_http": len(request_head) + len(body) + len(response_head) + len(answer)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--window", type=int, default=32, help="Requests in flight when pipelining")
+    args = parser.parse_args()
+
+    sizes = wire_sizes()
+    socket_path = os.path.join(tempfile.mkdtemp(), "bench.sock")
+    runs = [
+        ("json_http", "tcp", 1, run_http(args.requests)),
+        ("binary", "tcp", 1, asyncio.run(run_binary("tcp://127.0.0.1:0", args.requests, 1))),
+        ("binary", "unix", 1, asyncio.run(run_binary(f"unix://{socket_path}", args.requests, 1))),
+        ("binary", "tcp", args.window, asyncio.run(run_binary("tcp://127.0.0.1:0", args.requests, args.window))),
+        ("binary", "unix", args.window,
+         asyncio.run(run_binary(f"unix://{socket_path}", args.requests, args.window))),
+    ]
+    for protocol, transport, window, elapsed in runs:
+        count = args.requests if window == 1 else args.requests // window * window
+        print(json.dumps({"benchmark": "protocol", "protocol": protocol, "transport": transport,
+                          "in_flight": window, "requests": count,
+                          "round_trips_per_s": round(count / elapsed, 1),
+                          "us_per_round_trip": round(elapsed / count * 1e6, 1),
+                          "bytes_per_round_trip": sizes[protocol]}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""Throughput and latency of Agent.think, Queen.assign_task and Queen.orchestrate.
+
+Every benchmark runs `--ops` operations for each number of agents and each
+concurrency, against a local mock Ollama (see benchmarks.mock_ollama for its
+latency, speed and failure options). Every operation in flight has agents and a
+Queen of its own, so with the default instant mock the numbers are the swarm's
+own overhead, not operations waiting for each other's agents. Each case prints
+one JSON line with its throughput and p50/p95/p99 latency. `--output` also
+writes all cases, the commit and the settings to a JSON file, and `--compare`
+prints how this run differs from such a file.
+
+Usage:
+    LOG_LEVEL=ERROR python -m benchmarks.suite --output baseline.json
+    LOG_LEVEL=ERROR python -m benchmarks.suite --agents 4 16 --concurrency 8 --latency exponential:0.02 \\
+        --compare baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import queue
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from benchmarks.mock_ollama import add_mock_arguments, mock_options, start_mock_ollama, url_of
+
+BENCHMARKS = ("think", "assign_task", "orchestrate")
+CONFIG = {"task_type": "research", "llm": {"caste": "larva"}}
+
+
+def make_op(benchmark: str):
+    """Return a function running operation i of a benchmark with the given agents and Queen.
+
+    The function returns False for a failed operation.
+    """
+    from core.task import Task
+
+    if benchmark == "think":
+        return lambda i, agents, queen: bool(agents[i % len(agents)].think(Task(f"Find fact number {i}")))
+    if benchmark == "assign_task":
+        return lambda i, agents, queen: queen.assign_task(Task(f"Find fact number {i}", task_type="research"),
+                                                          agents)["executor"] is not None
+    if benchmark == "orchestrate":
+        def orchestrate(i: int, agents: list, queen) -> bool:
+            outputs = queen.orchestrate(Task(f"Research topic {i}"), agents)["results"].values()
+            return not any(output.startswith(("[ERROR]", "[SKIPPED]")) for output in outputs)
+        return orchestrate
+    raise ValueError(f"Unknown benchmark {benchmark!r}")
+
+
+def run_case(benchmark: str, agent_count: int, concurrency: int, ops: int, warmup: int, server,
+             stream: bool = False) -> dict:
+    """Run one benchmark at one number of agents and concurrency.
+
+    Each of the `concurrency` operations in flight borrows a crew of its own:
+    `agent_count` agents and a Queen. An agent runs one task at a time, so
+    sharing them would measure threads queueing for the same agent and
+    "Agent is busy" rejections rather than the swarm's overhead. With `stream`,
+    the LLM calls stream their responses, as they do for a client following an
+    orchestration.
+
+    Returns:
+        dict: The case, throughput and latency percentiles of the successful operations, failures and
+            LLM calls per operation
+    """
+    from agents.base import Agent, Queen
+    from core.batch import percentile
+    from core.llm import stream_tokens
+
+    crews = queue.SimpleQueue()     # never empty when taken: there are as many crews as operations in flight
+    for slot in range(concurrency):
+        prefix = f"bench_{benchmark}_{agent_count}_{slot}"
+        crews.put(([Agent(name=f"{prefix}_{i}", config=CONFIG) for i in range(agent_count)],
+                   Queen(f"bench_queen_{benchmark}_{agent_count}_{slot}", prewarm=[])))
+    op = make_op(benchmark)
+
+    def timed(i: int) -> tuple[float, bool]:
+        agents, queen = crews.get()
+        started = time.perf_counter()
+        try:
+            with stream_tokens(lambda piece: None) if stream else nullcontext():
+                ok = op(i, agents, queen)
+        except Exception:       # backend failures injected by the mock, mostly
+            ok = False
+        finally:
+            crews.put((agents, queen))
+        return time.perf_counter() - started, ok
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed, range(-warmup, 0)))
+        calls = server.requests
+        started = time.perf_counter()
+        outcomes = list(executor.map(timed, range(ops)))
+        elapsed = time.perf_counter() - started
+        calls = server.requests - calls
+    # Rejected and failed operations return early; they would flatter both throughput and latency
+    latencies = sorted(latency for latency, ok in outcomes if ok)
+    return {
+        "benchmark": benchmark,
+        "agents": agent_count,
+        "concurrency": concurrency,
+        "ops": ops,
+        "failed": ops - len(latencies),
+        "elapsed_s": round(elapsed, 3),
+        "ops_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "llm_calls_per_op": round(calls / ops, 2),
+    }
+
+
+def run_suite(benchmarks=BENCHMARKS, agents=(1, 4, 16), concurrency=(1, 8), ops: int = 200, warmup: int = 20,
+              stream: bool = False, **mock) -> dict:
+    """Run every benchmark at every number of agents and concurrency against a fresh mock Ollama.
+
+    Args:
+        benchmarks (Iterable[str], optional): Benchmarks to run. Defaults to BENCHMARKS.
+        agents (Iterable[int], optional): Numbers of agents per operation in flight. Defaults to (1, 4, 16).
+        concurrency (Iterable[int], optional): Operations in flight at once. Defaults to (1, 8).
+        ops (int, optional): Measured operations per case. Defaults to 200.
+        warmup (int, optional): Unmeasured operations run first in each case. Defaults to 20.
+        stream (bool, optional): Stream the LLM responses. Defaults to False.
+        **mock: Options of `start_mock_ollama`
+
+    Returns:
+        dict: "meta" (commit, platform, settings) and "results", one dict per case
+    """
+    import core.llm
+    import memory.memory
+    from core.logger import flush_logs
+    from core.scheduler import scheduler
+
+    server = start_mock_ollama(**mock)
+    url, memory_dir = core.llm.LLM_API_URL, memory.memory.MEMORY_DIR
+    core.llm.LLM_API_URL = url_of(server)
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as scratch:
+            memory.memory.MEMORY_DIR = scratch      # the Queen's memory stays out of data/
+            for benchmark in benchmarks:
+                for agent_count in agents:
+                    for in_flight in concurrency:
+                        results.append(run_case(benchmark, agent_count, in_flight, ops, warmup, server, stream))
+                        print(json.dumps(results[-1]), flush=True)
+            memory.memory.flush_agent_memory()
+    finally:
+        core.llm.LLM_API_URL, memory.memory.MEMORY_DIR = url, memory_dir
+        server.shutdown()
+        server.server_close()
+    flush_logs()
+    meta = {"commit": _commit(), "python": platform.python_version(), "platform": platform.platform(),
+            "cpus": os.cpu_count(), "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "ops": ops, "warmup": warmup,
+            "stream": stream, "scheduler_slots": scheduler.slots, "mock": mock}
+    return {"meta": meta, "results": results}
+
+
+def compare(report: dict, baseline: dict) -> list[str]:
+    """Describe, case by case, how throughput and p95 latency changed since a baseline report."""
+    before = {(r["benchmark"], r["agents"], r["concurrency"]): r for r in baseline["results"]}
+    lines = [f"Compared with {baseline['meta'].get('commit') or 'baseline'}:"]
+    for result in report["results"]:
+        old = before.get((result["benchmark"], result["agents"], result["concurrency"]))
+        case = f"{result['benchmark']:<12} agents={result['agents']:<3} concurrency={result['concurrency']:<3}"
+        if old is None:
+            lines.append(f"{case} not in baseline")
+            continue
+        change = result["ops_per_s"] / old["ops_per_s"] - 1 if old["ops_per_s"] else 0.0
+        lines.append(f"{case} {old['ops_per_s']:>9.1f} -> {result['ops_per_s']:>9.1f} ops/s ({change:+.1%})  "
+                     f"p95 {old['p95_ms']:.1f} -> {result['p95_ms']:.1f} ms")
+    return lines
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--benchmarks", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument("--agents", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--ops", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--stream", action="store_true", help="Stream the LLM responses")
+    parser.add_argument("--output", help="Write the report to this JSON file")
+    parser.add_argument("--compare", help="Report written by an earlier run, e.g. on another commit")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+    report = run_suite(args.benchmarks, args.agents, args.concurrency, args.ops, args.warmup, args.stream,
+                       **mock_options(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            print("\n".join(compare(report, json.load(f))), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
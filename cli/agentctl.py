@@ -1,31 +1,242 @@
+import os
+from pathlib import Path
 import typer
-from core.task import Task
-from core.swarm import Swarm
+
+# Heavy modules (agents, LLM client, Rich, YAML) are imported inside the commands
+# that need them, so one-shot commands start fast.
 
 app = typer.Typer()
-swarm = Swarm()
+_swarm = None
+
+SWARM_SNAPSHOT = os.getenv("SWARM_SNAPSHOT", "data/swarm.snapshot")
+
+def get_swarm():
+    """Return the swarm, restored from the last snapshot on first use."""
+    global _swarm
+    if _swarm is None:
+        from core.swarm import Swarm
+        _swarm = Swarm()
+        if os.path.exists(SWARM_SNAPSHOT):
+            try:
+                _swarm.restore(SWARM_SNAPSHOT)
+            except ValueError as e:
+                # E.g. a snapshot in an older format; the next save replaces it
+                typer.echo(f"[WARN] Ignoring swarm snapshot: {e}")
+    return _swarm
+
+def save_swarm():
+    """Persist the swarm so the next agentctl invocation sees the same agents."""
+    get_swarm().snapshot(SWARM_SNAPSHOT)
 
 @app.command()
 def create(name: str, role: str = "assistant"):
-    swarm.register(name, role)
+    get_swarm().register(name, role)
+    save_swarm()
     typer.echo(f"[OK] Created agent '{name}' with role: {role}")
 
 @app.command()
 def assign(name: str, request: str):
-    agent = swarm.get(name)
+    from core.task import Task
+    from memory.memory import flush_agent_memory
+
+    agent = get_swarm().get(name)
     task = Task(content=request)
     result = agent.think(task)
+    flush_agent_memory(name)
+    save_swarm()
     typer.echo(f"\nAgent '{name}' says:\n{result}\n")
 
 @app.command(name="list")
 def list_agents():
-    names = swarm.list_agents()
+    names = None
+    if _swarm is None and os.path.exists(SWARM_SNAPSHOT):
+        # Listing only needs the names, not the agents themselves
+        from core.swarm import read_snapshot_names
+        try:
+            names = read_snapshot_names(SWARM_SNAPSHOT)
+        except ValueError:
+            pass
+    if names is None:
+        names = get_swarm().list_agents()
     if not names:
-        typer.echo("[INFO] No agents registered in this session.")
+        typer.echo("[INFO] No agents registered.")
     else:
         typer.echo("🐜 " + "\n🐜 ".join(names))
 
+@app.command()
+def sweep(ttl: float = typer.Option(86400, help="Delete spawned-agent memory older than this many seconds")):
+    from memory.memory import sweep_orphaned_memory
+
+    removed = sweep_orphaned_memory(ttl, keep=get_swarm().list_agents())
+    typer.echo(f"[OK] Removed {len(removed)} orphaned memory file(s).")
+
+@app.command()
+def archive(
+    name: str = typer.Argument(None, help="Agent to archive. Defaults to every agent in data/"),
+    keep_hot: int = typer.Option(50, help="Latest entries kept in the hot JSON file"),
+    codec: str = typer.Option("zlib", help="Compression codec: zlib or lzma"),
+):
+    from memory.memory import MEMORY_DIR, flush_agent_memory
+    from memory.archive import archive_agent_memory
+
+    flush_agent_memory()
+    names = [name] if name else sorted(p.stem for p in MEMORY_DIR.glob("*.json"))
+    total_raw = total_compressed = total_before = total_after = 0
+    for agent_name in names:
+        report = archive_agent_memory(agent_name, keep_hot=keep_hot, codec=codec)
+        total_raw += report["raw_bytes"]
+        total_compressed += report["compressed_bytes"]
+        total_before += report["bytes_before"]
+        total_after += report["bytes_after"]
+        if report["archived"]:
+            ratio = report["raw_bytes"] / report["compressed_bytes"]
+            typer.echo(f"🐜 {agent_name}: {report['archived']} archived, {report['hot']} hot, {ratio:.1f}x compression")
+    ratio = total_raw / total_compressed if total_compressed else 1.0
+    typer.echo(f"[OK] {len(names)} agent(s): {total_before} -> {total_after} bytes on disk, {ratio:.1f}x compression")
+
+@app.command()
+def batch(
+    input: str = typer.Argument(..., help="JSONL file with one task per line"),
+    output: str = typer.Option(None, help="Results JSONL file. Defaults to <input>.results.jsonl"),
+    agent: str = typer.Option(None, help="Agent running every task; a record's 'agent' field overrides it"),
+    orchestrate: bool = typer.Option(False, help="Let the Queen split and delegate each task instead"),
+    concurrency: int = typer.Option(4, help="Tasks processed at once, across agents: an agent runs one at a time"),
+    field: str = typer.Option(None, help="Field holding the task text. Defaults to task, content, prompt or body"),
+    resume: bool = typer.Option(True, help="Skip tasks already done in the results file; failed ones are retried"),
+    workers: int = typer.Option(0, help="Run agents in this many worker processes instead of in-process"),
+    priority: str = typer.Option("low", help="Priority of the tasks; a record's 'priority' field overrides it"),
+):
+    import json
+    from core.batch import run_batch
+    from core.task import Priority, Task
+    from memory.memory import flush_agent_memory
+
+    swarm = get_swarm()
+    output = output or str(Path(input).with_suffix(".results.jsonl"))
+    queen = cluster = None
+    if orchestrate:
+        from agents.base import Queen
+        queen = Queen()
+    if workers:
+        from cluster.manager import ClusterManager
+        cluster = ClusterManager(workers=workers).start()
+        for name in swarm.list_agents():
+            cluster.add_agent(name)
+
+    def handle(record: dict, text: str):
+        # Bulk work yields the backend to interactive requests unless a record says otherwise
+        task = Task(content=text, difficulty=record.get("difficulty", "easy"),
+                    priority=Priority[str(record.get("priority", priority)).upper()])
+        if queen is not None:
+            agents = cluster.agents() if cluster else list(swarm.agents.values())
+            return queen.orchestrate(task, agents, force=True)
+        name = record.get("agent") or agent
+        if not name:
+            raise ValueError("No agent given: use --agent, --orchestrate or an 'agent' field")
+        return (cluster.add_agent(name) if cluster else swarm.get(name)).think(task)
+
+    try:
+        # An agent runs one task at a time, so its rows queue for it without holding a slot;
+        # orchestrated subtasks claim their agents in Agent.think
+        report = run_batch(input, output, handle, concurrency=concurrency, field=field, resume=resume,
+                           key=None if orchestrate else lambda record: record.get("agent") or agent)
+    finally:
+        if cluster:
+            cluster.close()
+    flush_agent_memory()
+    save_swarm()
+    typer.echo(f"[OK] Results in {output}")
+    typer.echo(json.dumps(report.as_dict()))
+
+@app.command()
+def index(
+    paths: list[str] = typer.Argument(..., help="Documents, or directories searched for text, Markdown, HTML and CSV"),
+    index_dir: str = typer.Option(None, help="Index directory. Defaults to SEARCH_INDEX_DIR"),
+    merge: bool = typer.Option(False, help="Merge all segments into one afterwards"),
+    passage_tokens: int = typer.Option(256, help="Token budget of an indexed passage"),
+):
+    import time
+    from tools.document_parser import parse_document
+    from tools.search import SEARCH_INDEX_DIR, SearchIndex
+
+    suffixes = (".txt", ".md", ".markdown", ".html", ".htm", ".csv", ".tsv")
+    files = []
+    for path in map(Path, paths):
+        files += sorted(p for p in path.rglob("*") if p.suffix in suffixes) if path.is_dir() else [path]
+    started = time.perf_counter()
+    added = 0
+    with SearchIndex(index_dir or SEARCH_INDEX_DIR) as search_index:
+        for file in files:
+            # One document per passage, so hits are passages rather than whole files
+            added += search_index.add_many((chunk.id, chunk.text, {"path": str(file)})
+                                           for chunk in parse_document(file, max_tokens=passage_tokens, overlap=0))
+        if merge:
+            search_index.merge(force=True)
+        typer.echo(f"[OK] Indexed {added} passages from {len(files)} file(s) in {time.perf_counter() - started:.2f}s; "
+                   f"{len(search_index)} passages in {len(search_index.segments)} segment(s)")
+
+@app.command()
+def search(
+    query: str,
+    k: int = typer.Option(5, help="Number of hits"),
+    index_dir: str = typer.Option(None, help="Index directory. Defaults to SEARCH_INDEX_DIR"),
+):
+    import time
+    from tools.search import SEARCH_INDEX_DIR, SearchIndex
+
+    with SearchIndex(index_dir or SEARCH_INDEX_DIR) as search_index:
+        started = time.perf_counter()
+        hits = search_index.search(query, k=k)
+        elapsed = time.perf_counter() - started
+    for hit in hits:
+        typer.echo(f"🐜 {hit.score:6.2f}  {hit.id}\n   {hit.text[:200]}")
+    typer.echo(f"[OK] {len(hits)} hit(s) in {elapsed * 1000:.1f} ms")
+
+@app.command()
+def digest(
+    path: str = typer.Argument(..., help="Text, Markdown, HTML or CSV document"),
+    instruction: str = typer.Option("Summarize the key points of this part of a document.",
+                                    help="What each agent does with its chunk"),
+    chunk_tokens: int = typer.Option(None, help="Token budget of a chunk. Defaults to DOCUMENT_CHUNK_TOKENS"),
+    overlap: int = typer.Option(None, help="Tokens repeated between chunks. Defaults to DOCUMENT_CHUNK_OVERLAP"),
+    output: str = typer.Option(None, help="Write every chunk's output to this JSON file"),
+):
+    import json
+    from agents.base import Queen
+    from memory.memory import flush_agent_memory
+    from core.task import Priority
+    from tools.document_parser import DOCUMENT_CHUNK_OVERLAP, DOCUMENT_CHUNK_TOKENS, parse_document
+
+    swarm = get_swarm()
+    chunks = parse_document(path, max_tokens=chunk_tokens or DOCUMENT_CHUNK_TOKENS,
+                            overlap=DOCUMENT_CHUNK_OVERLAP if overlap is None else overlap)
+    result = Queen().map_reduce(instruction, chunks, list(swarm.agents.values()), force=True, priority=Priority.LOW)
+    flush_agent_memory()
+    if output:
+        Path(output).write_text(json.dumps(result, indent=2), encoding="utf-8")
+    typer.echo(f"\n{result['summary']}\n")
+    typer.echo(f"[OK] {result['chunks']} chunk(s) processed")
+
+@app.command()
+def profile(
+    path: str = typer.Argument(None, help="Profile written by a run with PROFILE_FILE set. Defaults to PROFILE_FILE"),
+    agent: str = typer.Option(None, help="Only show this agent"),
+):
+    from core.timer import PROFILE_FILE, Profiler
+
+    path = path or PROFILE_FILE
+    if not path or not os.path.exists(path):
+        typer.echo("[ERROR] No profile found. Run a command with PROFILE_FILE=<path> first.")
+        raise typer.Exit(1)
+    typer.echo(Profiler().load(path).report(agent), nl=False)
+
 @app.command()
 def exit():
+    from memory.memory import flush_agent_memory
+
+    flush_agent_memory()
     typer.echo("[INFO] Exiting agentctl.")
-    raise typer.Exit()
\ No newline at end of file
+    raise typer.Exit()
+
+if __name__ == "__main__":
+    app()
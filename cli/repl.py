@@ -1,13 +1,94 @@
 import cmd
+import sys
 
 from agents.base import Agent, Queen
 from core.logger import get_logger
-from core.task import Task
+from core.task import Priority, Task
+from memory.memory import flush_agent_memory
+from core.registry import registry
+from core.timer import profiler
+from core.tracing import tracer
 logger = get_logger("repl")
 
 agents = {}
 queen = None
 
+
+class OrchestrationPrinter:
+    """Prints the events of `Queen.orchestrate_stream` as they arrive.
+
+    Subtasks run in parallel, so one of them is followed live at a time: its
+    tokens are printed as they come, while those of the others are buffered
+    and printed when their turn comes.
+    """
+    def __init__(self, out=None):
+        self.out = out or sys.stdout
+        self.live = None        # index of the subtask being printed
+        self.buffers = {}       # index -> tokens not printed yet
+        self.done = {}          # index -> subtask_done event not printed yet
+        self.shown = set()      # subtasks whose tokens were printed
+        self.agents = {}        # index -> agent working on it
+
+    def handle(self, event: dict) -> None:
+        kind, index = event["event"], event.get("index")
+        if kind == "plan":
+            self._line(f"[PLAN] {len(event['subtasks'])} subtask(s):")
+            for i, content in enumerate(event["subtasks"]):
+                self._line(f"  [{i}] {content}")
+        elif kind == "assigned":
+            self.agents[index] = event["agent"]
+            if self.live is None:
+                self._line(f"[{index}] -> {event['agent']}")
+        elif kind == "reassigned":
+            self._line(f"[{index}] {event['agent'] or 'Agent'} failed ({event['error']}), reassigning")
+        elif kind == "token":
+            if self.live is None:
+                self._start(index)
+            if index == self.live:
+                self._write(event["text"])
+                self.shown.add(index)
+            else:
+                self.buffers.setdefault(index, []).append(event["text"])
+        elif kind == "subtask_done":
+            self.done[index] = event
+            if self.live is None or index == self.live:
+                if self.live is None:
+                    self._start(index)
+                self._finish()
+        elif kind == "summary":
+            self._line(f"\n[SUMMARY]\n{event['summary']}")
+        elif kind == "done" and "summary" not in event["result"]:
+            # Ended before any subtask ran, e.g. with no agents to hand them to
+            for output in event["result"].values():
+                self._line(output)
+
+    def _start(self, index: int):
+        self.live = index
+        self._write(f"\n[{index}] {self.agents.get(index, '')}: ")
+        pending = self.buffers.pop(index, [])
+        if pending:
+            self._write("".join(pending))
+            self.shown.add(index)
+
+    def _finish(self):
+        # Print the live subtask's result, then catch up with the next one in line
+        while self.live is not None and self.live in self.done:
+            event = self.done.pop(self.live)
+            if self.live not in self.shown:
+                self._write(event["output"])
+            self._line(f"\n[{self.live}] done by {event['agent'] or 'nobody'} in {event['elapsed']}s")
+            waiting = sorted(set(self.buffers) | set(self.done))
+            self.live = None
+            if waiting:
+                self._start(waiting[0])
+
+    def _write(self, text: str):
+        self.out.write(text)
+        self.out.flush()
+
+    def _line(self, text: str):
+        self._write(text + "\n")
+
 class AgentShell(cmd.Cmd):
     """Command-line interface for managing AI agents.
     
@@ -17,6 +98,13 @@ class AgentShell(cmd.Cmd):
     intro = "Welcome to hive. Enter help or ? to list the commands"
     prompt = "agent-ants 🐜 > "
 
+    def preloop(self):
+        """Watch configs and prompts so edits apply to running agents."""
+        registry.start_watcher()
+
+    def postloop(self):
+        registry.stop_watcher()
+
     def do_queen(self, arg):
         """Create the Queen agent."""
         global queen
@@ -35,10 +123,11 @@ class AgentShell(cmd.Cmd):
         if not agents:
             print("[!] No agents available. Use 'create' to make some agents.")
             return
-        task = Task(content=arg)
-        results = queen.orchestrate(task, list(agents.values()))
-        for t, res in results.items():
-            logger.info(f"[+] {t}\n -> {res}")
+        task = Task(content=arg, priority=Priority.HIGH)
+        printer = OrchestrationPrinter()
+        # Printed as it happens: the plan, each subtask's answer as it is generated, then the summary
+        for event in queen.orchestrate_stream(task, list(agents.values())):
+            printer.handle(event)
             
     def do_create(self, arg):
         """Create a new agent with a specified name and role.
@@ -89,7 +178,7 @@ class AgentShell(cmd.Cmd):
         if not agent:
             logger.error(f"Agent '{name}' not found")
             return
-        task = Task(content=request)
+        task = Task(content=request, priority=Priority.HIGH)
         response = agent.think(task)
         logger.info(f"Agent '{name}' replied with:\n{response}")
 
@@ -105,6 +194,7 @@ class AgentShell(cmd.Cmd):
         Returns:
             bool: True to indicate the end of the command loop
         """
+        flush_agent_memory()
         logger.info("Exiting REPL... Bye, Kingo")
         return True
 
@@ -130,6 +220,96 @@ class AgentShell(cmd.Cmd):
         for idx, m in enumerate(agent.memory):
             logger.info(f"[{idx+1}] * {m['task']}\n -> {m['response']}")
 
+    def do_stats(self, arg):
+        """Display response reuse statistics of a specific agent.
+
+        Usage:
+            stats <name>
+
+        Args:
+            arg (str): The name of the agent whose statistics to display
+
+        Returns:
+            None
+        """
+        agent = agents.get(arg)
+        if not agent:
+            logger.error(f"Agent '{arg}' not found")
+            return
+        logger.info(f"[REUSE] {arg}: {agent.reuse_stats}")
+        logger.info(f"[LLM] {arg}: {agent.llm_session}")
+
+    def do_pool(self, arg):
+        """Display the Queen's specialist pool statistics.
+
+        Usage:
+            pool
+
+        Returns:
+            None
+        """
+        if not queen:
+            print("[!] Queen not initialized. Use 'queen' command first.")
+            return
+        stats = queen.pool.snapshot()
+        logger.info(f"[POOL] {queen.pool.stats}")
+        for task_type, counts in stats["pools"].items():
+            logger.info(f"[POOL] {task_type}: idle={counts['idle']} in_use={counts['in_use']}")
+
+    def do_trace(self, arg):
+        """Record orchestration spans and save them as a Chrome trace.
+
+        Usage:
+            trace on | off | save <path>
+
+        Args:
+            arg (str): The sub-command
+
+        Returns:
+            None
+        """
+        args = arg.split()
+        if args == ["on"]:
+            tracer.clear()
+            tracer.enable()
+            logger.info("[TRACE] Tracing enabled")
+        elif args == ["off"]:
+            tracer.disable()
+            logger.info("[TRACE] Tracing disabled")
+        elif len(args) == 2 and args[0] == "save":
+            path = tracer.export(args[1])
+            logger.info(f"[TRACE] {len(tracer.spans())} spans written to {path}")
+        else:
+            print("[!] Use: trace on | off | save <path>")
+
+    def do_profile(self, arg):
+        """Record how long each phase of the agents' work takes, and show where time goes.
+
+        Usage:
+            profile on | off | show [agent] | save <path>
+
+        Args:
+            arg (str): The sub-command
+
+        Returns:
+            None
+        """
+        args = arg.split()
+        if args == ["on"]:
+            profiler.clear()
+            profiler.enable()
+            logger.info("[PROFILE] Profiling enabled")
+        elif args == ["off"]:
+            profiler.disable()
+            logger.info("[PROFILE] Profiling disabled")
+        elif args[:1] == ["show"] and len(args) <= 2:
+            print(profiler.report(args[1] if len(args) == 2 else None), end="")
+        elif len(args) == 2 and args[0] == "save":
+            path = profiler.export(args[1])
+            logger.info(f"[PROFILE] Profile written to {path}; view it with 'agentctl profile {path}'")
+        else:
+            print("[!] Use: profile on | off | show [agent] | save <path>")
+
     def do_list(self, arg):
         """List all currently active agents.
         
@@ -178,6 +358,19 @@ class AgentShell(cmd.Cmd):
     def help_log(self):
         print("log <str: name>\n  Show all previous tasks/responses for the agent.")
 
+    def help_stats(self):
+        print("stats <str: name>\n  Show response reuse hit rate and latency saved, plus LLM calls and prompt tokens for the agent.")
+
+    def help_pool(self):
+        print("pool\n  Show hits, spawns and evictions of the Queen's specialist pool.")
+
+    def help_trace(self):
+        print("trace on | off | save <path>\n  Record spans and export them for chrome://tracing or Perfetto.")
+
+    def help_profile(self):
+        print("profile on | off | show [agent] | save <path>\n  Time each phase of the agents' work; show it per agent "
+              "or save it for 'agentctl profile'.")
+
     def help_list(self):
         print("list\n  List all agents registered in the swarm.")
 
@@ -196,7 +389,11 @@ class AgentShell(cmd.Cmd):
         print("  create <str: name> [--role <desc>]     Create a new agent with optional role")
         print("  assign <str: name> <task>              Assign a task to the agent")
         print("  log <str: name>                        Show agent's memory log")
+        print("  stats <str: name>                      Show agent's response reuse statistics")
+        print("  pool                              Show the Queen's specialist pool statistics")
         print("  list                              List all available agents in the swarm")
         print("  list_roles                        Show all available roles from mapping")
+        print("  trace on|off|save <path>          Record and export a Chrome trace")
+        print("  profile on|off|show [agent]|save <path>  Show where time goes per agent and phase")
         print("  exit                              Exit the application")
         print("\nType 'help <command>' for more info.")
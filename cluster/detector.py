@@ -0,0 +1,60 @@
+import math
+import os
+from collections import deque
+
+CLUSTER_PHI_THRESHOLD = float(os.getenv("CLUSTER_PHI_THRESHOLD", "8.0"))
+
+
+class PhiAccrualDetector:
+    """Phi-accrual failure detector for one monitored worker.
+
+    Instead of a fixed timeout it learns the distribution of the intervals
+    between heartbeats and reports phi, the suspicion that the worker is down:
+    phi = -log10(P(a heartbeat arrives even later than now)). A phi of 8 means
+    the silence had a one-in-a-hundred-million chance under normal operation,
+    so a worker whose heartbeats are naturally slow or jittery is given more
+    slack than one whose heartbeats are regular.
+    """
+    def __init__(self, threshold: float = CLUSTER_PHI_THRESHOLD, window: int = 100, min_std: float = 0.2,
+                 acceptable_pause: float = 1.0, first_interval: float = 1.0):
+        """Initialize a PhiAccrualDetector.
+
+        Args:
+            threshold (float, optional): Phi above which the worker is suspected. Defaults to CLUSTER_PHI_THRESHOLD.
+            window (int, optional): Heartbeat intervals kept. Defaults to 100.
+            min_std (float, optional): Floor for the standard deviation, in seconds, so perfectly
+                regular heartbeats don't make the detector trigger-happy. Defaults to 0.2.
+            acceptable_pause (float, optional): Seconds of extra silence always tolerated, e.g. for
+                garbage collection or a busy machine. Defaults to 1.0.
+            first_interval (float, optional): Expected interval before any has been observed. Defaults to 1.0.
+        """
+        self.threshold = threshold
+        self.min_std = min_std
+        self.acceptable_pause = acceptable_pause
+        self._intervals = deque([first_interval], maxlen=window)
+        self._last = None
+
+    def heartbeat(self, now: float) -> None:
+        """Record a heartbeat received at `now`."""
+        if self._last is not None:
+            self._intervals.append(now - self._last)
+        self._last = now
+
+    def reset(self, now: float) -> None:
+        """Start over after a restart, treating `now` as the last heartbeat."""
+        self._last = now
+
+    def phi(self, now: float) -> float:
+        """Return the suspicion level at `now`; 0 before the first heartbeat."""
+        if self._last is None:
+            return 0.0
+        n = len(self._intervals)
+        mean = sum(self._intervals) / n + self.acceptable_pause
+        std = max(math.sqrt(sum((x - mean + self.acceptable_pause) ** 2 for x in self._intervals) / n), self.min_std)
+        # Probability that the next heartbeat comes even later than this, under a normal distribution
+        p_later = 0.5 * math.erfc((now - self._last - mean) / (std * math.sqrt(2)))
+        return -math.log10(max(p_later, 1e-300))
+
+    def suspect(self, now: float) -> bool:
+        """Whether the worker should be considered down."""
+        return self.phi(now) > self.threshold
@@ -0,0 +1,125 @@
+import bisect
+import hashlib
+import os
+import zlib
+from typing import Hashable, Iterable
+
+CLUSTER_VNODES = int(os.getenv("CLUSTER_VNODES", "64"))
+CLUSTER_SLOTS = int(os.getenv("CLUSTER_SLOTS", "4096"))
+
+RING_SIZE = 1 << 32
+
+
+def _point(label: str) -> int:
+    """Position of a virtual node on the ring."""
+    return int.from_bytes(hashlib.md5(label.encode("utf-8")).digest()[:4], "big")
+
+
+class HashRing:
+    """Consistent hashing of keys (agent names) onto nodes (workers).
+
+    Each node is placed on a 32-bit ring at `vnodes` pseudo-random points, and
+    owns the arc up to each of them. Keys are hashed into one of `slots` fixed
+    slots spread evenly around the ring; the owner of every slot is resolved
+    once, whenever the membership changes, into a table. Looking up a key is
+    then a CRC and an index, and a node joining or leaving only changes the
+    owner of the slots on the arcs it gains or gives up, so only the keys in
+    those slots move.
+    """
+    def __init__(self, nodes: Iterable[Hashable] = (), vnodes: int = CLUSTER_VNODES, slots: int = CLUSTER_SLOTS):
+        """Initialize a HashRing.
+
+        Args:
+            nodes (Iterable[Hashable], optional): Initial nodes. Defaults to none.
+            vnodes (int, optional): Points per node; more points spread keys more evenly.
+                Defaults to CLUSTER_VNODES.
+            slots (int, optional): Fixed number of key slots. Defaults to CLUSTER_SLOTS.
+        """
+        self.vnodes = vnodes
+        self.slots = slots
+        self._nodes = []        # in the order they were added
+        self._points = []       # sorted ring positions
+        self._owners = []       # node at each position
+        self._table = [None] * slots
+        for node in nodes:
+            self._place(node)
+        self._rebuild()
+
+    @property
+    def nodes(self) -> list:
+        """Nodes on the ring, in the order they were added."""
+        return list(self._nodes)
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __contains__(self, node):
+        return node in self._nodes
+
+    def slot_of(self, key: str) -> int:
+        """Return the slot a key hashes to."""
+        return zlib.crc32(key.encode("utf-8")) % self.slots
+
+    def node_for(self, key: str):
+        """Return the node owning a key, or None if the ring is empty."""
+        return self._table[zlib.crc32(key.encode("utf-8")) % self.slots]
+
+    def add_node(self, node: Hashable) -> list[int]:
+        """Add a node.
+
+        Returns:
+            list[int]: Slots that changed owner (all now owned by the new node)
+        """
+        if node in self:
+            return []
+        self._place(node)
+        return self._rebuild()
+
+    def remove_node(self, node: Hashable) -> list[int]:
+        """Remove a node.
+
+        Returns:
+            list[int]: Slots that changed owner (all previously owned by the removed node)
+        """
+        if node not in self:
+            return []
+        keep = [i for i, owner in enumerate(self._owners) if owner != node]
+        self._points = [self._points[i] for i in keep]
+        self._owners = [self._owners[i] for i in keep]
+        self._nodes.remove(node)
+        return self._rebuild()
+
+    def copy(self) -> "HashRing":
+        ring = HashRing.__new__(HashRing)
+        ring.vnodes, ring.slots = self.vnodes, self.slots
+        ring._points, ring._owners = list(self._points), list(self._owners)
+        ring._nodes = list(self._nodes)
+        ring._table = list(self._table)
+        return ring
+
+    def distribution(self) -> dict:
+        """Return the share of slots owned by each node."""
+        counts = dict.fromkeys(self.nodes, 0)
+        for owner in self._table:
+            if owner is not None:
+                counts[owner] += 1
+        return {node: count / self.slots for node, count in counts.items()}
+
+    def _place(self, node: Hashable):
+        self._nodes.append(node)
+        for replica in range(self.vnodes):
+            point = _point(f"{node}#{replica}")
+            index = bisect.bisect_left(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+
+    def _rebuild(self) -> list[int]:
+        old, points, owners = self._table, self._points, self._owners
+        if points:
+            step = RING_SIZE // self.slots
+            # A slot belongs to the first point at or after its position, wrapping around
+            table = [owners[bisect.bisect_left(points, slot * step) % len(points)] for slot in range(self.slots)]
+        else:
+            table = [None] * self.slots
+        self._table = table
+        return [slot for slot in range(self.slots) if old[slot] != table[slot]]
@@ -0,0 +1,649 @@
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from uuid import uuid4
+from cluster.detector import PhiAccrualDetector
+from cluster.hashring import HashRing
+from cluster.protocols import (MessageType, ProtocolError, decode_frame, decode_json, decode_memory_sync, decode_task,
+                               encode_frame, encode_json, encode_memory_sync, encode_task, text)
+from core.llm import DeadlineExceeded, current_deadline
+from core.logger import LazyLogger
+
+logger = LazyLogger("cluster")
+
+CLUSTER_WORKERS = int(os.getenv("CLUSTER_WORKERS", str(os.cpu_count() or 2)))
+CLUSTER_WORKER_THREADS = int(os.getenv("CLUSTER_WORKER_THREADS", "4"))
+CLUSTER_HEARTBEAT_INTERVAL = float(os.getenv("CLUSTER_HEARTBEAT_INTERVAL", "1.0"))
+CLUSTER_HEARTBEAT_TIMEOUT = float(os.getenv("CLUSTER_HEARTBEAT_TIMEOUT", "5.0"))
+CLUSTER_LEASE_TIMEOUT = float(os.getenv("CLUSTER_LEASE_TIMEOUT", "10.0"))
+CLUSTER_MAX_REASSIGNMENTS = int(os.getenv("CLUSTER_MAX_REASSIGNMENTS", "2"))
+# "spawn" starts workers from a clean interpreter; forking a process that already runs
+# logging and memory threads can deadlock the child
+CLUSTER_START_METHOD = os.getenv("CLUSTER_START_METHOD", "spawn")
+
+
+class WorkerDied(RuntimeError):
+    """Raised for tasks lost with a worker process more times than they may be reassigned."""
+
+
+class RemoteError(RuntimeError):
+    """Raised for tasks that failed inside a worker process."""
+
+
+def _task_fields(task) -> dict:
+    return {"id": task.id, "content": task.content, "type": task.type, "difficulty": task.difficulty}
+
+
+def worker_main(worker_id: int, conn, threads: int) -> None:
+    """Entry point of a worker process: host a shard of agents and run their tasks.
+
+    Messages are cluster.protocols frames received on `conn`:
+        REGISTER    create an agent in this shard
+        TASK        run Agent.think, answered with a RESULT or ERROR carrying the request id;
+                    an agent runs its tasks one at a time, in the order they arrive
+        PING        answered with a PONG carrying the worker's stats and the request ids it
+                    holds, which renews their leases
+        EVICT       drop an agent, answered with a MEMORY_SYNC carrying its memory once the
+                    tasks it is already running here have finished
+        MEMORY_SYNC replace an agent's memory with the one it had on another worker
+        STOP        finish running tasks and exit
+    """
+    from agents.base import Agent
+    from core.swarm import Swarm
+    from core.task import Task
+    from memory.memory import flush_agent_memory
+
+    swarm = Swarm()
+    send_lock = threading.Lock()
+    held = set()        # request ids queued or running here
+    running = {}        # agent name -> future of the pool thread working through its tasks
+    waiting = {}        # agent name -> (request id, fields) of tasks queued behind its running one
+    waiting_lock = threading.Lock()
+    evictions = []
+
+    def send_frame(frame: bytes):
+        with send_lock:
+            conn.send_bytes(frame)
+
+    def send(type: MessageType, request_id: int, *fields):
+        send_frame(encode_frame(type, request_id, fields))
+
+    def evict(request_id: int, name: str, agent: Agent, tasks: list):
+        # Its memory is only final, and its file only ours to hand over, once no task can still write it
+        wait(tasks)
+        memory = list(agent.memory) if agent is not None else []
+        flush_agent_memory(name)
+        send_frame(encode_memory_sync(request_id, name, memory))
+
+    def run(request_id: int, agent: Agent, fields: dict):
+        # One pool thread works through an agent's tasks, so the agent never runs two at once
+        # and tasks queued for it do not hold threads other agents could use
+        while True:
+            try:
+                task = Task(content=fields["content"], task_type=fields["type"], difficulty=fields["difficulty"])
+                task.id = fields["id"]
+                send(MessageType.RESULT, request_id, agent.think(task))
+            except Exception as e:
+                send(MessageType.ERROR, request_id, f"{type(e).__name__}: {e}")
+            finally:
+                held.discard(request_id)
+            with waiting_lock:
+                if not waiting[agent.name]:
+                    del waiting[agent.name]
+                    return
+                request_id, fields = waiting[agent.name].popleft()
+
+    pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix=f"worker{worker_id}")
+    try:
+        while True:
+            try:
+                frame = decode_frame(conn.recv_bytes())
+            except (EOFError, OSError):
+                break
+            except ProtocolError as e:
+                logger.warning(f"[CLUSTER] Worker {worker_id} dropped a malformed frame: {e}")
+                continue
+            if frame.type == MessageType.TASK:
+                # Resolve the agent now: a task sent before an EVICT still runs here
+                try:
+                    name, fields = decode_task(frame)
+                except ValueError as e:
+                    send(MessageType.ERROR, frame.request_id, f"{type(e).__name__}: {e}")
+                    continue
+                agent = swarm.agents.get(name)
+                if agent is None:
+                    send(MessageType.ERROR, frame.request_id, f"KeyError: agent '{name}' is not on this worker")
+                else:
+                    held.add(frame.request_id)
+                    with waiting_lock:
+                        queue = waiting.get(name)
+                        if queue is not None:
+                            queue.append((frame.request_id, fields))
+                            continue
+                        waiting[name] = deque()
+                    running[name] = pool.submit(run, frame.request_id, agent, fields)
+            elif frame.type == MessageType.PING:
+                leases = list(held)
+                send(MessageType.PONG, frame.request_id,
+                     encode_json({"agents": len(swarm.agents), "active": len(leases), "pid": os.getpid(),
+                                  "leases": leases}))
+            elif frame.type == MessageType.REGISTER:
+                name, role, config = frame.fields()
+                name = text(name)
+                if name not in swarm.agents:
+                    swarm.add(Agent(name=name, role=text(role), config=decode_json(config)))
+            elif frame.type == MessageType.EVICT:
+                name = text(frame.fields()[0])
+                agent = swarm.agents.pop(name, None)      # later tasks for it are refused
+                # Wait off this loop, so heartbeats keep renewing the leases of the tasks waited for
+                thread = threading.Thread(target=evict, name=f"evict-{name}", args=(
+                    frame.request_id, name, agent, [running.pop(name)] if name in running else []))
+                thread.start()
+                evictions[:] = [t for t in evictions if t.is_alive()] + [thread]
+            elif frame.type == MessageType.MEMORY_SYNC:
+                name, memory = decode_memory_sync(frame)
+                if name in swarm.agents:
+                    swarm.agents[name].replace_memory(memory)
+            elif frame.type == MessageType.STOP:
+                break
+    finally:
+        pool.shutdown(wait=True)
+        for thread in evictions:
+            thread.join()
+        flush_agent_memory()
+        conn.close()
+
+
+class WorkerHandle:
+    """The manager's side of one worker process."""
+    def __init__(self, index: int):
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.generation = 0         # Bumped on every restart, so stale reader threads stop
+        self.pending = {}           # request id -> Lease of a task, or Future of a control request
+        self.detector = None
+        self.last_pong = 0.0
+        self.restarts = 0
+        self.stats = {}
+        self.send_lock = threading.Lock()
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+
+class Lease:
+    """A task handed to a worker.
+
+    The worker's heartbeats renew the lease while it holds the task. A lease
+    that expires, or whose worker dies, is dispatched again as a new attempt
+    with its own request id. Only the current attempt settles the task:
+    responses to superseded attempts are discarded, even if they arrive first.
+    """
+    __slots__ = ("task", "name", "key", "future", "worker", "request_id", "expires", "reassignments")
+
+    def __init__(self, task, name: str):
+        self.task = task
+        self.name = name
+        self.key = (task.id, name)      # idempotency key
+        self.future = Future()
+        self.worker = None
+        self.request_id = None      # of the current attempt
+        self.expires = 0.0
+        self.reassignments = 0
+
+
+class RemoteAgent:
+    """Stand-in for an agent hosted by a worker process.
+
+    It has the attributes and methods the Queen uses, so `Queen.orchestrate`
+    works unchanged on `ClusterManager.agents()`; `think` runs in the worker.
+    """
+    def __init__(self, cluster: "ClusterManager", name: str, profile):
+        self.cluster = cluster
+        self.name = name
+        self._profile = profile
+        self.busy = False
+        self.spawned = False
+        self.id = str(uuid4())
+
+    @property
+    def role(self) -> str:
+        return self._profile.role
+
+    @property
+    def task_type(self) -> str:
+        return self._profile.task_type
+
+    @property
+    def llm_config(self):
+        return self._profile.llm_config
+
+    def receive_task(self, task_type: str = None) -> str:
+        expected_type = self.task_type or "generic"
+        if (task_type or expected_type) != expected_type or self.busy:
+            return "Rejected"
+        return "Accepted"
+
+    def think(self, task, timeout: float = None) -> str:
+        """Run a task on the agent's worker and wait for the response.
+
+        Args:
+            task (Task): The task to run
+            timeout (float, optional): Seconds to wait. Defaults to the time left before the
+                deadline of the current context, if any.
+
+        Raises:
+            DeadlineExceeded: If the response does not arrive in time
+        """
+        if timeout is None and current_deadline() is not None:
+            timeout = max(current_deadline() - time.monotonic(), 0.0)
+        self.busy = True
+        try:
+            return self.cluster.submit(self.name, task).result(timeout)
+        except TimeoutError:
+            raise DeadlineExceeded(f"No response from {self.name} within {timeout:.1f}s")
+        finally:
+            self.busy = False
+
+
+class ClusterManager:
+    """Run agents in a pool of local worker processes.
+
+    Every agent lives in exactly one worker, placed by a consistent-hash ring
+    over its name, so its memory and prompt are only loaded there. Adding or
+    removing a worker moves only the agents whose ring slots change owner,
+    each with its memory. Tasks are sent over a pipe and answered
+    asynchronously; each worker runs `threads` tasks at once.
+
+    Every task runs under a lease keyed by its Task.id, renewed by the
+    heartbeats of the worker holding it. A monitor thread pings the workers,
+    restarts any that died or that a phi-accrual detector suspects, and
+    dispatches again the tasks whose worker died or whose lease expired, up to
+    `max_reassignments` times. Submitting a Task.id that the agent already has
+    in flight returns the same future, and only the first completion counts.
+    """
+    def __init__(self, workers: int = CLUSTER_WORKERS, threads: int = CLUSTER_WORKER_THREADS,
+                 heartbeat_interval: float = CLUSTER_HEARTBEAT_INTERVAL,
+                 heartbeat_timeout: float = CLUSTER_HEARTBEAT_TIMEOUT, lease_timeout: float = CLUSTER_LEASE_TIMEOUT,
+                 max_reassignments: int = CLUSTER_MAX_REASSIGNMENTS, start_method: str = CLUSTER_START_METHOD):
+        """Initialize a ClusterManager. Call `start()` to launch the workers.
+
+        Args:
+            workers (int, optional): Worker processes. Defaults to CLUSTER_WORKERS (the CPU count).
+            threads (int, optional): Tasks run concurrently by each worker. Defaults to CLUSTER_WORKER_THREADS.
+            heartbeat_interval (float, optional): Seconds between pings. Defaults to CLUSTER_HEARTBEAT_INTERVAL.
+            heartbeat_timeout (float, optional): Seconds without a pong after which a worker is restarted
+                even if the failure detector does not suspect it yet. Defaults to CLUSTER_HEARTBEAT_TIMEOUT.
+            lease_timeout (float, optional): Seconds a task's lease lasts without being renewed by a
+                heartbeat; keep it well above the heartbeat interval. Defaults to CLUSTER_LEASE_TIMEOUT.
+            max_reassignments (int, optional): Times a lost task is dispatched again before it fails
+                with WorkerDied. Defaults to CLUSTER_MAX_REASSIGNMENTS.
+            start_method (str, optional): multiprocessing start method. Defaults to CLUSTER_START_METHOD.
+        """
+        self.threads = threads
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.lease_timeout = lease_timeout
+        self.max_reassignments = max_reassignments
+        self._context = multiprocessing.get_context(start_method)
+        self._workers = {i: WorkerHandle(i) for i in range(workers)}
+        self._worker_ids = itertools.count(workers)
+        self._ring = HashRing(self._workers)
+        self._agents = {}           # name -> RemoteAgent
+        self._moving = {}           # name -> Event set once the agent has moved to its new worker
+        self._leases = {}           # (task id, agent name) -> Lease
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._lease_lock = threading.Lock()
+        self._membership = threading.Lock()
+        self._stop = threading.Event()
+        self._monitor = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self) -> "ClusterManager":
+        """Launch the worker processes and the health monitor."""
+        for worker in self._workers.values():
+            self._launch(worker)
+        self._stop.clear()
+        self._monitor = threading.Thread(target=self._watch, name="cluster-monitor", daemon=True)
+        self._monitor.start()
+        logger.info(f"[CLUSTER] Started {len(self._workers)} workers")
+        return self
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Stop the monitor and the workers, letting running tasks finish."""
+        self._stop.set()
+        if self._monitor is not None:
+            self._monitor.join()
+            self._monitor = None
+        for worker in self._workers.values():
+            worker.generation += 1
+            try:
+                with worker.send_lock:
+                    worker.conn.send_bytes(encode_frame(MessageType.STOP, 0))
+            except (OSError, AttributeError):
+                pass
+        for worker in self._workers.values():
+            if worker.process is not None:
+                worker.process.join(timeout)
+                if worker.process.is_alive():
+                    worker.process.terminate()
+            self._fail_pending(worker, WorkerDied("Cluster closed"))
+
+    def worker_for(self, name: str) -> int:
+        """Return the id of the worker hosting an agent, in constant time."""
+        return self._ring.node_for(name)
+
+    def add_worker(self) -> int:
+        """Start one more worker and move to it the agents it takes over on the ring.
+
+        Returns:
+            int: Id of the new worker
+        """
+        with self._membership:
+            worker = WorkerHandle(next(self._worker_ids))
+            self._workers[worker.index] = worker
+            self._launch(worker)
+            ring = self._ring.copy()
+            ring.add_node(worker.index)
+            moved = self._rebalance(ring)
+        logger.info(f"[CLUSTER] Added worker {worker.index}, moved {len(moved)} agents")
+        return worker.index
+
+    def remove_worker(self, index: int, timeout: float = 10.0) -> None:
+        """Move a worker's agents to the rest of the ring, then stop it once its running tasks finish.
+
+        Args:
+            index (int): Worker id
+            timeout (float, optional): Seconds to wait for the worker to exit. Defaults to 10.
+
+        Raises:
+            KeyError: If there is no such worker
+            ValueError: If it is the last worker
+        """
+        with self._membership:
+            if index not in self._workers:
+                raise KeyError(f"No worker {index}")
+            if len(self._workers) == 1:
+                raise ValueError("Cannot remove the last worker")
+            ring = self._ring.copy()
+            ring.remove_node(index)
+            moved = self._rebalance(ring)
+            worker = self._workers.pop(index)
+        try:
+            with worker.send_lock:
+                worker.conn.send_bytes(encode_frame(MessageType.STOP, 0))
+        except OSError:
+            pass
+        worker.process.join(timeout)
+        if worker.process.is_alive():
+            worker.process.terminate()
+        worker.generation += 1
+        for lease in self._take_pending(worker, WorkerDied(f"Worker {index} was removed")):
+            self._redispatch(lease, f"worker {index} was removed")
+        logger.info(f"[CLUSTER] Removed worker {index}, moved {len(moved)} agents")
+
+    def add_agent(self, name: str, role: str = "assistant", config: dict = None) -> RemoteAgent:
+        """Create an agent on its worker, or return the existing one.
+
+        Args:
+            name (str): Agent name
+            role (str, optional): Agent role. Defaults to "assistant".
+            config (dict, optional): Agent configuration. If not provided, it is loaded by name.
+
+        Returns:
+            RemoteAgent: Handle for the agent
+        """
+        from agents.base import Agent
+
+        with self._membership:      # not while the ring changes
+            with self._lock:
+                if name in self._agents:
+                    return self._agents[name]
+                profile = Agent(name=name, role=role, config=config)._profile
+                agent = self._agents[name] = RemoteAgent(self, name, profile)
+            self._register(self._workers[self.worker_for(name)], agent)
+        return agent
+
+    def agents(self) -> list[RemoteAgent]:
+        """Return handles for all agents in the cluster."""
+        with self._lock:
+            return list(self._agents.values())
+
+    def submit(self, name: str, task) -> Future:
+        """Send a task to the worker hosting an agent.
+
+        Args:
+            name (str): Agent name, added with `add_agent`
+            task (Task): The task to run. Its `reassignments` counts the times it was dispatched again.
+
+        Returns:
+            Future: Resolves to the agent's response, or fails with RemoteError or WorkerDied.
+                The same future is returned while the agent has a task with the same id in flight.
+        """
+        if name not in self._agents:
+            self.add_agent(name)
+        with self._lease_lock:
+            lease = self._leases.get((task.id, name))
+            if lease is not None:
+                return lease.future
+            lease = Lease(task, name)
+            self._leases[lease.key] = lease
+        self._dispatch(lease)
+        return lease.future
+
+    def stats(self) -> list[dict]:
+        """Return the state of every worker: pid, liveness, pending tasks, restarts, suspicion and last pong."""
+        now = time.monotonic()
+        return [{"worker": w.index, "pid": w.process.pid if w.process else None, "alive": w.alive,
+                 "pending": len(w.pending), "restarts": w.restarts,
+                 "phi": round(w.detector.phi(now), 2) if w.detector else 0.0, **w.stats}
+                for w in self._workers.values()]
+
+    def _dispatch(self, lease: Lease):
+        name = lease.name
+        request_id = next(self._ids)
+        frame = encode_task(request_id, name, _task_fields(lease.task))
+        while True:
+            moving = self._moving.get(name)
+            if moving is not None:
+                moving.wait()
+            worker = self._workers[self.worker_for(name)]
+            with worker.send_lock:
+                # Checked under the lock the eviction is sent with: a task sent first still runs on the old worker
+                if name in self._moving:
+                    continue
+                worker.pending[request_id] = lease
+                lease.worker, lease.request_id = worker.index, request_id
+                lease.expires = time.monotonic() + self.lease_timeout
+                try:
+                    worker.conn.send_bytes(frame)
+                except OSError:
+                    worker.pending.pop(request_id, None)
+                    lease.expires = 0.0     # the monitor dispatches it again once the worker is back
+            return
+
+    def _settle(self, lease: Lease, result: str = None, error: Exception = None):
+        """Complete a task with its first result; later ones are duplicates."""
+        with self._lease_lock:
+            first = self._leases.get(lease.key) is lease
+            if first:
+                del self._leases[lease.key]
+        if not first:
+            logger.debug(f"[CLUSTER] Discarded duplicate completion of task {lease.task.id}")
+        elif error is not None:
+            lease.future.set_exception(error)
+        else:
+            lease.future.set_result(result)
+
+    def _redispatch(self, lease: Lease, reason: str):
+        with self._lease_lock:
+            if self._leases.get(lease.key) is not lease:
+                return      # already settled
+        if lease.reassignments >= self.max_reassignments:
+            self._settle(lease, error=WorkerDied(
+                f"Task {lease.task.id} lost after {lease.reassignments} reassignments: {reason}"))
+            return
+        lease.reassignments += 1
+        lease.task.reassignments = lease.reassignments
+        logger.warning(f"[CLUSTER] Reassigning task {lease.task.id} of {lease.name} "
+                       f"({lease.reassignments}/{self.max_reassignments}): {reason}")
+        self._dispatch(lease)
+
+    def _launch(self, worker: WorkerHandle):
+        parent, child = self._context.Pipe()
+        process = self._context.Process(target=worker_main, args=(worker.index, child, self.threads),
+                                        name=f"agent-worker-{worker.index}", daemon=True)
+        process.start()
+        child.close()
+        worker.generation += 1
+        worker.process, worker.conn = process, parent
+        worker.last_pong = time.monotonic()
+        worker.detector = PhiAccrualDetector(first_interval=self.heartbeat_interval,
+                                             acceptable_pause=self.heartbeat_interval)
+        threading.Thread(target=self._read, args=(worker, worker.generation), daemon=True,
+                         name=f"cluster-reader-{worker.index}").start()
+        for agent in self.agents():
+            if self.worker_for(agent.name) == worker.index:
+                self._register(worker, agent)
+
+    def _rebalance(self, ring: HashRing) -> list[str]:
+        """Switch to a new ring, moving every agent whose worker changes together with its memory.
+
+        Tasks for a moving agent wait until it has arrived; tasks already sent
+        to the old worker finish there before its memory is taken.
+        """
+        moved = [(agent, self._ring.node_for(agent.name), ring.node_for(agent.name)) for agent in self.agents()]
+        moved = [(agent, source, target) for agent, source, target in moved if source != target]
+        for agent, _, _ in moved:
+            self._moving[agent.name] = threading.Event()
+        try:
+            for agent, source, target in moved:
+                try:
+                    # Answered once the agent's running tasks finish there; fails if that worker dies
+                    memory = self._request(self._workers[source], MessageType.EVICT, (agent.name,)).result()
+                except Exception as e:
+                    logger.warning(f"[CLUSTER] Could not fetch the memory of {agent.name}: {e}")
+                    memory = None       # the new worker loads it from disk
+                self._register(self._workers[target], agent)
+                if memory is not None:
+                    with self._workers[target].send_lock:
+                        self._workers[target].conn.send_bytes(encode_memory_sync(0, agent.name, memory))
+            self._ring = ring
+        finally:
+            for agent, _, _ in moved:
+                self._moving.pop(agent.name).set()
+        return [agent.name for agent, _, _ in moved]
+
+    def _request(self, worker: WorkerHandle, type: MessageType, fields=()) -> Future:
+        future = Future()
+        request_id = next(self._ids)
+        with worker.send_lock:
+            worker.pending[request_id] = future
+            worker.conn.send_bytes(encode_frame(type, request_id, fields))
+        return future
+
+    def _register(self, worker: WorkerHandle, agent: RemoteAgent):
+        frame = encode_frame(MessageType.REGISTER, 0, (agent.name, agent.role, encode_json(agent._profile.to_config())))
+        with worker.send_lock:
+            worker.conn.send_bytes(frame)
+
+    def _read(self, worker: WorkerHandle, generation: int):
+        conn = worker.conn
+        while worker.generation == generation:
+            try:
+                frame = decode_frame(conn.recv_bytes())
+            except (EOFError, OSError):
+                break
+            except ProtocolError as e:
+                logger.warning(f"[CLUSTER] Dropped a malformed frame from worker {worker.index}: {e}")
+                continue
+            if frame.type == MessageType.MEMORY_SYNC:
+                future = worker.pending.pop(frame.request_id, None)
+                if future is not None:
+                    future.set_result(decode_memory_sync(frame)[1])
+            elif frame.type in (MessageType.RESULT, MessageType.ERROR):
+                lease = worker.pending.pop(frame.request_id, None)
+                if lease is not None and lease.request_id != frame.request_id:
+                    logger.debug(f"[CLUSTER] Discarded the response of a superseded attempt at task {lease.task.id}")
+                elif lease is not None:
+                    (payload,) = frame.fields()
+                    if frame.type == MessageType.RESULT:
+                        self._settle(lease, result=text(payload))
+                    else:
+                        self._settle(lease, error=RemoteError(text(payload)))
+            elif frame.type == MessageType.PONG:
+                now = worker.last_pong = time.monotonic()
+                worker.detector.heartbeat(now)
+                stats = decode_json(frame.fields()[0])
+                for request_id in stats.pop("leases", ()):
+                    lease = worker.pending.get(request_id)
+                    if isinstance(lease, Lease) and lease.request_id == request_id:
+                        lease.expires = now + self.lease_timeout
+                worker.stats = stats
+
+    def _take_pending(self, worker: WorkerHandle, error: Exception) -> list[Lease]:
+        """Detach everything in flight on a worker: fail its control requests and return its task leases."""
+        with worker.send_lock:
+            pending, worker.pending = worker.pending, {}
+        leases = []
+        for request_id, entry in pending.items():
+            if isinstance(entry, Lease):
+                if entry.request_id == request_id:      # superseded attempts were dispatched again already
+                    leases.append(entry)
+            elif not entry.done():
+                entry.set_exception(error)
+        return leases
+
+    def _fail_pending(self, worker: WorkerHandle, error: Exception):
+        for lease in self._take_pending(worker, error):
+            self._settle(lease, error=error)
+
+    def _restart(self, worker: WorkerHandle, reason: str):
+        logger.warning(f"[CLUSTER] Restarting worker {worker.index}: {reason}")
+        with worker.send_lock:
+            worker.generation += 1      # detach the old reader before anything else
+        if worker.process.is_alive():
+            worker.process.kill()
+        worker.process.join(1.0)
+        worker.conn.close()
+        leases = self._take_pending(worker, WorkerDied(f"Worker {worker.index} died: {reason}"))
+        worker.restarts += 1
+        self._launch(worker)
+        for lease in leases:
+            self._redispatch(lease, f"worker {worker.index} died: {reason}")
+
+    def _watch(self):
+        seq = itertools.count()
+        while not self._stop.wait(self.heartbeat_interval):
+            now = time.monotonic()
+            for worker in list(self._workers.values()):
+                if worker.index not in self._workers:   # removed meanwhile
+                    continue
+                if not worker.alive:
+                    self._restart(worker, f"exit code {worker.process.exitcode}")
+                elif now - worker.last_pong > self.heartbeat_timeout:
+                    self._restart(worker, f"no heartbeat for {now - worker.last_pong:.1f}s")
+                elif worker.detector.suspect(now):
+                    self._restart(worker, f"suspected, phi={worker.detector.phi(now):.1f}")
+                else:
+                    try:
+                        with worker.send_lock:
+                            worker.conn.send_bytes(encode_frame(MessageType.PING, next(seq)))
+                    except OSError:
+                        self._restart(worker, "pipe closed")
+            with self._lease_lock:
+                expired = [lease for lease in self._leases.values() if lease.expires < now]
+            for lease in expired:
+                self._redispatch(lease, f"lease expired on worker {lease.worker}")
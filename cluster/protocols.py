@@ -0,0 +1,322 @@
+"""Binary wire protocol between a Queen and worker nodes.
+
+Every message is a frame: a fixed 17-byte header followed by the payload.
+
+    magic     2s   b"AN"
+    version   B    PROTOCOL_VERSION
+    type      B    MessageType
+    flags     B    per-type flags
+    request   Q    request id; a response carries the id of its request
+    length    I    payload length in bytes
+
+Payloads are a sequence of fields, each a 4-byte length followed by the raw
+bytes (UTF-8 for text, JSON or zlib-compressed JSON for structured data), so
+no field needs escaping and any field can be sliced out of the received
+buffer with a memoryview instead of being copied.
+
+Frames travel over multiprocessing pipes (`encode_frame` / `decode_frame`) or
+over TCP and Unix domain sockets (`serve` / `connect`), where a connection
+pipelines any number of in-flight requests and matches responses by id.
+"""
+import asyncio
+import itertools
+import json
+import struct
+import uuid
+import zlib
+from enum import IntEnum
+from typing import Awaitable, Callable, Iterable
+from urllib.parse import urlsplit
+
+MAGIC = b"AN"
+PROTOCOL_VERSION = 1
+HEADER = struct.Struct("!2sBBBQI")
+FIELD_LENGTH = struct.Struct("!I")
+MAX_PAYLOAD = 64 * 1024 * 1024
+
+FLAG_TEXT_ID = 1        # TASK: the task id is not a UUID and is sent as text
+
+
+class MessageType(IntEnum):
+    TASK = 1            # agent, task id, type, difficulty, content
+    RESULT = 2          # output
+    ERROR = 3           # error message
+    PING = 4            # (empty)
+    PONG = 5            # stats as JSON
+    REGISTER = 6        # agent, role, config as JSON
+    MEMORY_SYNC = 7     # agent, memory entries as zlib-compressed JSON
+    STOP = 8            # (empty)
+    EVICT = 9           # agent; answered with its MEMORY_SYNC
+
+
+class ProtocolError(ValueError):
+    """Raised for frames that are malformed or from another protocol version."""
+
+
+class Frame:
+    """A decoded frame. `payload` is a memoryview into the received buffer."""
+    __slots__ = ("type", "flags", "request_id", "payload")
+
+    def __init__(self, type: MessageType, flags: int, request_id: int, payload: memoryview):
+        self.type = type
+        self.flags = flags
+        self.request_id = request_id
+        self.payload = payload
+
+    def fields(self) -> list[memoryview]:
+        """Split the payload into its fields without copying."""
+        return split_fields(self.payload)
+
+    def __repr__(self):
+        return f"Frame({self.type.name}, request_id={self.request_id}, {len(self.payload)} bytes)"
+
+
+def pack_fields(fields: Iterable) -> list[bytes]:
+    """Encode fields (str, bytes or memoryview) as length-prefixed chunks, ready for writelines."""
+    chunks = []
+    for field in fields:
+        data = field.encode("utf-8") if isinstance(field, str) else field
+        chunks.append(FIELD_LENGTH.pack(len(data)))
+        chunks.append(data)
+    return chunks
+
+
+def split_fields(payload: memoryview) -> list[memoryview]:
+    """Slice a payload into its length-prefixed fields."""
+    fields, offset = [], 0
+    while offset < len(payload):
+        if offset + FIELD_LENGTH.size > len(payload):
+            raise ProtocolError("Truncated field length")
+        (length,) = FIELD_LENGTH.unpack_from(payload, offset)
+        offset += FIELD_LENGTH.size
+        if offset + length > len(payload):
+            raise ProtocolError("Field runs past the end of the payload")
+        fields.append(payload[offset:offset + length])
+        offset += length
+    return fields
+
+
+def text(field: memoryview) -> str:
+    """Decode a UTF-8 field straight from the buffer."""
+    return str(field, "utf-8")
+
+
+def frame_chunks(type: MessageType, request_id: int, fields: Iterable = (), flags: int = 0) -> list:
+    """Return the header and payload chunks of a frame, for writing without joining them."""
+    chunks = pack_fields(fields)
+    length = sum(len(chunk) for chunk in chunks)
+    if length > MAX_PAYLOAD:
+        raise ProtocolError(f"Payload of {length} bytes exceeds {MAX_PAYLOAD}")
+    return [HEADER.pack(MAGIC, PROTOCOL_VERSION, type, flags, request_id, length), *chunks]
+
+
+def encode_frame(type: MessageType, request_id: int, fields: Iterable = (), flags: int = 0) -> bytes:
+    """Encode a complete frame as one buffer, e.g. for Connection.send_bytes."""
+    return b"".join(frame_chunks(type, request_id, fields, flags))
+
+
+def parse_header(header) -> tuple[MessageType, int, int, int]:
+    """Validate a frame header and return (type, flags, request id, payload length)."""
+    magic, version, type, flags, request_id, length = HEADER.unpack_from(header)
+    if magic != MAGIC:
+        raise ProtocolError("Not an agent-ants frame")
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f"Unsupported protocol version {version}")
+    if length > MAX_PAYLOAD:
+        raise ProtocolError(f"Payload of {length} bytes exceeds {MAX_PAYLOAD}")
+    try:
+        return MessageType(type), flags, request_id, length
+    except ValueError:
+        raise ProtocolError(f"Unknown message type {type}")
+
+
+def decode_frame(data) -> Frame:
+    """Decode one complete frame from a buffer, without copying the payload."""
+    view = memoryview(data)
+    if len(view) < HEADER.size:
+        raise ProtocolError("Truncated frame header")
+    type, flags, request_id, length = parse_header(view)
+    if len(view) != HEADER.size + length:
+        raise ProtocolError(f"Frame length {len(view) - HEADER.size} does not match header {length}")
+    return Frame(type, flags, request_id, view[HEADER.size:])
+
+
+# Typed messages
+
+def encode_task(request_id: int, agent: str, task: dict) -> bytes:
+    """Encode a TASK frame from an agent name and {"id", "content", "type", "difficulty"}."""
+    flags, task_id = 0, task["id"]
+    try:
+        task_id = uuid.UUID(task_id).bytes
+    except (ValueError, TypeError, AttributeError):
+        flags, task_id = FLAG_TEXT_ID, str(task_id)
+    return encode_frame(MessageType.TASK, request_id,
+                        (agent, task_id, task["type"] or "", task["difficulty"] or "", task["content"]), flags)
+
+
+def decode_task(frame: Frame) -> tuple[str, dict]:
+    """Return (agent name, task fields) from a TASK frame."""
+    agent, task_id, task_type, difficulty, content = frame.fields()
+    task_id = text(task_id) if frame.flags & FLAG_TEXT_ID else str(uuid.UUID(bytes=bytes(task_id)))
+    return text(agent), {"id": task_id, "content": text(content), "type": text(task_type) or None,
+                         "difficulty": text(difficulty) or None}
+
+
+def encode_json(value) -> bytes:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def decode_json(field: memoryview):
+    return json.loads(text(field))
+
+
+def encode_memory_sync(request_id: int, agent: str, entries: list) -> bytes:
+    """Encode a MEMORY_SYNC frame carrying an agent's memory entries."""
+    return encode_frame(MessageType.MEMORY_SYNC, request_id, (agent, zlib.compress(encode_json(entries))))
+
+
+def decode_memory_sync(frame: Frame) -> tuple[str, list]:
+    agent, entries = frame.fields()
+    return text(agent), json.loads(zlib.decompress(entries))
+
+
+# Sockets
+
+def parse_address(address: str) -> tuple[str, str | tuple[str, int]]:
+    """Split "tcp://host:port" or "unix:///path/to.sock" into a (scheme, target) pair."""
+    url = urlsplit(address)
+    if url.scheme == "unix":
+        return "unix", url.path
+    if url.scheme == "tcp" and url.hostname and url.port is not None:
+        return "tcp", (url.hostname, url.port)
+    raise ValueError(f"Address must be tcp://host:port or unix:///path, got '{address}'")
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Frame:
+    """Read one frame from a stream.
+
+    Raises:
+        asyncio.IncompleteReadError: If the peer closed the connection
+    """
+    header = await reader.readexactly(HEADER.size)
+    type, flags, request_id, length = parse_header(header)
+    payload = await reader.readexactly(length) if length else b""
+    return Frame(type, flags, request_id, memoryview(payload))
+
+
+Handler = Callable[[Frame], Awaitable[tuple[MessageType, Iterable]]]
+
+
+async def serve(address: str, handler: Handler) -> asyncio.AbstractServer:
+    """Serve frames on a TCP or Unix socket address.
+
+    Each request runs as its own task, so a slow request does not hold up the
+    ones pipelined behind it; responses are written as they complete, carrying
+    the request's id. `handler(frame)` returns the (type, fields) of the response.
+    """
+    async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        write_lock = asyncio.Lock()
+        tasks = set()
+
+        async def respond(frame: Frame):
+            try:
+                type, fields = await handler(frame)
+            except Exception as e:
+                type, fields = MessageType.ERROR, (f"{e.__class__.__name__}: {e}",)
+            async with write_lock:
+                writer.writelines(frame_chunks(type, frame.request_id, fields))
+                await writer.drain()
+
+        try:
+            while True:
+                frame = await read_frame(reader)
+                task = asyncio.create_task(respond(frame))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError, ProtocolError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    scheme, target = parse_address(address)
+    if scheme == "unix":
+        return await asyncio.start_unix_server(handle_connection, target)
+    return await asyncio.start_server(handle_connection, *target)
+
+
+def server_address(server: asyncio.AbstractServer) -> str:
+    """Return the address a `serve` server listens on, e.g. after binding port 0."""
+    name = server.sockets[0].getsockname()
+    if isinstance(name, str):
+        return f"unix://{name}"
+    return f"tcp://{name[0]}:{name[1]}"
+
+
+class ProtocolClient:
+    """A pipelined client connection: many requests in flight, answered in any order."""
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count(1)
+        self._pending = {}      # request id -> Future
+        self._closed = None     # Set to the error new requests fail with once the connection is gone
+        self._receiver = asyncio.create_task(self._receive())
+
+    async def request(self, type: MessageType, fields: Iterable = (), flags: int = 0) -> Frame:
+        """Send a request and wait for the frame that answers it.
+
+        Raises:
+            ConnectionError: If the connection is closed or lost, before or while waiting
+        """
+        if self._closed is not None:
+            raise ConnectionError(*self._closed.args)
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            self._writer.writelines(frame_chunks(type, request_id, fields, flags))
+            await self._writer.drain()
+        except BaseException:
+            self._pending.pop(request_id, None)
+            raise
+        return await future
+
+    async def close(self) -> None:
+        self._fail(ConnectionError("Connection closed"))
+        self._writer.close()
+        self._receiver.cancel()
+        try:
+            await self._writer.wait_closed()
+        except ConnectionError:
+            pass
+
+    async def _receive(self):
+        try:
+            while True:
+                frame = await read_frame(self._reader)
+                future = self._pending.pop(frame.request_id, None)
+                if future is not None and not future.done():
+                    future.set_result(frame)
+        except (asyncio.IncompleteReadError, ConnectionError, ProtocolError) as e:
+            self._fail(ConnectionError(f"Connection lost: {e}"))
+
+    def _fail(self, error: ConnectionError):
+        """Fail the requests in flight and every later one with `error`."""
+        if self._closed is None:
+            self._closed = error
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(self._closed)
+        self._pending.clear()
+
+
+async def connect(address: str) -> ProtocolClient:
+    """Open a pipelined connection to a `serve` endpoint."""
+    scheme, target = parse_address(address)
+    if scheme == "unix":
+        reader, writer = await asyncio.open_unix_connection(target)
+    else:
+        reader, writer = await asyncio.open_connection(*target)
+    return ProtocolClient(reader, writer)
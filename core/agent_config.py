@@ -1,7 +1,8 @@
-import yaml
+import os
 from pathlib import Path
-from core.logger import get_logger
-logger = get_logger("agent_config")
+from core.logger import LazyLogger
+from core.registry import registry, freeze
+logger = LazyLogger("agent_config")
 
 
 CONFIGS_PATH = Path(__file__).parent.parent / "agents" / "configs"
@@ -19,6 +20,8 @@ def read_yaml(file_path: str) -> dict:
     Returns:
         dict: The content of the YAML file as a dictionary
     """
+    import yaml
+
     try:
         with open(file_path, "r") as f:
             return yaml.safe_load(f) or {}
@@ -36,6 +39,10 @@ def load_agent_config(name: str) -> dict:
     This function attempts to load an agent's configuration from a YAML file
     located in the 'agents' directory. If the file doesn't exist or there's
     an error loading it, a default configuration is returned.
+
+    Parsed files come from the shared registry, so the returned configuration
+    is a read-only mapping shared by every agent with the same name, and it is
+    only rebuilt when the agent's file or the default file changes.
     
     Args:
         name (str): The name of the agent whose configuration to load
@@ -45,24 +52,63 @@ def load_agent_config(name: str) -> dict:
             - role: The agent's role (default: 'assistant')
             - system_prompt: The system prompt for the agent (default: '')
             - llm: LLM-specific configuration (default: {})
+            - reuse: Response reuse settings (default: {})
     """
     path = CONFIGS_PATH / f"{name}.ant.yaml"
     default = load_default_config()
+    data = registry.get(path, read_yaml, default=None)
 
-    if not path.exists():
+    if data is None:
         logger.warning(f"Config for agent '{name}' not found. Using default config.")
         return default
 
+    cached = _merged_configs.get(name)
+    if cached and cached[0] is data and cached[1] is default:
+        return cached[2]
     try:
-        data = read_yaml(path)
-        return {
+        config = freeze({
             "role": data.get("role", default["role"]),
             "system_prompt": data.get("system_prompt", default["system_prompt"]),
             "llm": data.get("llm", default["llm"]),
-        }
+            "reuse": data.get("reuse", default["reuse"]),
+        })
     except Exception as e:
         logger.error(f"Failed to load config for '{name}': {e}")
         return default
+    _merged_configs[name] = (data, default, config)
+    return config
+
+
+_merged_configs = {}    # agent name -> (parsed agent file, parsed default file, merged config)
+
+
+def config_signature(name: str) -> tuple[int, int]:
+    """Return the modification time (ns) and size of an agent's config file, or (-1, 0) if it has none.
+
+    Args:
+        name (str): The name of the agent
+
+    Returns:
+        tuple[int, int]: A signature that changes whenever the file is edited
+    """
+    try:
+        st = os.stat(CONFIGS_PATH / f"{name}.ant.yaml")
+    except FileNotFoundError:
+        return -1, 0
+    return st.st_mtime_ns, st.st_size
+
+
+def _parse_default_config(path: Path) -> dict:
+    import yaml
+
+    with open(path, "r") as f:
+        data = yaml.safe_load(f)
+    return {
+        "role": data["role"],
+        "system_prompt": "",
+        "llm": data["llm"],
+        "reuse": data.get("reuse", {}),
+    }
 
 
 def load_default_config() -> dict:
@@ -79,10 +125,4 @@ def load_default_config() -> dict:
             - llm: LLM-specific configuration (default: {})
     """
     assert CONFIGS_PATH.exists(), f"Path {CONFIGS_PATH} does not exist"
-    with open(CONFIGS_PATH / "default.ant.yaml", "r") as f:
-        data = yaml.safe_load(f)
-    return {
-        "role": data["role"],
-        "system_prompt": "",
-        "llm": data["llm"],
-    }
\ No newline at end of file
+    return registry.get(CONFIGS_PATH / "default.ant.yaml", _parse_default_config)
@@ -0,0 +1,223 @@
+import json
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Iterator
+from core.logger import LazyLogger
+
+logger = LazyLogger("batch")
+
+# Fields tried, in order, for the task text of an input record
+TASK_FIELDS = ("task", "content", "prompt", "body")
+# Fields copied to the result so it can be matched with its input
+ID_FIELDS = ("id", "request_id")
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Return the q-th percentile (0-100) of sorted values, by nearest rank."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(-(-q * len(sorted_values) // 100)), 1)     # ceil without floats
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class BatchReport:
+    """Outcome of a batch run: counts, throughput and latency percentiles."""
+    def __init__(self):
+        self.processed = 0      # Items run in this invocation, including failed ones
+        self.errors = 0
+        self.skipped = 0        # Items already finished by an earlier, interrupted run
+        self.elapsed = 0.0
+        self.latencies = []
+
+    @property
+    def throughput(self) -> float:
+        """Items per second over the wall time of this run."""
+        return self.processed / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            "processed": self.processed,
+            "errors": self.errors,
+            "skipped": self.skipped,
+            "elapsed_s": round(self.elapsed, 3),
+            "throughput_per_s": round(self.throughput, 3),
+            "latency_p50_s": round(percentile(latencies, 50), 3),
+            "latency_p90_s": round(percentile(latencies, 90), 3),
+            "latency_p99_s": round(percentile(latencies, 99), 3),
+            "latency_max_s": round(latencies[-1], 3) if latencies else 0.0,
+        }
+
+    def __str__(self):
+        d = self.as_dict()
+        return (f"{d['processed']} processed ({d['errors']} failed, {d['skipped']} already done) "
+                f"in {d['elapsed_s']}s, {d['throughput_per_s']}/s; latency "
+                f"p50={d['latency_p50_s']}s p90={d['latency_p90_s']}s p99={d['latency_p99_s']}s "
+                f"max={d['latency_max_s']}s")
+
+
+def read_items(path: Path, field: str = None) -> Iterator[tuple[int, dict, str]]:
+    """Stream (index, record, task text) from a JSONL file, one line at a time.
+
+    The index is the 0-based position among non-blank lines. Lines that are not
+    JSON objects or have no task text are yielded with a None text, so the run
+    records them as failed instead of stopping.
+
+    Args:
+        path (Path): Input JSONL file
+        field (str, optional): Field holding the task text. Defaults to the first of TASK_FIELDS.
+    """
+    index = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            if not isinstance(record, dict):
+                yield index, {}, None
+            else:
+                fields = (field,) if field else TASK_FIELDS
+                text = next((record[f] for f in fields if isinstance(record.get(f), str) and record[f].strip()), None)
+                yield index, record, text
+            index += 1
+
+
+def completed_indices(path: Path) -> set[int]:
+    """Return the indices that succeeded in a results file.
+
+    Failed results are not counted, so a resumed run retries them. A trailing
+    partial line left by a killed run is cut off so that appending resumes on a
+    clean line boundary.
+    """
+    if not path.exists():
+        return set()
+    done = set()
+    with open(path, "rb+") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            f.truncate(end)
+            logger.warning(f"[BATCH] Dropped a partial result line at the end of {path}")
+    for line in data[:end].splitlines():
+        try:
+            result = json.loads(line)
+            if "error" not in result:
+                done.add(result["index"])
+        except (ValueError, KeyError, TypeError):
+            continue
+    return done
+
+
+def run_batch(input_path, output_path, handler: Callable[[dict, str], object], concurrency: int = 4,
+              field: str = None, resume: bool = True, on_result: Callable[[dict], None] = None,
+              key: Callable[[dict], object] = None) -> BatchReport:
+    """Run every task of a JSONL file through a handler with bounded concurrency.
+
+    Results are appended to `output_path` as JSONL in completion order, each
+    with the input `index` (and id, if the input has one). The results file is
+    the checkpoint: with `resume`, items that succeeded in it are skipped, so a
+    killed run continues where it stopped and failed items are retried. A
+    retried item is appended again; its last line is the current result.
+
+    Items with the same `key` run one at a time, in input order. An item whose
+    key is taken waits outside the pool, so it never holds a slot that items
+    with other keys could use.
+
+    Args:
+        input_path (str | Path): Input JSONL file
+        output_path (str | Path): Results JSONL file
+        handler (Callable[[dict, str], object]): Runs one item given its record and task text;
+            the return value must be JSON serializable
+        concurrency (int, optional): Items processed at once. Defaults to 4.
+        field (str, optional): Field holding the task text. Defaults to the first of TASK_FIELDS.
+        resume (bool, optional): Skip items that succeeded in the results file; otherwise start over.
+            Defaults to True.
+        on_result (Callable[[dict], None], optional): Called with every result written.
+        key (Callable[[dict], object], optional): Returns the key of a record, e.g. the agent that
+            runs it; None runs the item without waiting for others. Defaults to no keys.
+
+    Returns:
+        BatchReport: Counts, throughput and latency percentiles of this run
+    """
+    input_path, output_path = Path(input_path), Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    done = completed_indices(output_path) if resume else set()
+    report = BatchReport()
+
+    def run_one(index: int, record: dict, text: str) -> dict:
+        result = {"index": index}
+        result.update({key: record[key] for key in ID_FIELDS if key in record})
+        started = time.perf_counter()
+        try:
+            if text is None:
+                raise ValueError("Line is not a JSON object with a task text")
+            result["output"] = handler(record, text)
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        result["latency_s"] = round(time.perf_counter() - started, 4)
+        return result
+
+    started = time.perf_counter()
+    with open(output_path, "a" if resume else "w", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as pool:
+
+        def write(finished):
+            for future in finished:
+                result = future.result()
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                out.flush()
+                report.processed += 1
+                report.errors += "error" in result
+                report.latencies.append(result["latency_s"])
+                if on_result:
+                    on_result(result)
+
+        pending = set()
+        keys = {}           # future -> key of its item
+        waiting = {}        # key -> items waiting for the one running with that key
+        parked = 0
+
+        def start(item: tuple, item_key):
+            future = pool.submit(run_one, *item)
+            keys[future] = item_key
+            pending.add(future)
+
+        def finish(finished):
+            nonlocal parked
+            write(finished)
+            for future in finished:
+                item_key = keys.pop(future)
+                queue = waiting.get(item_key)
+                if queue:
+                    start(queue.popleft(), item_key)
+                    parked -= 1
+                else:
+                    waiting.pop(item_key, None)
+
+        for index, record, text in read_items(input_path, field):
+            if index in done:
+                report.skipped += 1
+                continue
+            while len(pending) + parked >= concurrency * 2:     # read ahead a little, never the whole file
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                finish(finished)
+            item_key = key(record) if key and text is not None else None
+            if item_key is None:
+                start((index, record, text), None)
+            elif item_key in waiting:
+                waiting[item_key].append((index, record, text))
+                parked += 1
+            else:
+                waiting[item_key] = deque()
+                start((index, record, text), item_key)
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            finish(finished)
+    report.elapsed = time.perf_counter() - started
+    logger.info(f"[BATCH] {report}")
+    return report
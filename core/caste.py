@@ -24,11 +24,21 @@ def can_communicate(sender: Caste, receiver: Caste) -> bool:
     return receiver in CasteCommunicationRules.get(sender, [])
 
 # Define caste metadata for behavior tuning
+#   memory:  whether the caste's history is persisted to data/
+#   history: how many tasks are kept in the in-memory ring buffer (None = unbounded);
+#            older tasks of persistent castes move to the cold archive in data/archive/
 CasteTraits = {
-    Caste.QUEEN:     {"autonomy": 10, "context": "global", "memory": True},
-    Caste.MAJOR:     {"autonomy": 7,  "context": "domain", "memory": True},
-    Caste.MINOR:     {"autonomy": 3,  "context": "local",  "memory": True},
-    Caste.SCRIBE:    {"autonomy": 1,  "context": "result", "memory": False},
-    Caste.SOLDIER:   {"autonomy": 5,  "context": "audit",  "memory": True},
-    Caste.LARVA:     {"autonomy": 2,  "context": "ephemeral", "memory": False},
-}
\ No newline at end of file
+    Caste.QUEEN:     {"autonomy": 10, "context": "global", "memory": True,  "history": None},
+    Caste.MAJOR:     {"autonomy": 7,  "context": "domain", "memory": True,  "history": None},
+    Caste.MINOR:     {"autonomy": 3,  "context": "local",  "memory": True,  "history": 200},
+    Caste.SCRIBE:    {"autonomy": 1,  "context": "result", "memory": False, "history": 20},
+    Caste.SOLDIER:   {"autonomy": 5,  "context": "audit",  "memory": True,  "history": None},
+    Caste.LARVA:     {"autonomy": 2,  "context": "ephemeral", "memory": False, "history": 20},
+}
+
+def get_caste_traits(caste: str) -> dict:
+    """Return the traits of a caste, treating unknown castes as minors."""
+    try:
+        return CasteTraits[Caste(caste)]
+    except ValueError:
+        return CasteTraits[Caste.MINOR]
\ No newline at end of file
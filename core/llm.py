@@ -1,28 +1,129 @@
+import contextvars
+import json
 import os
+import threading
+import time
+from contextlib import contextmanager
 from dotenv import load_dotenv
-import requests
+from core.timer import profiler
 
 load_dotenv()
 
 LLM_API_URL = os.getenv("LLM_API_URL", "")
 MODEL_NAME = os.getenv("LLM_MODEL", "")
 LLM_TOKEN = os.getenv("LLM_TOKEN", "")
+LLM_KEEP_ALIVE = os.getenv("LLM_KEEP_ALIVE", "10m")
+
+_local = threading.local()
+# Absolute time.monotonic() deadline for the LLM calls of the current request
+_deadline = contextvars.ContextVar("llm_deadline", default=None)
+# Callback receiving each piece of the response as the backend streams it
+_token_sink = contextvars.ContextVar("llm_token_sink", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when an LLM call would start after, or run past, the caller's deadline."""
+
+
+@contextmanager
+def deadline(at: float):
+    """Bound every LLM call made in this context by a deadline.
+
+    Calls starting after the deadline raise DeadlineExceeded instead of reaching
+    the backend, and a call in flight is aborted when the deadline passes. A
+    nested deadline can shorten the enclosing one but never extend it.
 
-def generate(prompt: str, system: str = "") -> str:
-    """Generate a response from the language model.
-    
     Args:
-        prompt (str): The input prompt to send to the language model
-        system (str, optional): System prompt to guide the model's behavior. Defaults to "".
-        
-    Returns:
-        str: The generated response from the language model
-        
-    Raises:
-        requests.exceptions.HTTPError: If the API request fails
+        at (float): Absolute deadline on the time.monotonic() clock
+    """
+    current = _deadline.get()
+    token = _deadline.set(at if current is None else min(at, current))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def current_deadline() -> float | None:
+    """Return the deadline of the current context, on the time.monotonic() clock, if any."""
+    return _deadline.get()
+
+
+@contextmanager
+def stream_tokens(callback):
+    """Stream the responses of every LLM call made in this context.
+
+    Calls still return the whole response, but also hand each piece of it to
+    `callback` as soon as the backend produces it.
+
+    Args:
+        callback (Callable[[str], None]): Receives the response pieces in order
     """
+    token = _token_sink.set(callback)
+    try:
+        yield
+    finally:
+        _token_sink.reset(token)
+
+
+def _http():
+    """Return this thread's HTTP session, so connections to the backend are kept alive."""
+    session = getattr(_local, "session", None)
+    if session is None:
+        import requests
+
+        session = _local.session = requests.Session()
+    return session
+
+
+def _post(payload: dict, on_token=None) -> dict:
+    import requests
+    from core.scheduler import scheduler
+
+    at = _deadline.get()
+    if at is not None and at <= time.monotonic():
+        raise DeadlineExceeded("Deadline exceeded before the LLM call")
+    headers = {"Authorization": f"Bearer {LLM_TOKEN}"} if LLM_TOKEN else {}
+    # Calls queue for a backend slot by priority, and are shed there if their deadline gets out of reach
+    with scheduler.slot():
+        timeout = None if at is None else at - time.monotonic()
+        if timeout is not None and timeout <= 0:
+            raise DeadlineExceeded("Deadline exceeded before the LLM call")
+        try:
+            with profiler.phase("llm.http"):
+                if on_token is None:
+                    resp = _http().post(LLM_API_URL, json=payload, headers=headers, timeout=timeout)
+                    resp.raise_for_status()
+                    return resp.json()
+                return _stream(_http().post(LLM_API_URL, json={**payload, "stream": True}, headers=headers,
+                                            timeout=timeout, stream=True), on_token, at)
+        except requests.Timeout as e:
+            raise DeadlineExceeded("Deadline exceeded during the LLM call") from e
+
+
+def _stream(resp, on_token, at: float | None) -> dict:
+    """Read a streamed response, one JSON object per line, into the shape of a non-streamed one."""
+    with resp:
+        resp.raise_for_status()
+        pieces, data = [], {}
+        for line in resp.iter_lines():
+            if not line:
+                continue
+            data = json.loads(line)
+            piece = data.get("response")
+            if piece:
+                pieces.append(piece)
+                on_token(piece)
+            if data.get("done"):
+                break
+            if at is not None and time.monotonic() >= at:
+                raise DeadlineExceeded("Deadline exceeded during the LLM call")
+    return {**data, "response": "".join(pieces)}
+
+
+def _payload(prompt: str, system: str, model: str, keep_alive: str = LLM_KEEP_ALIVE, **extra) -> dict:
     payload = {
-        "model": MODEL_NAME,
+        "model": model,
         "prompt": prompt,
         "stream": False,
         "options": {
@@ -32,8 +133,72 @@ def generate(prompt: str, system: str = "") -> str:
     }
     if system:
         payload["system"] = system
+    if keep_alive:
+        payload["keep_alive"] = keep_alive
+    for key, value in extra.items():
+        if key == "options":
+            payload["options"].update(value)
+        else:
+            payload[key] = value
+    return payload
 
-    headers = {"Authorization": f"Bearer {LLM_TOKEN}"} if LLM_TOKEN else {}
-    resp = requests.post(LLM_API_URL, json=payload, headers=headers)
-    resp.raise_for_status()
-    return resp.json()["response"].strip()
+
+class LLMSession:
+    """Per-agent settings and accounting for calls that reuse the backend's prompt cache.
+
+    Ollama keeps the evaluated tokens of a loaded model's last request and only
+    evaluates the part of a new prompt that differs from them. Every call of a
+    session therefore sends the system prompt verbatim, ahead of the task, and
+    asks the backend to keep the model loaded, so a repeated system prompt is
+    served from the backend's cache without any extra request. The session
+    counts the calls and the prompt tokens the backend reports it evaluated,
+    which shows whether the reuse works.
+    """
+    def __init__(self, keep_alive: str = LLM_KEEP_ALIVE):
+        """Initialize an LLMSession.
+
+        Args:
+            keep_alive (str, optional): How long the backend keeps the model loaded. Defaults to LLM_KEEP_ALIVE.
+        """
+        self.keep_alive = keep_alive
+        self.calls = 0
+        self.prompt_tokens = 0      # Prompt tokens the backend evaluated, as reported by it
+        self._lock = threading.Lock()
+
+    def record(self, data: dict) -> None:
+        """Account for a backend response."""
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += data.get("prompt_eval_count") or 0
+
+    def as_dict(self) -> dict:
+        return {"calls": self.calls, "prompt_tokens": self.prompt_tokens}
+
+    def __str__(self):
+        return f"calls={self.calls} prompt tokens={self.prompt_tokens}"
+
+
+def generate(prompt: str, system: str = "", model: str = None, session: LLMSession = None) -> str:
+    """Generate a response from the language model.
+
+    Args:
+        prompt (str): The input prompt to send to the language model
+        system (str, optional): System prompt to guide the model's behavior. Defaults to "".
+        model (str, optional): Model to use instead of LLM_MODEL. Defaults to None.
+        session (LLMSession, optional): Caller's session, for its keep_alive and accounting.
+            Defaults to None.
+
+    Returns:
+        str: The generated response from the language model; inside `stream_tokens()`
+            its pieces are also handed to the callback as they arrive.
+
+    Raises:
+        requests.exceptions.HTTPError: If the API request fails
+        DeadlineExceeded: If the deadline set with `deadline()` passes
+    """
+    model = model or MODEL_NAME
+    data = _post(_payload(prompt, system, model, session.keep_alive if session else LLM_KEEP_ALIVE),
+                 _token_sink.get())
+    if session is not None:
+        session.record(data)
+    return data["response"].strip()
@@ -1,16 +1,138 @@
+import atexit
 import logging
-from rich.logging import RichHandler
+import logging.handlers
+import os
+import queue
+import threading
+from collections import OrderedDict
 from pathlib import Path
+from core.timer import profiler
 
 LOG_DIR = Path("logs")
-LOG_DIR.mkdir(exist_ok=True)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG").upper()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_MAX_OPEN_FILES = int(os.getenv("LOG_MAX_OPEN_FILES", "32"))
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "3"))
+
+FILE_FORMAT = logging.Formatter("[%(asctime)s] [%(levelname)s] %(message)s", "%d.%m.%y %H:%M:%S")
+
+
+class AgentFilter(logging.Filter):
+    """Stamp every record with the agent it belongs to ("-" for non-agent loggers)."""
+    def __init__(self, agent_name=None):
+        super().__init__()
+        self.agent = agent_name or "-"
+
+    def filter(self, record):
+        record.agent = self.agent
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full.
+
+    Records are queued as they are: the listener's handlers format them on the
+    listener thread, so logging costs the calling thread only the enqueue.
+    """
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def emit(self, record):
+        if not profiler.enabled:
+            return super().emit(record)
+        with profiler.phase("log"):
+            super().emit(record)
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class AgentFileHandler(logging.Handler):
+    """Route records to per-agent rotating log files, keeping a bounded number of them open.
+
+    Files are named after the record's `agent` field (`interactions.log` for
+    non-agent loggers). The least recently used file is closed when more than
+    `max_open` are open, and reopened in append mode when it is needed again.
+    """
+    def __init__(self, max_open=LOG_MAX_OPEN_FILES, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT):
+        super().__init__()
+        self.max_open = max(1, max_open)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._files = OrderedDict()     # file name -> RotatingFileHandler, least recently used first
+
+    def _handler_for(self, file_name):
+        handler = self._files.pop(file_name, None)
+        if handler is None:
+            LOG_DIR.mkdir(exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                LOG_DIR / file_name, maxBytes=self.max_bytes, backupCount=self.backup_count, encoding="utf-8"
+            )
+            handler.setFormatter(FILE_FORMAT)
+            while len(self._files) >= self.max_open:
+                self._files.popitem(last=False)[1].close()
+        self._files[file_name] = handler
+        return handler
+
+    def open_files(self) -> int:
+        return len(self._files)
+
+    def emit(self, record):
+        agent = getattr(record, "agent", "-")
+        self._handler_for(f"{agent}.log" if agent != "-" else "interactions.log").emit(record)
+
+    def close(self):
+        for handler in self._files.values():
+            handler.close()
+        self._files.clear()
+        super().close()
+
+
+_queue_handler = None
+_listener = None
+_file_handler = None
+_setup_lock = threading.Lock()
+
+def _ensure_pipeline():
+    """Start the shared writer thread on first use."""
+    global _queue_handler, _listener, _file_handler
+    if _queue_handler is not None:
+        return _queue_handler
+    with _setup_lock:
+        if _queue_handler is None:
+            from rich.logging import RichHandler
+
+            log_queue = queue.Queue(LOG_QUEUE_SIZE)
+            console_handler = RichHandler(show_time=True)
+            console_handler.setFormatter(logging.Formatter("%(message)s"))
+            _file_handler = AgentFileHandler()
+            _listener = logging.handlers.QueueListener(log_queue, console_handler, _file_handler)
+            _listener.start()
+            atexit.register(_listener.stop)
+            _queue_handler = DroppingQueueHandler(log_queue)
+    return _queue_handler
+
+def flush_logs():
+    """Block until every queued record has been written."""
+    if _listener is not None:
+        _listener.queue.join()
 
 def get_logger(name="agent", agent_name=None):
     """Get a configured logger instance.
     
-    This function creates or retrieves a logger with both console and file handlers.
-    The console handler uses Rich for formatted output, while the file handler
-    writes logs to files in the logs directory.
+    All loggers share one queue and one writer thread: logging on the calling
+    thread costs a level check and a queue put, while Rich console output and
+    file writes happen on the writer thread. Records carry an `agent` field and
+    are written to `logs/<agent>.log` (or `logs/interactions.log`), with a
+    bounded number of rotating files open at a time.
     
     Args:
         name (str, optional): Base name for the logger. Defaults to "agent".
@@ -22,27 +144,38 @@ def get_logger(name="agent", agent_name=None):
         
     Note:
         If the logger already exists with handlers configured, the existing
-        logger is returned without adding new handlers.
+        logger is returned without adding new handlers. Rich and the logs
+        directory are only touched when the first logger is created.
     """
     logger = logging.getLogger(f"{name}.{agent_name}" if agent_name else name)
-    logger.setLevel(logging.DEBUG)
 
     if not logger.handlers:
-        # Console rich
-        console_handler = RichHandler(show_time=True)
-        console_handler.setFormatter(logging.Formatter("%(message)s"))
-        logger.addHandler(console_handler)
-
-        # File log
-        if agent_name:
-            file_path = LOG_DIR / f"{agent_name}.log"
-        else:
-            file_path = LOG_DIR / "interactions.log"
-
-        file_handler = logging.FileHandler(file_path, encoding="utf-8")
-        file_handler.setFormatter(logging.Formatter(
-            "[%(asctime)s] [%(levelname)s] %(message)s", "%d.%m.%y %H:%M:%S"
-        ))
-        logger.addHandler(file_handler)
+        logger.setLevel(LOG_LEVEL)
+        logger.addFilter(AgentFilter(agent_name))
+        logger.addHandler(_ensure_pipeline())
 
     return logger
+
+
+class TaggedLogger(logging.LoggerAdapter):
+    """Prefix messages with a tag, so many short-lived agents can share one logger."""
+    def process(self, msg, kwargs):
+        return f"[{self.extra['tag']}] {msg}", kwargs
+
+
+class LazyLogger:
+    """Module-level logger placeholder that configures the real logger on first use.
+
+    Lets modules keep the `logger = ...` idiom without creating handlers,
+    importing Rich or creating the logs directory at import time.
+    """
+    __slots__ = ("_args", "_logger")
+
+    def __init__(self, name="agent", agent_name=None):
+        self._args = (name, agent_name)
+        self._logger = None
+
+    def __getattr__(self, attr):
+        if self._logger is None:
+            self._logger = get_logger(*self._args)
+        return getattr(self._logger, attr)
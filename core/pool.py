@@ -0,0 +1,193 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Iterable, Optional, TYPE_CHECKING
+from core.logger import LazyLogger
+
+if TYPE_CHECKING:
+    from agents.base import Agent
+
+logger = LazyLogger("pool")
+
+POOL_MIN_IDLE = int(os.getenv("POOL_MIN_IDLE", "1"))
+POOL_MAX_SIZE = int(os.getenv("POOL_MAX_SIZE", "3"))
+POOL_IDLE_TTL = float(os.getenv("POOL_IDLE_TTL", "300"))
+# Task types a new Queen pre-warms specialists for in the background: "all" for every mapped type,
+# comma-separated types, or empty to pre-warm nothing
+POOL_PREWARM = os.getenv("POOL_PREWARM", "all")
+
+
+class PoolStats:
+    """Counters describing how well the specialist pool is doing."""
+    def __init__(self):
+        self.hits = 0           # Requests served by an idle specialist
+        self.spawns = 0         # Specialists created, including pre-warming and top-ups
+        self.evictions = 0      # Idle specialists retired after the idle TTL
+        self.rejections = 0     # Requests refused because the pool was full
+
+    def as_dict(self) -> dict:
+        return {"hits": self.hits, "spawns": self.spawns, "evictions": self.evictions, "rejections": self.rejections}
+
+    def __str__(self):
+        return (f"hits={self.hits} spawns={self.spawns} "
+                f"evictions={self.evictions} rejections={self.rejections}")
+
+
+class SpecialistPool:
+    """A pool of reusable specialist agents, one sub-pool per task type.
+
+    Every task type keeps at least `min_idle` idle specialists ready (as long as
+    `max_size` allows) and never holds more than `max_size` specialists in total.
+    Released specialists go back to the pool and are handed out again, most
+    recently used first; specialists idle for longer than `idle_ttl` are retired
+    on the next acquire or release, except the ones needed to keep `min_idle`.
+    The factory runs outside the pool lock, with a slot reserved for the agent
+    being created, so a slow spawn never blocks other task types.
+    """
+    def __init__(self, factory: Callable[[str], "Agent"], min_idle: int = POOL_MIN_IDLE,
+                 max_size: int = POOL_MAX_SIZE, idle_ttl: float = POOL_IDLE_TTL,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initialize an empty SpecialistPool.
+
+        Args:
+            factory (Callable[[str], Agent]): Creates a new specialist for a task type
+            min_idle (int, optional): Idle specialists kept ready per task type. Defaults to POOL_MIN_IDLE.
+            max_size (int, optional): Specialists allowed per task type. Defaults to POOL_MAX_SIZE.
+            idle_ttl (float, optional): Seconds before an idle specialist is retired. Defaults to POOL_IDLE_TTL.
+            clock (Callable[[], float], optional): Time source, replaceable in tests.
+        """
+        self.factory = factory
+        self.min_idle = min_idle
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self.clock = clock
+        self.stats = PoolStats()
+        self._idle = {}         # task type -> deque of (agent, released at), oldest on the left
+        self._in_use = {}       # task type -> {agent name: agent}
+        self._creating = {}     # task type -> specialists being created outside the lock
+        self._lock = threading.Lock()
+
+    def _size(self, task_type: str) -> int:
+        return (len(self._idle.get(task_type, ())) + len(self._in_use.get(task_type, ()))
+                + self._creating.get(task_type, 0))
+
+    def _reserve_top_up(self, task_type: str) -> int:
+        """Reserve slots for the idle specialists missing to keep `min_idle`. Call with the lock held."""
+        missing = self.min_idle - len(self._idle.get(task_type, ())) - self._creating.get(task_type, 0)
+        count = max(0, min(missing, self.max_size - self._size(task_type)))
+        if count:
+            self._creating[task_type] = self._creating.get(task_type, 0) + count
+        return count
+
+    def _create(self, task_type: str, count: int, in_use: bool = False) -> list["Agent"]:
+        """Create specialists for reserved slots without holding the lock, then add them as idle or in use."""
+        created = []
+        try:
+            for _ in range(count):
+                created.append(self.factory(task_type))
+        finally:
+            with self._lock:
+                self._creating[task_type] -= count
+                self.stats.spawns += len(created)
+                if in_use:
+                    self._in_use.setdefault(task_type, {}).update((agent.name, agent) for agent in created)
+                else:
+                    now = self.clock()
+                    self._idle.setdefault(task_type, deque()).extend((agent, now) for agent in created)
+        return created
+
+    def _top_up(self, task_type: str) -> list["Agent"]:
+        with self._lock:
+            count = self._reserve_top_up(task_type)
+        return self._create(task_type, count) if count else []
+
+    def prewarm(self, task_types: Iterable[str]) -> int:
+        """Create `min_idle` specialists for each task type ahead of demand.
+
+        Args:
+            task_types (Iterable[str]): Task types to prepare specialists for
+
+        Returns:
+            int: Number of specialists created
+        """
+        created = [agent for task_type in task_types for agent in self._top_up(task_type)]
+        for agent in created:
+            agent.system_prompt     # read the prompt now instead of on the first task
+        logger.info(f"[POOL] Pre-warmed {len(created)} specialist(s)")
+        return len(created)
+
+    def acquire(self, task_type: str) -> Optional["Agent"]:
+        """Take a specialist for a task type, reusing an idle one when possible.
+
+        Args:
+            task_type (str): The task type the specialist must handle
+
+        Returns:
+            Agent | None: A specialist reserved for the caller, or None if the pool is full
+        """
+        with self._lock:
+            self._evict_idle(self.clock())
+            idle = self._idle.setdefault(task_type, deque())
+            if idle:
+                agent, _ = idle.pop()
+                self.stats.hits += 1
+                self._in_use.setdefault(task_type, {})[agent.name] = agent
+            elif self._size(task_type) < self.max_size:
+                agent = None
+                self._creating[task_type] = self._creating.get(task_type, 0) + 1
+            else:
+                self.stats.rejections += 1
+                logger.warning(f"[POOL] No specialist available for '{task_type}' (max {self.max_size})")
+                return None
+        if agent is None:
+            agent = self._create(task_type, 1, in_use=True)[0]
+        self._top_up(task_type)
+        return agent
+
+    def release(self, agent: "Agent") -> None:
+        """Return a specialist taken with `acquire` to the pool, retiring specialists idle for too long."""
+        with self._lock:
+            if self._in_use.get(agent.task_type, {}).pop(agent.name, None) is None:
+                return
+            now = self.clock()
+            self._idle.setdefault(agent.task_type, deque()).append((agent, now))
+            self._evict_idle(now)
+
+    def _evict_idle(self, now: float) -> list[str]:
+        retired = []
+        for task_type, idle in self._idle.items():
+            while len(idle) > self.min_idle and now - idle[0][1] > self.idle_ttl:
+                retired.append(idle.popleft()[0].name)
+        self.stats.evictions += len(retired)
+        if retired:
+            logger.debug(f"[POOL] Retired idle specialists: {retired}")
+        return retired
+
+    def evict_idle(self, now: float = None) -> list[str]:
+        """Retire specialists idle for longer than the idle TTL.
+
+        Args:
+            now (float, optional): Current clock value. Defaults to `clock()`.
+
+        Returns:
+            list[str]: Names of the retired specialists
+        """
+        with self._lock:
+            return self._evict_idle(self.clock() if now is None else now)
+
+    def agents(self) -> list["Agent"]:
+        """Return all pooled specialists, idle and in use."""
+        with self._lock:
+            return ([agent for idle in self._idle.values() for agent, _ in idle] +
+                    [agent for in_use in self._in_use.values() for agent in in_use.values()])
+
+    def snapshot(self) -> dict:
+        """Return the counters plus idle and in-use specialists per task type."""
+        with self._lock:
+            types = sorted(set(self._idle) | set(self._in_use))
+            return {
+                **self.stats.as_dict(),
+                "pools": {t: {"idle": len(self._idle.get(t, ())), "in_use": len(self._in_use.get(t, ()))}
+                          for t in types},
+            }
@@ -0,0 +1,193 @@
+import os
+import re
+from typing import Callable, Optional
+from core.logger import LazyLogger
+
+logger = LazyLogger("prompt_builder")
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "4096"))
+# Per-model budgets, e.g. "qwen:8b=8192,tinyllama=2048"
+PROMPT_BUDGETS = os.getenv("PROMPT_BUDGETS", "")
+TRUNCATION_MARK = " [...]"
+
+_WORD_PIECES = re.compile(r"\w+|[^\w\s]")
+_tokenizer: Optional[Callable[[str], int]] = None
+
+
+def set_tokenizer(tokenizer: Optional[Callable[[str], int]]) -> None:
+    """Use an exact tokenizer, e.g. `lambda s: len(enc.encode(s))`, instead of the heuristic.
+
+    Args:
+        tokenizer (Callable[[str], int] | None): Returns the token count of a string;
+            None restores the heuristic.
+    """
+    global _tokenizer
+    _tokenizer = tokenizer
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a text without a tokenizer.
+
+    Uses the larger of one token per word or punctuation mark and one token per
+    four characters, which stays close to BPE tokenizers for English and code.
+    """
+    if not text:
+        return 0
+    return max(len(_WORD_PIECES.findall(text)), (len(text) + 3) // 4)
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with the configured tokenizer, or estimate them."""
+    return _tokenizer(text) if _tokenizer else estimate_tokens(text)
+
+
+def _parse_budgets(spec: str) -> dict:
+    budgets = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, tokens = item.rpartition("=")
+        if model and tokens.isdigit():
+            budgets[model] = int(tokens)
+        else:
+            logger.warning(f"[BUDGET] Ignoring malformed PROMPT_BUDGETS entry '{item}'")
+    return budgets
+
+
+_budgets = _parse_budgets(PROMPT_BUDGETS)
+
+
+def budget_for(model: str = None) -> int:
+    """Return the prompt token budget for a model.
+
+    Args:
+        model (str, optional): Model name. Defaults to LLM_MODEL.
+
+    Returns:
+        int: The model's entry in PROMPT_BUDGETS, or PROMPT_TOKEN_BUDGET
+    """
+    if model is None:
+        from core.llm import MODEL_NAME
+        model = MODEL_NAME
+    return _budgets.get(model, PROMPT_TOKEN_BUDGET)
+
+
+def truncate_to_tokens(text: str, tokens: int) -> str:
+    """Cut a text to at most `tokens` tokens, marking the cut."""
+    if count_tokens(text) <= tokens:
+        return text
+    if tokens <= count_tokens(TRUNCATION_MARK):
+        return ""
+    # Binary search on the length; the token count grows monotonically with it
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if count_tokens(text[:mid].rstrip() + TRUNCATION_MARK) <= tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low].rstrip() + TRUNCATION_MARK
+
+
+class Section:
+    """A named part of a prompt and what may be done to it when over budget."""
+    __slots__ = ("name", "text", "priority", "shrink", "compress", "tokens")
+
+    def __init__(self, name: str, text: str, priority: int, shrink: str, compress: Callable[[str], str] = None):
+        self.name = name
+        self.text = text
+        self.priority = priority
+        self.shrink = shrink
+        self.compress = compress
+        self.tokens = count_tokens(text)
+
+    def replace(self, text: str):
+        self.text = text
+        self.tokens = count_tokens(text)
+
+
+class PromptBuilder:
+    """Assemble a prompt from sections and keep it within a token budget.
+
+    Sections are joined in the order they were added. When the prompt is over
+    budget, sections are shrunk lowest priority first: a section is compressed
+    with its `compress` function if it has one, then dropped if its policy is
+    "drop", or cut down if its policy is "truncate"; sections of the same
+    priority are truncated to equal shares. "keep" sections are never changed.
+    """
+    SHRINK_POLICIES = ("keep", "truncate", "drop")
+
+    def __init__(self, budget: int = None, model: str = None, reserved: int = 0, separator: str = "\n"):
+        """Initialize an empty PromptBuilder.
+
+        Args:
+            budget (int, optional): Token budget. Defaults to the budget of `model`.
+            model (str, optional): Model whose budget applies. Defaults to LLM_MODEL.
+            reserved (int, optional): Tokens already used elsewhere, e.g. by the system prompt.
+            separator (str, optional): Text placed between sections. Defaults to a newline.
+        """
+        self.budget = (budget if budget is not None else budget_for(model)) - reserved
+        self.separator = separator
+        self.sections: list[Section] = []
+        self.dropped: list[str] = []
+
+    def add(self, text: str, name: str = None, priority: int = 0, shrink: str = "truncate",
+            compress: Callable[[str], str] = None) -> "PromptBuilder":
+        """Append a section.
+
+        Args:
+            text (str): Section text
+            name (str, optional): Name used in log messages
+            priority (int, optional): Higher priorities are shrunk last. Defaults to 0.
+            shrink (str, optional): "keep", "truncate" or "drop". Defaults to "truncate".
+            compress (Callable[[str], str], optional): Returns a shorter rendering of the text,
+                tried before truncating or dropping.
+
+        Returns:
+            PromptBuilder: self, for chaining
+        """
+        if shrink not in self.SHRINK_POLICIES:
+            raise ValueError(f"Unknown shrink policy '{shrink}'. Use one of: {', '.join(self.SHRINK_POLICIES)}")
+        self.sections.append(Section(name or f"section{len(self.sections)}", text, priority, shrink, compress))
+        return self
+
+    def tokens(self) -> int:
+        """Return the token count of the prompt as it would be built now."""
+        separators = count_tokens(self.separator) * max(len(self.sections) - 1, 0)
+        return sum(s.tokens for s in self.sections) + separators
+
+    def _shrink_group(self, group: list[Section]):
+        for section in group:
+            if section.compress and self.tokens() > self.budget:
+                section.replace(section.compress(section.text))
+        for section in reversed(group):
+            if section.shrink == "drop" and self.tokens() > self.budget:
+                self.sections.remove(section)
+                self.dropped.append(section.name)
+        truncatable = [s for s in group if s.shrink == "truncate" and s in self.sections]
+        excess = self.tokens() - self.budget
+        if excess <= 0 or not truncatable:
+            return
+        # Give every section an equal share of what is left, letting short ones keep their full size
+        available = max(sum(s.tokens for s in truncatable) - excess, 0)
+        remaining = sorted(truncatable, key=lambda s: s.tokens)
+        while remaining:
+            share = available // len(remaining)
+            section = remaining.pop(0)
+            if section.tokens > share:
+                section.replace(truncate_to_tokens(section.text, share))
+            available -= section.tokens
+
+    def build(self) -> str:
+        """Return the prompt, shrunk to the budget where the section policies allow it."""
+        before = self.tokens()
+        if before > self.budget:
+            for priority in sorted({s.priority for s in self.sections}):
+                if self.tokens() <= self.budget:
+                    break
+                self._shrink_group([s for s in self.sections if s.priority == priority])
+            after = self.tokens()
+            if after > self.budget:
+                logger.warning(f"[BUDGET] Prompt still has {after} tokens, budget is {self.budget}")
+            else:
+                logger.debug(f"[BUDGET] Shrunk prompt from {before} to {after} tokens"
+                             + (f", dropped {self.dropped}" if self.dropped else ""))
+        return self.separator.join(s.text for s in self.sections if s.text)
@@ -0,0 +1,131 @@
+import os
+import threading
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Callable
+from core.logger import LazyLogger
+
+logger = LazyLogger("registry")
+
+_MISSING = object()
+
+
+def freeze(value: Any) -> Any:
+    """Return a read-only copy of parsed data: dicts become mappingproxies, lists become tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def _signature(path: Path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class FileRegistry:
+    """A shared cache of parsed files (agent configs, prompts, mappings).
+
+    Every file is parsed once and served as an immutable object until its
+    modification time or size changes. By default each lookup costs a single
+    `stat`; with the hot-reload watcher running, lookups skip the `stat` and the
+    watcher invalidates changed files in the background instead.
+    """
+    def __init__(self):
+        """Initialize an empty FileRegistry."""
+        self._entries = {}      # (path string, parser) -> (signature, value)
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._watcher = None
+        self._stop = threading.Event()
+
+    def get(self, path, parser: Callable[[Path], Any], default: Any = _MISSING) -> Any:
+        """Return the parsed, frozen content of a file.
+
+        Args:
+            path (str | Path): The file to load
+            parser (Callable[[Path], Any]): Function that reads and parses the file
+            default (Any, optional): Returned when the file does not exist. If omitted,
+                FileNotFoundError is raised instead.
+
+        Returns:
+            Any: The cached parse result
+
+        Raises:
+            FileNotFoundError: If the file does not exist and no default was given
+        """
+        key = (os.fspath(path), parser)
+        entry = self._entries.get(key)
+        if entry is not None and (self._watcher is not None or entry[0] == _signature(key[0])):
+            value = entry[1]
+        else:
+            signature = _signature(key[0])
+            value = _MISSING if signature is None else freeze(parser(Path(path)))
+            with self._lock:
+                self._entries[key] = (signature, value)
+        if value is _MISSING:
+            if default is _MISSING:
+                raise FileNotFoundError(f"File {path} does not exist.")
+            return default
+        return value
+
+    def invalidate(self, path=None) -> None:
+        """Drop cached entries for a file, or all of them if no path is given."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == os.fspath(path)]:
+                    del self._entries[key]
+
+    def subscribe(self, callback: Callable[[Path], None]) -> None:
+        """Call `callback(path)` whenever the watcher sees a cached file change."""
+        self._listeners.append(callback)
+
+    def start_watcher(self, interval: float = 1.0) -> None:
+        """Start a background thread that polls cached files for changes.
+
+        Args:
+            interval (float, optional): Seconds between polls. Defaults to 1.0.
+        """
+        if self._watcher is not None:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name="registry-watcher", daemon=True)
+        self._watcher.start()
+        logger.info(f"[RELOAD] Watching configs and prompts every {interval}s")
+
+    def stop_watcher(self) -> None:
+        """Stop the hot-reload watcher; lookups go back to checking mtimes themselves."""
+        watcher, self._watcher = self._watcher, None
+        if watcher is not None:
+            self._stop.set()
+            watcher.join()
+
+    def poll(self) -> list[Path]:
+        """Invalidate every cached file that changed on disk and notify subscribers.
+
+        Returns:
+            list[Path]: The files that changed
+        """
+        with self._lock:
+            stale = [key for key, (signature, _) in self._entries.items() if signature != _signature(key[0])]
+            for key in stale:
+                del self._entries[key]
+        changed = list(dict.fromkeys(Path(path) for path, _ in stale))
+        for path in changed:
+            logger.info(f"[RELOAD] {path} changed")
+            for callback in self._listeners:
+                callback(path)
+        return changed
+
+    def _watch(self, interval: float):
+        while not self._stop.wait(interval):
+            self.poll()
+
+
+registry = FileRegistry()
@@ -0,0 +1,182 @@
+import contextvars
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from core.llm import DeadlineExceeded, current_deadline, deadline
+from core.logger import LazyLogger
+from core.task import Priority, Task
+from core.timer import profiler
+
+SCHEDULER_SLOTS = int(os.getenv("SCHEDULER_SLOTS", "8"))
+SCHEDULER_AGING = float(os.getenv("SCHEDULER_AGING", "10"))
+
+logger = LazyLogger("scheduler")
+
+# Priority of the task whose LLM calls are made in the current context
+_priority = contextvars.ContextVar("scheduler_priority", default=Priority.NORMAL)
+
+
+class TaskShed(DeadlineExceeded):
+    """Raised instead of dispatching work that can no longer finish before its deadline."""
+
+
+class _Waiter:
+    __slots__ = ("priority", "deadline", "enqueued", "seq", "event", "admitted", "shed")
+
+    def __init__(self, priority: int, deadline: float | None, seq: int):
+        self.priority = priority
+        self.deadline = deadline
+        self.enqueued = time.monotonic()
+        self.seq = seq
+        self.event = threading.Event()
+        self.admitted = False
+        self.shed = False
+
+
+class Scheduler:
+    """Dispatches work to a limited number of backend slots in order of urgency.
+
+    Waiting work is admitted by priority, earliest deadline first within a
+    priority, then first come first served. Every `aging` seconds spent waiting
+    raises the priority of a waiter by one class, up to Priority.HIGH, so bulk
+    work is delayed but never starved. Work that cannot finish before its
+    deadline, judged by how long a slot is usually held, is shed at once
+    instead of taking a slot it would waste.
+    """
+    def __init__(self, slots: int = SCHEDULER_SLOTS, aging: float = SCHEDULER_AGING):
+        """Initialize a Scheduler.
+
+        Args:
+            slots (int, optional): Work admitted at once; 0 admits everything. Defaults to SCHEDULER_SLOTS.
+            aging (float, optional): Seconds of waiting per priority class gained; 0 disables aging.
+                Defaults to SCHEDULER_AGING.
+        """
+        self.slots = slots
+        self.aging = aging
+        self.active = 0
+        self.admitted = 0
+        self.aged = 0               # Admissions that overtook work of a higher original priority
+        self.shed = 0
+        self.service_time = 0.0     # Moving average of how long a slot is held, in seconds
+        self._waiting: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def _class(self, waiter: _Waiter, now: float) -> int:
+        if self.aging <= 0:
+            return waiter.priority
+        return min(Priority.HIGH, waiter.priority + int((now - waiter.enqueued) / self.aging))
+
+    def _rank(self, waiter: _Waiter, now: float) -> tuple:
+        return (-self._class(waiter, now), waiter.deadline if waiter.deadline is not None else float("inf"),
+                waiter.seq)
+
+    def _hopeless(self, at: float | None, now: float) -> bool:
+        return at is not None and now + self.service_time > at
+
+    def _dispatch(self):
+        """Hand free slots to the most urgent waiters, shedding those that can no longer make it."""
+        now = time.monotonic()
+        while self._waiting and self.active < self.slots:
+            waiter = min(self._waiting, key=lambda w: self._rank(w, now))
+            self._waiting.remove(waiter)
+            if self._hopeless(waiter.deadline, now):
+                waiter.shed = True
+                self.shed += 1
+            else:
+                if any(w.priority > waiter.priority for w in self._waiting):
+                    self.aged += 1
+                waiter.admitted = True
+                self.active += 1
+                self.admitted += 1
+            waiter.event.set()
+
+    def acquire(self, priority: int = Priority.NORMAL, at: float = None):
+        """Wait for a slot.
+
+        Args:
+            priority (int, optional): Priority of the work. Defaults to Priority.NORMAL.
+            at (float, optional): Absolute deadline on the time.monotonic() clock. Defaults to None.
+
+        Raises:
+            TaskShed: If the work cannot finish before the deadline
+        """
+        with self._lock:
+            if self._hopeless(at, time.monotonic()):
+                self.shed += 1
+                raise TaskShed(f"Shed: expected to need {self.service_time:.2f}s, deadline is closer")
+            if self.active < self.slots and not self._waiting:
+                self.active += 1
+                self.admitted += 1
+                return
+            waiter = _Waiter(priority, at, next(self._seq))
+            self._waiting.append(waiter)
+        while True:
+            # Wake up when the deadline becomes out of reach, to be shed without waiting for a slot
+            timeout = None if at is None else max(0.0, at - self.service_time - time.monotonic())
+            waiter.event.wait(timeout)
+            with self._lock:
+                if waiter.admitted:
+                    return
+                if not waiter.shed and self._hopeless(at, time.monotonic()):
+                    self._waiting.remove(waiter)
+                    waiter.shed = True
+                    self.shed += 1
+                if waiter.shed:
+                    waited = time.monotonic() - waiter.enqueued
+                    logger.info(f"[SHED] Priority {Priority(priority).name} work shed after waiting {waited:.2f}s")
+                    raise TaskShed(f"Shed after waiting {waited:.2f}s: deadline out of reach")
+
+    def release(self, held: float):
+        """Free a slot.
+
+        Args:
+            held (float): Seconds the slot was held, to refine the service time estimate
+        """
+        with self._lock:
+            self.service_time = held if not self.service_time else 0.8 * self.service_time + 0.2 * held
+            self.active -= 1
+            self._dispatch()
+
+    @contextmanager
+    def slot(self):
+        """Hold a slot for one backend call, at the priority and deadline of the current context."""
+        if self.slots <= 0:
+            yield
+            return
+        with profiler.phase("llm.wait"):
+            self.acquire(_priority.get(), current_deadline())
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"slots": self.slots, "active": self.active, "waiting": len(self._waiting),
+                    "admitted": self.admitted, "aged": self.aged, "shed": self.shed,
+                    "service_time": round(self.service_time, 3)}
+
+
+@contextmanager
+def scheduled(task: Task):
+    """Make the backend calls of this context wait at the task's priority and deadline.
+
+    Args:
+        task (Task): The task being worked on
+    """
+    token = _priority.set(task.priority)
+    try:
+        if task.deadline is None:
+            yield
+        else:
+            with deadline(task.deadline):
+                yield
+    finally:
+        _priority.reset(token)
+
+
+scheduler = Scheduler()
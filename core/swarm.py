@@ -1,57 +1,284 @@
-from agents.base import Agent
-from typing import Dict
+import json
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Dict, TYPE_CHECKING
+from core.logger import LazyLogger
+
+if TYPE_CHECKING:
+    from agents.base import Agent
+
+logger = LazyLogger("swarm")
+
+SNAPSHOT_MAGIC = b"ANTSNP"
+SNAPSHOT_VERSION = 2
+SNAPSHOT_HEADER = struct.Struct("<6sHII")   # magic, version, profile count, agent count
+PROFILE_HEADER = struct.Struct("<HI")       # role length, config length
+# flags, profile index, name length, config file mtime (ns) and size, extra length
+AGENT_HEADER = struct.Struct("<BIHqQH")
+FLAG_SPAWNED = 1
+FLAG_QUEEN = 2
+
+
+def _read_header(data: memoryview, path) -> tuple[int, int, int]:
+    magic, version, profile_count, agent_count = SNAPSHOT_HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError(f"{path} is not a swarm snapshot")
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f"{path} is a version {version} swarm snapshot, expected version {SNAPSHOT_VERSION}")
+    return profile_count, agent_count, SNAPSHOT_HEADER.size
+
+
+def read_snapshot_names(path) -> list[str]:
+    """Return the agent names stored in a snapshot without building any agent.
+
+    Args:
+        path (str | Path): Snapshot file
+
+    Returns:
+        list[str]: Agent names in the order they were saved
+
+    Raises:
+        ValueError: If the file is not a swarm snapshot
+    """
+    data = memoryview(Path(path).read_bytes())
+    profile_count, agent_count, offset = _read_header(data, path)
+    for _ in range(profile_count):
+        role_len, config_len = PROFILE_HEADER.unpack_from(data, offset)
+        offset += PROFILE_HEADER.size + role_len + config_len
+    names = []
+    for _ in range(agent_count):
+        _, _, name_len, _, _, extra_len = AGENT_HEADER.unpack_from(data, offset)
+        offset += AGENT_HEADER.size
+        names.append(str(data[offset:offset + name_len], "utf-8"))
+        offset += name_len + extra_len
+    return names
+
 
 class Swarm:
     """A class that manages a collection of agents.
-    
-    This class provides functionality to register, retrieve, and list agents.
+
+    This class provides functionality to register, retrieve, and list agents,
+    and to snapshot the swarm to disk and restore it after a restart.
     """
     def __init__(self):
         """Initialize a new Swarm instance.
-        
+
         Creates an empty dictionary to store agents.
-        """        
-        self.agents: Dict[str, Agent] = {}
+        """
+        self.agents: Dict[str, "Agent"] = {}
+        self._lock = threading.Lock()       # so concurrent callers never build the same agent twice
+        self._autosave = None
+        self._autosave_stop = threading.Event()
 
-    def register(self, name: str, role: str = "assistant") -> Agent:
+    def register(self, name: str, role: str = "assistant") -> "Agent":
         """Register a new agent with the swarm or return an existing one.
-        
+
         Args:
             name (str): The name of the agent to register
             role (str, optional): The role of the agent. Defaults to "assistant".
-            
+
         Returns:
             Agent: The registered agent instance
+
+        Note:
+            The agent stack is imported on first use, so creating a Swarm is free.
         """
-        if name not in self.agents:
-            agent = Agent(name=name, role=role)
-            self.agents[name] = agent
-        return self.agents[name]
+        with self._lock:
+            if name not in self.agents:
+                from agents.base import Agent
+                self.agents[name] = Agent(name=name, role=role)
+            return self.agents[name]
+
+    def add(self, agent: "Agent") -> "Agent":
+        """Add an existing agent, e.g. a specialist spawned by the Queen, to the swarm.
 
-    def get(self, name: str) -> Agent:
+        Args:
+            agent (Agent): The agent to add
+
+        Returns:
+            Agent: The added agent
+        """
+        with self._lock:
+            self.agents[agent.name] = agent
+        return agent
+
+    def get(self, name: str) -> "Agent":
         """Get an agent by name, initializing it if it doesn't exist.
-        
+
         Args:
             name (str): The name of the agent to retrieve
-            
+
         Returns:
             Agent: The requested agent instance
-            
+
         Note:
             If the agent wasn't registered in this session, it will be initialized
             with its memory loaded from storage.
         """
-        if name in self.agents:
-            return self.agents[name]
-        # If agent wasn't registered this session, we can still init it (will load memory etc)
-        agent = Agent(name=name)
-        self.agents[name] = agent
-        return agent
+        with self._lock:
+            if name in self.agents:
+                return self.agents[name]
+            # If agent wasn't registered this session, we can still init it (will load memory etc)
+            from agents.base import Agent
+            agent = Agent(name=name)
+            self.agents[name] = agent
+            return agent
+
+    def remove(self, name: str) -> bool:
+        """Remove an agent from the swarm. Its memory file is left in place.
+
+        Args:
+            name (str): The name of the agent to remove
+
+        Returns:
+            bool: True if the agent was registered
+        """
+        return self.agents.pop(name, None) is not None
 
     def list_agents(self):
         """List all registered agent names.
-        
+
         Returns:
             list: A list of agent names (strings) currently registered in the swarm
         """
         return list(self.agents.keys())
+
+    def snapshot(self, path) -> int:
+        """Write the swarm to a compact binary snapshot.
+
+        Each distinct agent profile (role and configuration) is stored once. Each
+        agent is stored as its name, a profile index, flags (spawned, Queen) and
+        the signature of its config file at the time, never its memory. A Queen
+        also stores the task types of its pooled specialists. The file is
+        written atomically.
+
+        Args:
+            path (str | Path): Destination file
+
+        Returns:
+            int: Number of agents written
+        """
+        from agents.base import Queen
+        from core.agent_config import config_signature
+
+        profiles = {}
+        profile_blobs = []
+        agent_blobs = []
+        for name, agent in list(self.agents.items()):
+            profile = agent._profile
+            index = profiles.get(id(profile))
+            if index is None:
+                index = profiles[id(profile)] = len(profile_blobs)
+                role = profile.role.encode("utf-8")
+                config = json.dumps(profile.to_config(), separators=(",", ":")).encode("utf-8")
+                profile_blobs.append(PROFILE_HEADER.pack(len(role), len(config)) + role + config)
+            encoded_name = str(name).encode("utf-8")
+            flags = FLAG_SPAWNED if agent.spawned else 0
+            extra = b""
+            if isinstance(agent, Queen):
+                flags |= FLAG_QUEEN
+                extra = json.dumps({"pool": [a.task_type for a in agent.spawned_agents]}).encode("utf-8")
+            mtime, size = config_signature(name)
+            agent_blobs.append(AGENT_HEADER.pack(flags, index, len(encoded_name), mtime, size, len(extra))
+                               + encoded_name + extra)
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(profile_blobs), len(agent_blobs)))
+            f.write(b"".join(profile_blobs))
+            f.write(b"".join(agent_blobs))
+        os.replace(tmp_path, path)
+        logger.debug(f"[SNAPSHOT] Saved {len(agent_blobs)} agents to {path}")
+        return len(agent_blobs)
+
+    def restore(self, path) -> int:
+        """Load agents from a snapshot written by `snapshot`.
+
+        Agents are rebuilt from their stored profiles without reading any config,
+        prompt or memory file; memory is loaded lazily from its usual location the
+        first time an agent needs it. An agent whose config file changed since the
+        snapshot is built from the current file instead. A Queen gets its pool
+        pre-warmed with the specialists it held. Agents already in the swarm are kept.
+
+        Args:
+            path (str | Path): Snapshot file
+
+        Returns:
+            int: Number of agents restored
+
+        Raises:
+            ValueError: If the file is not a swarm snapshot
+        """
+        from agents.base import Agent, Queen, get_profile
+        from core.agent_config import config_signature
+
+        data = memoryview(Path(path).read_bytes())
+        profile_count, agent_count, offset = _read_header(data, path)
+        profiles = []
+        for _ in range(profile_count):
+            role_len, config_len = PROFILE_HEADER.unpack_from(data, offset)
+            offset += PROFILE_HEADER.size
+            role = str(data[offset:offset + role_len], "utf-8")
+            offset += role_len
+            config = json.loads(bytes(data[offset:offset + config_len]))
+            offset += config_len
+            profiles.append(get_profile(role, config))
+
+        restored = stale = 0
+        for _ in range(agent_count):
+            flags, index, name_len, mtime, size, extra_len = AGENT_HEADER.unpack_from(data, offset)
+            offset += AGENT_HEADER.size
+            name = str(data[offset:offset + name_len], "utf-8")
+            offset += name_len
+            extra = json.loads(bytes(data[offset:offset + extra_len])) if extra_len else {}
+            offset += extra_len
+            if name in self.agents:
+                continue
+            cls = Queen if flags & FLAG_QUEEN else Agent
+            spawned = bool(flags & FLAG_SPAWNED)
+            if config_signature(name) == (mtime, size):
+                agent = cls.from_profile(name, profiles[index], spawned=spawned)
+            else:
+                stale += 1
+                agent = (Queen(name=name, prewarm=[]) if cls is Queen
+                         else Agent(name=name, role=profiles[index].role, spawned=spawned))
+            if extra.get("pool"):
+                agent.pool.prewarm(extra["pool"])
+            self.agents[name] = agent
+            restored += 1
+        logger.debug(f"[SNAPSHOT] Restored {restored} agents from {path}, {stale} rebuilt from changed configs")
+        return restored
+
+    def start_autosave(self, path, interval: float = 60.0) -> None:
+        """Snapshot the swarm in the background every `interval` seconds.
+
+        Args:
+            path (str | Path): Snapshot file
+            interval (float, optional): Seconds between snapshots. Defaults to 60.
+        """
+        if self._autosave is not None:
+            return
+
+        def autosave():
+            while not self._autosave_stop.wait(interval):
+                try:
+                    self.snapshot(path)
+                except OSError as e:
+                    logger.error(f"[SNAPSHOT] Autosave to {path} failed: {e}")
+
+        self._autosave_stop.clear()
+        self._autosave = threading.Thread(target=autosave, name="swarm-autosave", daemon=True)
+        self._autosave.start()
+
+    def stop_autosave(self, path=None) -> None:
+        """Stop the autosave thread, optionally writing a final snapshot."""
+        if self._autosave is not None:
+            self._autosave_stop.set()
+            self._autosave.join()
+            self._autosave = None
+        if path is not None:
+            self.snapshot(path)
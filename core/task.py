@@ -1,8 +1,8 @@
-from enum import Enum
+from enum import Enum, IntEnum
 from pathlib import Path
 from typing import List, Dict
 from uuid import uuid4
-from yaml import safe_load
+from core.registry import registry
 
 DEFAULT_MAPPING_PATH =  Path(__file__).parent / "tasks_to_agents_mapping.yaml"
 
@@ -27,16 +27,30 @@ class TaskDifficulty(Enum):
     EXPERT = "Think very-quickly and thoroughly like an expert."
 
 
+class Priority(IntEnum):
+    LOW = 0         # Bulk and background work
+    NORMAL = 1
+    HIGH = 2        # Interactive requests
+
+
 class Task:
-    def __init__(self, content: str, task_type: str = "generic", difficulty: str = TaskDifficulty.EASY.name.lower()):
+    def __init__(self, content: str, task_type: str = "generic", difficulty: str = TaskDifficulty.EASY.name.lower(),
+                 priority: int = Priority.NORMAL, deadline: float = None):
         self.assigned_to = None
         self.content = content
+        self.deadline = deadline    # Absolute time.monotonic() by which the result is still useful, if any
         self.difficulty = difficulty
         self.id = str(uuid4())
+        self.priority = Priority(priority)
+        self.reassignments = 0      # Times the task was handed to another executor after a failure
         self.result = None
         self.status = TaskStatus.PENDING
         self.type = task_type
 
+    def derive(self, content: str, task_type: str = "generic") -> "Task":
+        """Return a task done on behalf of this one, sharing its priority and deadline."""
+        return Task(content, task_type=task_type, priority=self.priority, deadline=self.deadline)
+
     def assign_to(self, agent_name: str):
         self.assigned_to = agent_name
         self.status = TaskStatus.ASSIGNED
@@ -67,21 +81,25 @@ class TaskMapping:
         self.path = Path(yaml_path)
         self.mapping = self._load_and_validate()
 
-    def _open_yaml(self):
-        if not self.path.exists():
-            raise FileNotFoundError(f"Mapping file not found: {self.path}")
-        with open(self.path, "r") as f:
+    @staticmethod
+    def _open_yaml(path: Path):
+        from yaml import safe_load
+
+        with open(path, "r") as f:
             data = safe_load(f)
         if not isinstance(data, dict):
             raise ValueError("Mapping must be a dictionary of task_type -> list of keywords")
-        return data
-    
-    def _load_and_validate(self) -> Dict[str, List[str]]:
-        data = self._open_yaml()
         for task_type, keywords in data.items():
             if not isinstance(keywords, list) or not all(isinstance(k, str) for k in keywords):
                 raise ValueError(f"Invalid keyword list for task type '{task_type}'")
         return data
+    
+    def _load_and_validate(self) -> Dict[str, List[str]]:
+        """Return the validated mapping, parsed once and shared through the registry."""
+        try:
+            return registry.get(self.path, self._open_yaml)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Mapping file not found: {self.path}")
 
     def get_keywords(self, task_type: str) -> List[str]:
         return self.mapping.get(task_type, [])
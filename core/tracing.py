@@ -0,0 +1,181 @@
+import atexit
+import contextvars
+import itertools
+import json
+import os
+import threading
+from pathlib import Path
+from time import perf_counter_ns
+
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+TRACE_MAX_EVENTS = int(os.getenv("TRACE_MAX_EVENTS", "200000"))
+
+# (span id, attributes inherited by child spans) of the innermost open span
+_current = contextvars.ContextVar("trace_span", default=None)
+
+
+class _NullSpan:
+    """Shared do-nothing span returned while tracing is disabled."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """A timed, named section of work. Attributes are inherited by nested spans."""
+    __slots__ = ("tracer", "name", "attrs", "span_id", "parent_id", "start", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, attrs: dict):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        """Attach extra attributes, e.g. the agent a task ended up with."""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        parent = _current.get()
+        self.parent_id = parent[0] if parent else None
+        if parent:
+            self.attrs = {**parent[1], **self.attrs}
+        self.span_id = next(self.tracer._ids)
+        self._token = _current.set((self.span_id, self.attrs))
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = perf_counter_ns()
+        _current.reset(self._token)
+        if exc_type is not None:
+            self.attrs = {**self.attrs, "error": exc_type.__name__}
+        self.tracer._record(self, end)
+        return False
+
+
+class Tracer:
+    """In-process tracer producing Chrome trace event files.
+
+    Spans nest through a context variable, so they follow the code across
+    function calls; use `wrap` to carry the current span into a thread pool.
+    While disabled, `span()` returns a shared no-op object and records nothing.
+    The output loads in chrome://tracing and https://ui.perfetto.dev.
+    """
+    def __init__(self, max_events: int = TRACE_MAX_EVENTS):
+        """Initialize a disabled Tracer.
+
+        Args:
+            max_events (int, optional): Spans kept in memory before new ones are dropped.
+        """
+        self.enabled = False
+        self.max_events = max_events
+        self.dropped = 0
+        self._events = []
+        self._threads = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._epoch = perf_counter_ns()
+        self._exit_path = None
+
+    def enable(self, export_on_exit: str = None) -> None:
+        """Start recording spans.
+
+        Args:
+            export_on_exit (str, optional): Write the trace to this file when the process exits.
+        """
+        self.enabled = True
+        if export_on_exit and self._exit_path is None:
+            atexit.register(lambda: self.export(self._exit_path))
+        if export_on_exit:
+            self._exit_path = export_on_exit
+
+    def disable(self) -> None:
+        """Stop recording spans. Already recorded spans are kept until `clear`."""
+        self.enabled = False
+
+    def clear(self) -> None:
+        """Forget all recorded spans."""
+        with self._lock:
+            self._events = []
+            self._threads = {}
+            self.dropped = 0
+
+    def span(self, name: str, **attrs):
+        """Return a context manager timing a named section of work.
+
+        Args:
+            name (str): Span name, e.g. "split_task"
+            **attrs: Attributes such as task_id or agent, inherited by nested spans
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, attrs)
+
+    def wrap(self, fn):
+        """Bind a callable to the current trace context, for running it on another thread."""
+        if not self.enabled:
+            return fn
+        context = contextvars.copy_context()
+        return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
+
+    def _record(self, span: Span, end: int):
+        thread = threading.current_thread()
+        event = {
+            "name": span.name,
+            "cat": "agent-ants",
+            "ph": "X",
+            "ts": (span.start - self._epoch) / 1000,
+            "dur": (end - span.start) / 1000,
+            "pid": os.getpid(),
+            "tid": thread.ident,
+            "args": {**span.attrs, "span_id": span.span_id, "parent_id": span.parent_id},
+        }
+        with self._lock:
+            if len(self._events) >= self.max_events:
+                self.dropped += 1
+                return
+            self._events.append(event)
+            self._threads[thread.ident] = thread.name
+
+    def spans(self) -> list[dict]:
+        """Return the recorded spans as Chrome trace "complete" events."""
+        with self._lock:
+            return list(self._events)
+
+    def export(self, path) -> Path:
+        """Write the recorded spans as a Chrome trace JSON file.
+
+        Args:
+            path (str | Path): Destination file
+
+        Returns:
+            Path: The written file
+        """
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+            for tid, name in threads.items()
+        ]
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms",
+                       "otherData": {"dropped_spans": self.dropped}}, f)
+        return path
+
+
+tracer = Tracer()
+if TRACE_FILE:
+    tracer.enable(export_on_exit=TRACE_FILE)
@@ -0,0 +1,233 @@
+import bisect
+import json
+import lzma
+import os
+import struct
+import zlib
+from pathlib import Path
+from core.logger import LazyLogger
+import memory.memory as memory_store
+
+logger = LazyLogger("archive")
+
+SEGMENT_MAGIC = b"ANTS"
+SEGMENT_VERSION = 1
+SEGMENT_SUFFIX = ".seg"
+BLOCK_ENTRIES = 64
+# The newest segment of an agent takes further entries until it reaches this size on disk
+SEGMENT_ROLL_BYTES = 256 * 1024
+
+HEADER = struct.Struct("<4sBB")     # magic, version, codec
+TRAILER = struct.Struct("<I4s")     # index length, magic
+
+CODECS = {
+    "zlib": (1, lambda data: zlib.compress(data, 6), zlib.decompress),
+    "lzma": (2, lzma.compress, lzma.decompress),
+}
+CODEC_IDS = {codec_id: name for name, (codec_id, _, _) in CODECS.items()}
+
+
+def _time_range(entries: list[dict]) -> tuple:
+    stamps = [e["ts"] for e in entries if isinstance(e.get("ts"), (int, float))]
+    return (min(stamps), max(stamps)) if stamps else (None, None)
+
+
+def write_segment(path: Path, entries: list[dict], codec: str = "zlib", block_entries: int = BLOCK_ENTRIES) -> int:
+    """Write memory entries to an immutable compressed segment file.
+
+    The file consists of a small header, independently compressed blocks of
+    JSON lines, and a footer index with the offset, entry range and time range
+    of every block, so readers can jump straight to the block they need.
+
+    Args:
+        path (Path): Destination file
+        entries (list[dict]): Memory records, oldest first
+        codec (str, optional): "zlib" or "lzma". Defaults to "zlib".
+        block_entries (int, optional): Entries per compressed block. Defaults to 64.
+
+    Returns:
+        int: Number of uncompressed JSON bytes written, for compression ratio reporting
+    """
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec '{codec}'. Use one of: {', '.join(CODECS)}")
+    codec_id, compress, _ = CODECS[codec]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    raw_size = 0
+    blocks = []
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(SEGMENT_MAGIC, SEGMENT_VERSION, codec_id))
+        for first in range(0, len(entries), block_entries):
+            chunk = entries[first:first + block_entries]
+            raw = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in chunk).encode("utf-8")
+            data = compress(raw)
+            raw_size += len(raw)
+            blocks.append([f.tell(), len(data), first, len(chunk), *_time_range(chunk)])
+            f.write(data)
+        t_min, t_max = _time_range(entries)
+        index = json.dumps({"count": len(entries), "t_min": t_min, "t_max": t_max, "blocks": blocks},
+                           separators=(",", ":")).encode("utf-8")
+        f.write(index)
+        f.write(TRAILER.pack(len(index), SEGMENT_MAGIC))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return raw_size
+
+
+class SegmentReader:
+    """Random access reader for a cold memory segment.
+
+    Only the footer index is read on open; entries are decompressed one block
+    at a time when they are requested.
+    """
+    def __init__(self, path: Path):
+        """Open a segment and read its footer index.
+
+        Args:
+            path (Path): The segment file
+
+        Raises:
+            ValueError: If the file is not a valid segment
+        """
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            magic, version, codec_id = HEADER.unpack(f.read(HEADER.size))
+            f.seek(-TRAILER.size, os.SEEK_END)
+            index_len, trailer_magic = TRAILER.unpack(f.read(TRAILER.size))
+            if magic != SEGMENT_MAGIC or trailer_magic != SEGMENT_MAGIC or version != SEGMENT_VERSION:
+                raise ValueError(f"{self.path} is not a memory segment")
+            f.seek(-TRAILER.size - index_len, os.SEEK_END)
+            index = json.loads(f.read(index_len))
+        self.codec = CODEC_IDS[codec_id]
+        self.count = index["count"]
+        self.t_min = index["t_min"]
+        self.t_max = index["t_max"]
+        self.blocks = index["blocks"]
+
+    def __len__(self):
+        return self.count
+
+    def read_block(self, block_no: int) -> list[dict]:
+        """Decompress and return the entries of a single block."""
+        offset, length = self.blocks[block_no][:2]
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data = CODECS[self.codec][2](f.read(length))
+        return [json.loads(line) for line in data.decode("utf-8").splitlines()]
+
+    def entry(self, i: int) -> dict:
+        """Return the i-th entry of the segment, decompressing only its block."""
+        if not 0 <= i < self.count:
+            raise IndexError(f"Entry {i} out of range for segment with {self.count} entries")
+        block_no = bisect.bisect_right([block[2] for block in self.blocks], i) - 1
+        return self.read_block(block_no)[i - self.blocks[block_no][2]]
+
+    def entries_between(self, start: float, end: float) -> list[dict]:
+        """Return entries with a timestamp in [start, end], skipping blocks outside the range."""
+        found = []
+        for block_no, (_, _, _, _, t_min, t_max) in enumerate(self.blocks):
+            if t_min is None or t_max < start or t_min > end:
+                continue
+            found.extend(e for e in self.read_block(block_no)
+                         if isinstance(e.get("ts"), (int, float)) and start <= e["ts"] <= end)
+        return found
+
+    def __iter__(self):
+        for block_no in range(len(self.blocks)):
+            yield from self.read_block(block_no)
+
+
+class ColdArchive:
+    """The immutable, compressed part of an agent's memory history.
+
+    Segments live in `data/archive/<agent>/` and are numbered in the order they
+    were written, so iterating them yields the history oldest first.
+    """
+    def __init__(self, agent_name: str, root: Path = None):
+        """Initialize a ColdArchive for one agent.
+
+        Args:
+            agent_name (str): The agent whose history is archived
+            root (Path, optional): Archive root directory. Defaults to data/archive.
+        """
+        self.agent_name = agent_name
+        self.path = Path(root or memory_store.MEMORY_DIR / "archive") / agent_name
+
+    def segments(self) -> list[SegmentReader]:
+        """Return readers for all segments, oldest first."""
+        if not self.path.exists():
+            return []
+        return [SegmentReader(p) for p in sorted(self.path.glob(f"*{SEGMENT_SUFFIX}"))]
+
+    def append(self, entries: list[dict], codec: str = "zlib") -> tuple[int, int]:
+        """Seal entries into the newest segment, or into a new one once it is full.
+
+        Agents evict a few entries at a time, so the newest segment is rewritten
+        with them, atomically, until it reaches SEGMENT_ROLL_BYTES. The number of
+        segments grows with the size of the history, not with the number of
+        evictions.
+
+        Returns:
+            tuple[int, int]: Uncompressed and compressed size in bytes of the segment written
+        """
+        existing = sorted(self.path.glob(f"*{SEGMENT_SUFFIX}")) if self.path.exists() else []
+        if existing and existing[-1].stat().st_size < SEGMENT_ROLL_BYTES:
+            path = existing[-1]
+            entries = [*SegmentReader(path), *entries]
+        else:
+            seq = int(existing[-1].stem) + 1 if existing else 0
+            path = self.path / f"{seq:06d}{SEGMENT_SUFFIX}"
+        raw_size = write_segment(path, entries, codec=codec)
+        logger.debug(f"[ARCHIVE] Sealed {len(entries)} entries of '{self.agent_name}' into {path.name}")
+        return raw_size, path.stat().st_size
+
+    def __iter__(self):
+        for segment in self.segments():
+            yield from segment
+
+    def entries_between(self, start: float, end: float) -> list[dict]:
+        """Return archived entries with a timestamp in [start, end]."""
+        found = []
+        for segment in self.segments():
+            if segment.t_min is None or segment.t_max < start or segment.t_min > end:
+                continue
+            found.extend(segment.entries_between(start, end))
+        return found
+
+    def size(self) -> int:
+        """Return the total on-disk size of the archive in bytes."""
+        return sum(p.stat().st_size for p in self.path.glob(f"*{SEGMENT_SUFFIX}")) if self.path.exists() else 0
+
+
+def archive_agent_memory(name: str, keep_hot: int = 50, codec: str = "zlib") -> dict:
+    """Move all but the latest entries of an agent's hot memory into a cold segment.
+
+    Args:
+        name (str): Name of the agent
+        keep_hot (int, optional): Entries that stay in data/<agent>.json. Defaults to 50.
+        codec (str, optional): "zlib" or "lzma". Defaults to "zlib".
+
+    Returns:
+        dict: Report with the archived entry count and the sizes before and after
+    """
+    hot_path = memory_store.MEMORY_DIR / f"{name}.json"
+    archive = ColdArchive(name)
+    before = (hot_path.stat().st_size if hot_path.exists() else 0) + archive.size()
+    memory = list(memory_store.load_agent_memory(name))
+    cutoff = max(len(memory) - keep_hot, 0)
+    raw_size = compressed_size = 0
+    if cutoff:
+        raw_size, compressed_size = archive.append(memory[:cutoff], codec=codec)
+        memory_store.save_agent_memory(name, memory[cutoff:])
+    after = hot_path.stat().st_size if hot_path.exists() else 0
+    logger.info(f"[ARCHIVE] '{name}': archived {cutoff} entries, kept {len(memory) - cutoff} hot")
+    return {
+        "agent": name,
+        "archived": cutoff,
+        "hot": len(memory) - cutoff,
+        "raw_bytes": raw_size,
+        "compressed_bytes": compressed_size,
+        "bytes_before": before,
+        "bytes_after": after + archive.size(),
+    }
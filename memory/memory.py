@@ -1,24 +1,71 @@
+import atexit
 import json
+import os
+import threading
+import time
+from collections import deque
+from enum import Enum
 from pathlib import Path
-from core.logger import get_logger
+from core.logger import LazyLogger
+from core.tracing import tracer
 
-logger = get_logger("memory")
+logger = LazyLogger("memory")
 
 MEMORY_DIR = Path("data")
 
-def _save_memory(agent_name, memory):
+MEMORY_DURABILITY = os.getenv("MEMORY_DURABILITY", "interval")
+MEMORY_BATCH_SIZE = int(os.getenv("MEMORY_BATCH_SIZE", "32"))
+MEMORY_FLUSH_INTERVAL = float(os.getenv("MEMORY_FLUSH_INTERVAL", "1.0"))
+MEMORY_FSYNC_INTERVAL = float(os.getenv("MEMORY_FSYNC_INTERVAL", "5.0"))
+MEMORY_MAX_PENDING = int(os.getenv("MEMORY_MAX_PENDING", "1024"))
+# Entries a hot memory file may hold before the oldest half moves to the cold archive; 0 never archives
+MEMORY_HOT_ENTRIES = int(os.getenv("MEMORY_HOT_ENTRIES", "1000"))
+
+
+class Durability(str, Enum):
+    NONE = "none"           # Rely on the OS page cache, never fsync
+    INTERVAL = "interval"   # fsync at most once per fsync interval
+    ALWAYS = "always"       # fsync after every write
+
+
+def memory_path(agent_name) -> Path:
+    """Return the file holding an agent's memory in the current memory directory."""
+    return MEMORY_DIR / f"{agent_name}.json"
+
+def _save_memory(agent_name, memory, fsync=False, path=None):
     """Save agent memory to a JSON file.
     
+    The file is written to a temporary path first and then atomically
+    moved into place, so a crash mid-write never leaves a truncated file.
+
     Args:
         agent_name (str): Name of the agent whose memory is being saved
         memory (list): The memory data to save
+        fsync (bool, optional): Force the data to disk before the rename. Defaults to False.
+        path (Path, optional): Destination file. Defaults to the agent's file in MEMORY_DIR.
     """
-    path = MEMORY_DIR / f"{agent_name}.json"
-    MEMORY_DIR.mkdir(exist_ok=True)
-    with open(path, "w") as f:
+    path = Path(path) if path else memory_path(agent_name)
+    tmp_path = path.with_suffix(".json.tmp")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(tmp_path, "w") as f:
         json.dump(memory, f, indent=2)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
     logger.debug(f"[<] Memory saved for agent '{agent_name}'")
 
+def _persist(agent_name, path, memory, evicted=(), fsync=False):
+    """Seal evicted entries into the agent's cold archive, then save the hot memory.
+
+    The archive is written first, so a crash in between duplicates entries
+    rather than losing them.
+    """
+    if evicted:
+        from memory.archive import ColdArchive
+        ColdArchive(agent_name, root=Path(path).parent / "archive").append(list(evicted))
+    _save_memory(agent_name, list(memory), fsync=fsync, path=path)
+
 def _load_memory(agent_name, path=None):
     """Load agent memory from a JSON file.
     
@@ -35,6 +82,219 @@ def _load_memory(agent_name, path=None):
             return json.load(f)
     return []
 
+
+class MemoryWriter:
+    """Write-behind buffer for agent memory.
+
+    Agents submit their memory after each task and return immediately. A single
+    flusher thread coalesces pending updates per agent and writes them once the
+    agent has `batch_size` unsaved records or `flush_interval` seconds have passed.
+    The number of unsaved records is bounded by `max_pending`; when the buffer is
+    full, `submit` blocks until the flusher catches up.
+
+    Entries an agent drops from its working set are submitted as `evicted`; they
+    are sealed into the agent's cold archive before its hot file is rewritten
+    without them, so bounded agents never lose history on disk. Memory that
+    grows past `hot_entries` is trimmed to half of it the same way, so hot files
+    stay small without anyone running `agentctl archive`.
+    """
+    def __init__(self, durability: str = MEMORY_DURABILITY, batch_size: int = MEMORY_BATCH_SIZE,
+                 flush_interval: float = MEMORY_FLUSH_INTERVAL, fsync_interval: float = MEMORY_FSYNC_INTERVAL,
+                 max_pending: int = MEMORY_MAX_PENDING, hot_entries: int = MEMORY_HOT_ENTRIES):
+        """Initialize a new MemoryWriter instance.
+
+        Args:
+            durability (str, optional): One of "none", "interval" or "always". Defaults to "interval".
+            batch_size (int, optional): Unsaved records per agent that trigger a flush. Defaults to 32.
+            flush_interval (float, optional): Maximum age in seconds of an unsaved record. Defaults to 1.0.
+            fsync_interval (float, optional): Minimum seconds between fsyncs in "interval" mode. Defaults to 5.0.
+            max_pending (int, optional): Maximum unsaved records across all agents. Defaults to 1024.
+            hot_entries (int, optional): Entries in a hot file that trigger archiving; 0 disables it.
+                Defaults to 1000.
+        """
+        self.durability = Durability(durability)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.max_pending = max(1, max_pending)
+        self.hot_entries = hot_entries
+        self._pending = {}          # memory file -> [agent name, memory list, unsaved count, first unsaved timestamp,
+                                    #                 evicted entries]
+        self._pending_count = 0
+        self._last_fsync = time.monotonic()
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="memory-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, agent_name: str, memory: list, timeout: float = None, path: Path = None,
+               evicted: list = ()) -> int:
+        """Queue an agent's memory for saving.
+
+        The destination file is resolved now, not at flush time, so a save queued
+        while MEMORY_DIR points elsewhere (e.g. a test's temporary directory) still
+        lands there.
+
+        Args:
+            agent_name (str): Name of the agent whose memory changed
+            memory (list): The agent's memory list, written as a snapshot at flush time
+            timeout (float, optional): Maximum seconds to wait for buffer space. Defaults to None (wait forever).
+            path (Path, optional): Destination file. Defaults to the agent's file in MEMORY_DIR.
+            evicted (list, optional): Entries dropped from `memory` since it was last submitted, oldest first,
+                to be archived. Defaults to ().
+
+        Returns:
+            int: Entries trimmed from the front of `memory` because it passed `hot_entries`
+
+        Raises:
+            TimeoutError: If the buffer stayed full for longer than `timeout`
+        """
+        path = Path(path) if path else memory_path(agent_name)
+        trimmed = self._trim(memory)
+        if trimmed:
+            evicted = [*evicted, *trimmed]
+            logger.debug(f"[ARCHIVE] '{agent_name}' passed {self.hot_entries} hot entries, archiving {len(trimmed)}")
+        with self._cond:
+            if not self._closed and self._pending_count >= self.max_pending:
+                logger.debug(f"[BACKPRESSURE] Memory buffer full, '{agent_name}' waits for flush")
+                self._cond.notify_all()
+                if not self._cond.wait_for(lambda: self._pending_count < self.max_pending or self._closed, timeout):
+                    raise TimeoutError(f"Memory buffer is full ({self.max_pending} unsaved records)")
+            if not self._closed:
+                entry = self._pending.get(path)
+                if entry is None:
+                    self._pending[path] = [agent_name, memory, 1, time.monotonic(), list(evicted)]
+                    self._cond.notify_all()
+                else:
+                    entry[1] = memory
+                    entry[2] += 1
+                    entry[4].extend(evicted)
+                    if entry[2] >= self.batch_size:
+                        self._cond.notify_all()
+                self._pending_count += 1
+                return len(trimmed)
+        # Closed, or closing: nothing flushes the buffer anymore, so write now, after anything
+        # still pending for the same file
+        with self._io_lock:
+            with self._cond:
+                entry = self._pending.pop(path, None)
+            count, earlier = (entry[2], entry[4]) if entry else (0, [])
+            self._write([(path, [agent_name, memory, count, None, [*earlier, *evicted]])],
+                        force_fsync=self.durability is not Durability.NONE)
+        return len(trimmed)
+
+    def _trim(self, memory) -> list:
+        """Remove and return the oldest entries of memory that has grown past `hot_entries`.
+
+        This runs on the submitting agent's thread, the only one appending to
+        its memory, so the entries removed are exactly the ones returned.
+        """
+        if not self.hot_entries or len(memory) <= self.hot_entries:
+            return []
+        count = len(memory) - self.hot_entries // 2
+        if isinstance(memory, deque):
+            return [memory.popleft() for _ in range(count)]
+        trimmed = memory[:count]
+        del memory[:count]
+        return trimmed
+
+    def flush(self, agent_name: str = None) -> None:
+        """Write pending memory to disk right away.
+
+        Args:
+            agent_name (str, optional): Flush only this agent. Defaults to None (flush everything).
+        """
+        with self._io_lock:
+            with self._cond:
+                if agent_name is None:
+                    batch = list(self._pending.items())
+                    self._pending.clear()
+                else:
+                    batch = [(path, self._pending.pop(path)) for path, entry in list(self._pending.items())
+                             if entry[0] == agent_name]
+            self._write(batch, force_fsync=self.durability is not Durability.NONE)
+
+    def close(self) -> None:
+        """Flush everything and stop the flusher thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self.flush()
+
+    def pending(self) -> int:
+        """Return the number of records that are not saved yet."""
+        with self._cond:
+            return self._pending_count
+
+    def _due(self, now: float) -> list:
+        due = [path for path, (_, _, count, since, _) in self._pending.items()
+               if count >= self.batch_size or now - since >= self.flush_interval
+               or self._pending_count >= self.max_pending]
+        return [(path, self._pending.pop(path)) for path in due]
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._closed:
+                    return
+                self._cond.wait(timeout=self.flush_interval / 2 if self._pending else None)
+            with self._io_lock:
+                with self._cond:
+                    batch = self._due(time.monotonic())
+                self._write(batch)
+
+    def _write(self, batch: list, force_fsync: bool = False) -> None:
+        """Write batches taken from the buffer; the caller holds `_io_lock` from taking them on.
+
+        Taking and writing under one lock keeps the saves of a file in the order
+        they were queued, so an older snapshot never overwrites a newer one and
+        evicted entries reach the archive in order.
+        """
+        if not batch:
+            return
+        now = time.monotonic()
+        fsync = self.durability is Durability.ALWAYS or (
+            self.durability is Durability.INTERVAL and (force_fsync or now - self._last_fsync >= self.fsync_interval)
+        )
+        written = 0
+        with tracer.span("memory.flush", agents=len(batch), fsync=fsync):
+            for path, (agent_name, memory, count, _, evicted) in batch:
+                try:
+                    _persist(agent_name, path, memory, evicted, fsync=fsync)
+                except OSError as e:
+                    logger.error(f"[<] Failed to save memory for agent '{agent_name}': {e}")
+                written += count
+        if fsync:
+            self._last_fsync = now
+        with self._cond:
+            self._pending_count -= written
+            self._cond.notify_all()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_memory_writer() -> MemoryWriter:
+    """Return the process-wide memory writer, starting it on first use."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = MemoryWriter()
+                atexit.register(_writer.close)
+    return _writer
+
+def flush_agent_memory(name=None):
+    """Write all pending memory to disk.
+
+    Args:
+        name (str, optional): Flush only this agent. Defaults to None (flush everything).
+    """
+    if _writer is not None:
+        _writer.flush(name)
+
 def load_agent_memory(name):
     """Load an agent's memory from the default memory directory.
     
@@ -45,7 +305,8 @@ def load_agent_memory(name):
         list: The agent's memory data
     """
     logger.debug(f"[>] Loading memory for agent '{name}'")
-    return _load_memory(name, MEMORY_DIR / f"{name}.json")
+    flush_agent_memory(name)
+    return _load_memory(name, memory_path(name))
 
 def save_agent_memory(name, memory):
     """Save an agent's memory to the default memory directory.
@@ -55,4 +316,49 @@ def save_agent_memory(name, memory):
         memory (list): The memory data to save
     """
     _save_memory(name, memory)
-    logger.debug(f"[<] Memory saved for agent '{name}'")
\ No newline at end of file
+    logger.debug(f"[<] Memory saved for agent '{name}'")
+
+def queue_agent_memory(name, memory, evicted=()):
+    """Hand an agent's memory to the write-behind buffer and return immediately.
+
+    Args:
+        name (str): Name of the agent whose memory to save
+        memory (list): The memory data to save
+        evicted (list, optional): Entries dropped from memory since the last save, to archive. Defaults to ().
+
+    Returns:
+        int: Entries trimmed from memory and archived because it passed MEMORY_HOT_ENTRIES
+    """
+    return get_memory_writer().submit(name, memory, evicted=evicted)
+
+def sweep_orphaned_memory(ttl: float, keep=(), pattern: str = "*_auto_*.json", now: float = None) -> list[Path]:
+    """Delete memory files of spawned agents that were not touched for `ttl` seconds.
+
+    Spawned specialists (named `<task_type>_auto_<id>`) are throwaway agents, but
+    older versions persisted their memory like any other agent.
+
+    Args:
+        ttl (float): Minimum age in seconds, by modification time, of a file to delete
+        keep (Iterable[str], optional): Agent names whose files are never deleted. Defaults to ().
+        pattern (str, optional): Glob matching spawned agent files. Defaults to "*_auto_*.json".
+        now (float, optional): Current UNIX time, mainly for tests. Defaults to time.time().
+
+    Returns:
+        list[Path]: The deleted files
+    """
+    if not MEMORY_DIR.exists():
+        return []
+    now = now if now is not None else time.time()
+    keep = set(keep)
+    removed = []
+    for path in MEMORY_DIR.glob(pattern):
+        if path.stem in keep:
+            continue
+        try:
+            if now - path.stat().st_mtime >= ttl:
+                path.unlink()
+                removed.append(path)
+        except FileNotFoundError:
+            continue
+    logger.info(f"[SWEEP] Removed {len(removed)} orphaned memory file(s) older than {ttl:.0f}s")
+    return removed
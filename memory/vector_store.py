@@ -0,0 +1,80 @@
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from zlib import crc32
+
+TOKEN_PATTERN = re.compile(r"\w+")
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "do", "does", "for", "from", "how", "in",
+    "is", "it", "me", "of", "on", "or", "please", "tell", "that", "the", "this", "to", "was",
+    "what", "which", "who", "why", "with", "you", "your",
+})
+
+
+def _features(text: str) -> Counter:
+    """Split text into hashed word and character trigram features.
+
+    Words carry the meaning, trigrams make the match robust to inflections
+    ("risk" vs "risks") and small typos.
+    """
+    words = [w for w in TOKEN_PATTERN.findall(text.lower()) if w not in STOPWORDS]
+    features = Counter()
+    for word in words:
+        features[crc32(word.encode())] += 2.0
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            features[crc32(padded[i:i + 3].encode()) | 1 << 32] += 0.5
+    return features
+
+
+def _normalize(features: Counter) -> dict:
+    norm = math.sqrt(sum(w * w for w in features.values()))
+    if not norm:
+        return {}
+    return {f: w / norm for f, w in features.items()}
+
+
+class VectorStore:
+    """A small in-memory similarity index for short texts.
+
+    Texts are embedded as L2-normalized sparse vectors of hashed word and
+    character trigram features, and kept in an inverted index so a lookup
+    only touches entries that share at least one feature with the query.
+    """
+    def __init__(self):
+        """Initialize an empty VectorStore."""
+        self._payloads = []
+        self._postings = defaultdict(list)     # feature -> [(entry index, weight)]
+
+    def __len__(self):
+        return len(self._payloads)
+
+    def add(self, text: str, payload) -> None:
+        """Index a text together with an arbitrary payload.
+
+        Args:
+            text (str): The text to index
+            payload: Anything to return when this text matches
+        """
+        index = len(self._payloads)
+        self._payloads.append(payload)
+        for feature, weight in _normalize(_features(text)).items():
+            self._postings[feature].append((index, weight))
+
+    def search(self, text: str, k: int = 1) -> list[tuple[float, object]]:
+        """Find the indexed texts most similar to the given one.
+
+        Args:
+            text (str): The query text
+            k (int, optional): Number of results to return. Defaults to 1.
+
+        Returns:
+            list[tuple[float, object]]: Up to k (cosine similarity, payload) pairs, best first
+        """
+        scores = defaultdict(float)
+        for feature, weight in _normalize(_features(text)).items():
+            for index, entry_weight in self._postings.get(feature, ()):
+                scores[index] += weight * entry_weight
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(min(score, 1.0), self._payloads[index]) for index, score in best]
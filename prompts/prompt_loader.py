@@ -1,13 +1,18 @@
 from pathlib import Path
+from core.registry import registry
 
 PROMPT_DIR = Path("prompts")
 DEFAULT_PROMPT_FILE = PROMPT_DIR / "default.txt"
 
+def _read_text(path: Path) -> str:
+    return path.read_text(encoding="utf-8")
+
 def load_prompt(agent_name: str) -> str:
     """Load a system prompt for a specific agent.
     
     This function attempts to load a system prompt from a text file in the 'prompts'
-    directory. If the file doesn't exist, a default prompt is returned.
+    directory. If the file doesn't exist, a default prompt is returned. Prompts are
+    cached in the shared registry and re-read only when the file changes.
     
     Args:
         agent_name (str): The name of the agent whose prompt to load
@@ -15,18 +20,12 @@ def load_prompt(agent_name: str) -> str:
     Returns:
         str: The system prompt for the agent, or a default prompt if the file doesn't exist
     """
-    prompt_file = PROMPT_DIR / f"{agent_name}.txt"
-    if prompt_file.exists():
-        return prompt_file.read_text(encoding="utf-8")
-    return ""
+    return registry.get(PROMPT_DIR / f"{agent_name}.txt", _read_text, default="")
 
 def load_default_prompt() -> str:
     """Load the default system prompt."""
-    return DEFAULT_PROMPT_FILE.read_text(encoding="utf-8")
+    return registry.get(DEFAULT_PROMPT_FILE, _read_text)
 
 def read_prompt_file(name: str) -> str:
     """Read a prompt file and return its content."""
-    file_path = PROMPT_DIR / f"{name}.txt"
-    if file_path.exists():
-        return file_path.read_text(encoding="utf-8")
-    raise FileNotFoundError(f"Prompt file {file_path} does not exist.")
\ No newline at end of file
+    return registry.get(PROMPT_DIR / f"{name}.txt", _read_text)
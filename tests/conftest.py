@@ -1,6 +1,14 @@
 import pytest
+import asyncio
 import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
+import core.llm as llm
+import memory.memory as memory_module
+from api.main import ApiServer
 from agents.base import Agent
 from core.swarm import Swarm
 from dotenv import load_dotenv
@@ -35,3 +43,82 @@ def existing_agent(agent_name, memory_file):
 
     if memory_file.exists():
         memory_file.unlink()
+
+
+class StubLLM(BaseHTTPRequestHandler):
+    """Answers like Ollama's /api/generate, after an optional delay."""
+    delay = 0.0
+    active = peak = 0       # requests being answered at once, and the most seen
+    lock = threading.Lock()
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with StubLLM.lock:
+            StubLLM.active += 1
+            StubLLM.peak = max(StubLLM.peak, StubLLM.active)
+        try:
+            time.sleep(StubLLM.delay)
+        finally:
+            with StubLLM.lock:
+                StubLLM.active -= 1
+        prompt = payload["prompt"]
+        if prompt.startswith("Split"):
+            response = "Find facts about ants\nFind facts about bees"
+        elif prompt.startswith("Here is a list of task categories"):
+            response = "research"
+        else:
+            response = f"stub answer to: {prompt[:30]}"
+        if payload.get("stream"):
+            # One JSON object per word, like Ollama's streamed responses
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+            for word in re.findall(r"\S+\s*", response):
+                self.wfile.write(json.dumps({"response": word, "done": False}).encode() + b"\n")
+                self.wfile.flush()
+            self.wfile.write(json.dumps({"response": "", "done": True, "context": [1, 2, 3]}).encode() + b"\n")
+            return
+        body = json.dumps({"response": response, "context": [1, 2, 3]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_llm(monkeypatch, tmp_path):
+    monkeypatch.setattr(memory_module, "MEMORY_DIR", tmp_path)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubLLM)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/generate"
+    monkeypatch.setattr(llm, "LLM_API_URL", url)
+    monkeypatch.setenv("LLM_API_URL", url)     # for worker processes
+    StubLLM.delay = 0.0
+    StubLLM.peak = 0
+    yield StubLLM
+    memory_module.flush_agent_memory()     # before MEMORY_DIR is restored
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def api():
+    started = []
+
+    def start(**kwargs):
+        loop = asyncio.new_event_loop()
+        threading.Thread(target=loop.run_forever, daemon=True).start()
+        server = ApiServer(swarm=Swarm(), **kwargs)
+        host, port = asyncio.run_coroutine_threadsafe(server.start("127.0.0.1", 0), loop).result()
+        started.append((loop, server))
+        return f"http://{host}:{port}", server
+
+    yield start
+    for loop, server in started:
+        asyncio.run_coroutine_threadsafe(server.stop(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
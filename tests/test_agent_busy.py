@@ -0,0 +1,27 @@
+import threading
+import pytest
+from agents.base import Agent, AgentBusy
+from core.task import Task
+
+
+def test_an_agent_runs_one_task_at_a_time(stub_llm):
+    stub_llm.delay = 0.2
+    agent = Agent(name="busy_researcher", config={"task_type": "research"})
+    results, errors = [], []
+
+    def think(i):
+        try:
+            results.append(agent.think(Task(f"Find facts {i}")))
+        except AgentBusy as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=think, args=(i,)) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 1 and len(errors) == 1
+    assert not agent.busy and len(agent.memory) == 1
+    with pytest.raises(ValueError):
+        agent.think("not a task")
+    assert not agent.busy
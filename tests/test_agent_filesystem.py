@@ -3,6 +3,8 @@ from pathlib import Path
 from agents.base import Agent
 from unittest.mock import patch
 from core.task import Task
+from memory.memory import flush_agent_memory
+from core.logger import flush_logs
 
 DATA_DIR = Path("data")
 LOG_DIR = Path("logs")
@@ -29,7 +31,8 @@ def test_agent_creates_memory_and_log(mock_generate):
     assert "internal" not in result
     assert "External visible output." in result
 
-    # Memory file created
+    # Memory file created once the write-behind buffer is flushed
+    flush_agent_memory(agent_name)
     assert mem_path.exists()
     with open(mem_path) as f:
         mem = json.load(f)
@@ -38,7 +41,8 @@ def test_agent_creates_memory_and_log(mock_generate):
         assert "response" in mem[0]
         assert "internal" not in mem[0]["response"]
 
-    # Log file created
+    # Log file created once the log queue is drained
+    flush_logs()
     assert log_path.exists()
     log_content = log_path.read_text()
     assert "[THINKING]" in log_content
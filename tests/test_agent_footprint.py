@@ -0,0 +1,51 @@
+from unittest.mock import patch
+import pytest
+from agents.base import Agent, Queen
+
+
+def test_agents_have_no_instance_dict():
+    agent = Agent(name="compact", config={"task_type": "research"})
+    assert not hasattr(agent, "__dict__")
+    with pytest.raises(AttributeError):
+        agent.unexpected = 1
+
+
+def test_agents_with_same_role_share_profile():
+    config = {"task_type": "analysis", "llm": {"caste": "minor"}}
+    first = Agent(name="shared_a", role="analyst", config=config)
+    second = Agent(name="shared_b", role="analyst", config=dict(config))
+    other = Agent(name="shared_c", role="researcher", config=config)
+    assert first._profile is second._profile
+    assert first._profile is not other._profile
+    assert first.llm_config["caste"] == "minor"
+    with pytest.raises(TypeError):
+        first.llm_config["caste"] = "queen"
+
+
+@patch("agents.base.load_agent_memory", return_value=[{"task": "t", "response": "r"}])
+@patch("agents.base.get_logger")
+def test_id_logger_and_memory_are_lazy(mock_get_logger, mock_load):
+    agent = Agent(name="lazy_agent", config={"llm": {"caste": "queen"}})
+    assert agent._id is None
+    mock_get_logger.assert_not_called()
+    mock_load.assert_not_called()
+
+    assert agent.memory[0]["task"] == "t"
+    assert agent.id == agent.id and len(agent.id) == 36
+    agent.logger
+    mock_get_logger.assert_called_once_with("agent", agent_name="lazy_agent")
+
+
+def test_spawned_specialists_share_one_logger():
+    queen = Queen("queen")
+    first = queen.spawn_specialist("research")
+    second = queen.spawn_specialist("research")
+    assert first.spawned and second.spawned
+    assert first._profile is second._profile
+    assert first.logger.logger is second.logger.logger
+    assert first.logger.process("hi", {})[0] == f"[{first.name}] hi"
+
+
+def test_queen_keeps_its_own_logger_name():
+    queen = Queen("queen_footprint")
+    assert queen.logger.name == "queen.queen_footprint"
@@ -0,0 +1,79 @@
+from unittest.mock import patch
+from agents.base import Agent
+from core.task import Task
+from memory.vector_store import VectorStore
+
+PAST_MEMORY = [
+    {"task": "How risky is AGI in 5 years?", "response": "Moderately risky."},
+    {"task": "What is the capital of France?", "response": "Paris."},
+]
+
+
+def reuse_agent(mode="return", threshold=0.5):
+    agent = Agent(name="reuse_test", config={
+        "task_type": "research",
+        "reuse": {"enabled": True, "threshold": threshold, "mode": mode, "hint_model": "tinyllama"},
+    })
+    agent.memory = [dict(record) for record in PAST_MEMORY]
+    return agent
+
+
+def test_vector_store_ranks_paraphrase_first():
+    store = VectorStore()
+    for i, record in enumerate(PAST_MEMORY):
+        store.add(record["task"], i)
+    score, payload = store.search("capital city of France")[0]
+    assert payload == 1
+    assert 0 < score <= 1
+
+
+@patch("agents.base.queue_agent_memory")
+@patch("agents.base.generate")
+def test_think_returns_stored_response_above_threshold(mock_generate, _):
+    agent = reuse_agent()
+    result = agent.think(Task("What's the capital city of France?"))
+    assert result == "Paris."
+    mock_generate.assert_not_called()
+    assert agent.reuse_stats.hits == 1
+    assert agent.reuse_stats.hit_rate == 1.0
+
+
+@patch("agents.base.queue_agent_memory")
+@patch("agents.base.generate", return_value="Paris, still.")
+def test_think_hints_cheaper_model(mock_generate, _):
+    agent = reuse_agent(mode="hint")
+    result = agent.think(Task("What's the capital city of France?"))
+    assert result == "Paris, still."
+    assert mock_generate.call_args.kwargs["model"] == "tinyllama"
+    assert "Paris." in mock_generate.call_args.kwargs["prompt"]
+    assert agent.reuse_stats.hinted == 1
+
+
+@patch("agents.base.queue_agent_memory")
+@patch("agents.base.generate", return_value="Tomatoes are fruit.")
+def test_think_generates_below_threshold_and_indexes_answer(mock_generate, _):
+    agent = reuse_agent(threshold=0.95)
+    assert agent.think(Task("Is a tomato a fruit?")) == "Tomatoes are fruit."
+    assert agent.reuse_stats.generations == 1
+
+    agent.reuse_config = {**agent.reuse_config, "threshold": 0.5}
+    assert agent.think(Task("Is tomato a fruit?")) == "Tomatoes are fruit."
+    assert mock_generate.call_count == 1
+    assert agent.reuse_stats.as_dict()["hits"] == 1
+
+
+@patch("agents.base.queue_agent_memory")
+@patch("agents.base.generate", return_value="Fresh answer.")
+def test_reuse_is_opt_in(mock_generate, _):
+    agent = Agent(name="reuse_test", config={"task_type": "research"})
+    agent.memory = [dict(record) for record in PAST_MEMORY]
+    assert agent.think(Task("What is the capital of France?")) == "Fresh answer."
+    assert agent.reuse_stats.lookups == 0
+
+
+def test_reconfiguring_one_agent_leaves_its_profile_peers_alone():
+    agent, peer = reuse_agent(), reuse_agent()
+    agent.task_type = "analysis"
+    agent.llm_config = {"model": "tinyllama"}
+    assert (agent.task_type, agent.llm_config["model"], agent.reuse_config["mode"]) == ("analysis", "tinyllama", "return")
+    assert peer.task_type == "research" and "model" not in peer.llm_config
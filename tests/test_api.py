@@ -0,0 +1,138 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import requests
+from agents.base import Agent
+
+
+def test_agent_crud_assign_and_memory(stub_llm, api):
+    url, _ = api()
+    assert requests.post(f"{url}/agents", json={"name": "researcher", "config": {"task_type": "research"}}).status_code == 201
+    assert requests.get(f"{url}/agents").json() == {"agents": ["researcher"]}
+    assert requests.get(f"{url}/agents/researcher").json()["task_type"] == "research"
+
+    result = requests.post(f"{url}/agents/researcher/assign", json={"task": "Find facts about ants"})
+    assert result.status_code == 200
+    assert result.json()["response"].startswith("stub answer to: Find facts about ants")
+
+    memory = requests.get(f"{url}/agents/researcher/memory", params={"limit": 5}).json()
+    assert memory["total"] == 1 and memory["entries"][0]["task"] == "Find facts about ants"
+    matches = requests.get(f"{url}/agents/researcher/memory", params={"q": "facts about ants"}).json()["matches"]
+    assert matches[0]["task"] == "Find facts about ants" and matches[0]["score"] > 0.5
+
+    assert requests.delete(f"{url}/agents/researcher").status_code == 204
+    assert requests.get(f"{url}/agents/researcher").status_code == 404
+
+
+def test_orchestrate_end_to_end(stub_llm, api):
+    url, _ = api()
+    requests.post(f"{url}/agents", json={"name": "researcher", "config": {"task_type": "research"}})
+    result = requests.post(f"{url}/orchestrate", json={"task": "Research ants and bees", "force": True})
+    assert result.status_code == 200
+    assert list(result.json()["results"]) == ["Find facts about ants", "Find facts about bees"]
+    assert all(output.startswith("stub answer") for output in result.json()["results"].values())
+
+
+def test_bad_requests_are_rejected(stub_llm, api):
+    url, _ = api()
+    assert requests.post(f"{url}/agents", json={"name": "../etc"}).status_code == 400
+    assert requests.post(f"{url}/agents/nobody/assign", json={"task": "x"}).status_code == 404
+    assert requests.put(f"{url}/agents").status_code == 405
+    assert requests.post(f"{url}/orchestrate", data="not json").status_code == 400
+
+
+def test_saturated_server_answers_429(stub_llm, api):
+    stub_llm.delay = 0.5
+    url, server = api(workers=1, queue_size=1)
+    requests.post(f"{url}/agents", json={"name": "researcher", "config": {"task_type": "research"}})
+
+    def assign():
+        return requests.post(f"{url}/agents/researcher/assign", json={"task": "Find facts"}).status_code
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        first = pool.submit(assign)
+        while requests.get(f"{url}/health").json()["in_flight"] == 0:
+            time.sleep(0.01)
+        second = pool.submit(assign)
+        while requests.get(f"{url}/health").json()["queued"] == 0:
+            time.sleep(0.01)
+        assert assign() == 429
+        assert first.result() == 200 and second.result() == 200
+    assert server.rejected == 1
+
+
+def test_deadline_cancels_in_flight_work(stub_llm, api):
+    stub_llm.delay = 2.0
+    url, server = api(workers=1)
+    requests.post(f"{url}/agents", json={"name": "researcher", "config": {"task_type": "research"}})
+
+    started = time.monotonic()
+    response = requests.post(f"{url}/agents/researcher/assign", json={"task": "Find facts", "timeout": 0.3})
+    assert response.status_code == 504
+    assert time.monotonic() - started < 1.5
+
+    # The worker gave up on the LLM call instead of waiting for it
+    deadline = time.monotonic() + 1.5
+    while server.in_flight and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert server.in_flight == 0
+
+
+def test_tasks_assigned_to_one_agent_run_one_at_a_time(stub_llm, api, monkeypatch):
+    stub_llm.delay = 0.2
+    url, server = api(workers=4)
+    requests.post(f"{url}/agents", json={"name": "researcher", "config": {"task_type": "research"}})
+    agent = server.swarm.agents["researcher"]
+    overlaps = []
+    think = Agent.think
+
+    def watched_think(self, task, *args, **kwargs):
+        overlaps.append(self.busy)
+        return think(self, task, *args, **kwargs)
+
+    monkeypatch.setattr(Agent, "think", watched_think)
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        statuses = list(pool.map(lambda i: requests.post(f"{url}/agents/researcher/assign",
+                                                         json={"task": f"Find facts {i}"}).status_code, range(3)))
+    assert statuses == [200, 200, 200] and overlaps == [False, False, False]
+    assert len(agent.memory) == 3
+
+    agent.busy = True       # e.g. working on a subtask of an orchestration
+    assert requests.post(f"{url}/agents/researcher/assign", json={"task": "Find facts"}).status_code == 409
+
+
+def test_assign_and_orchestrate_never_run_one_agent_twice(stub_llm, api, monkeypatch):
+    import threading
+    stub_llm.delay = 0.1
+    url, server = api(workers=4)
+    requests.post(f"{url}/agents", json={"name": "researcher", "config": {"task_type": "research"}})
+    lock, running, peak = threading.Lock(), [0], [0]
+    start_timer, stop_timer = Agent.start_timer, Agent.stop_timer
+
+    def started(self):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        return start_timer(self)
+
+    def stopped(self):
+        with lock:
+            running[0] -= 1
+        return stop_timer(self)
+
+    receive_task = Agent.receive_task
+
+    def slow_receive_task(self, task_type=None):
+        accepted = receive_task(self, task_type)
+        time.sleep(0.3)         # widen the gap between the Queen's busy check and the task starting
+        return accepted
+
+    monkeypatch.setattr(Agent, "start_timer", started)
+    monkeypatch.setattr(Agent, "stop_timer", stopped)
+    monkeypatch.setattr(Agent, "receive_task", slow_receive_task)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        orchestration = pool.submit(requests.post, f"{url}/orchestrate", json={"task": "Research ants and bees"})
+        time.sleep(0.35)        # its subtasks are between the busy check and the task
+        assign = pool.submit(requests.post, f"{url}/agents/researcher/assign", json={"task": "Find facts"})
+        assert orchestration.result().status_code == 200 and assign.result().status_code in (200, 409)
+    assert peak[0] == 1
@@ -0,0 +1,163 @@
+import json
+import threading
+import time
+from unittest.mock import patch
+from typer.testing import CliRunner
+import cli.agentctl as agentctl
+import memory.memory as memory_module
+from core.batch import completed_indices, percentile, run_batch
+
+
+def write_jsonl(path, records):
+    path.write_text("".join(json.dumps(r) + "\n" for r in records))
+
+
+def read_results(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_results_keep_index_and_id_with_bounded_concurrency(tmp_path):
+    source = tmp_path / "tasks.jsonl"
+    write_jsonl(source, [{"request_id": f"r{i}", "title": "t", "body": f"task {i}"} for i in range(20)])
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def handler(record, text):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.01 * (int(text.split()[1]) % 3))
+        with lock:
+            running[0] -= 1
+        return text.upper()
+
+    report = run_batch(source, tmp_path / "out.jsonl", handler, concurrency=3)
+    results = read_results(tmp_path / "out.jsonl")
+    assert sorted(r["index"] for r in results) == list(range(20))
+    assert all(r["output"] == f"TASK {r['index']}" and r["request_id"] == f"r{r['index']}" for r in results)
+    assert peak[0] <= 3
+    assert report.processed == 20 and report.errors == 0
+    assert report.as_dict()["latency_p99_s"] >= report.as_dict()["latency_p50_s"]
+
+
+def test_killed_run_resumes_without_redoing_items(tmp_path):
+    source, output = tmp_path / "tasks.jsonl", tmp_path / "out.jsonl"
+    write_jsonl(source, [{"task": f"task {i}"} for i in range(6)])
+    output.write_text(
+        '{"index": 0, "output": "done"}\n{"index": 3, "output": "done"}\n{"index": 4, "outp'
+    )
+    seen = []
+    report = run_batch(source, output, lambda record, text: seen.append(text) or "ok", concurrency=2)
+    assert sorted(seen) == ["task 1", "task 2", "task 4", "task 5"]
+    assert report.skipped == 2
+    assert sorted(r["index"] for r in read_results(output)) == list(range(6))
+    assert completed_indices(output) == set(range(6))
+
+
+def test_bad_lines_and_failures_are_recorded(tmp_path):
+    source = tmp_path / "tasks.jsonl"
+    source.write_text('{"task": "fine"}\nnot json\n\n{"task": "boom"}\n{"other": 1}\n')
+
+    def handler(record, text):
+        if text == "boom":
+            raise RuntimeError("exploded")
+        return "ok"
+
+    report = run_batch(source, tmp_path / "out.jsonl", handler)
+    results = {r["index"]: r for r in read_results(tmp_path / "out.jsonl")}
+    assert results[0]["output"] == "ok"
+    assert "error" in results[1] and "error" in results[3]
+    assert results[2]["error"] == "RuntimeError: exploded"
+    assert report.errors == 3
+
+
+def test_resume_retries_failed_items(tmp_path):
+    source, output = tmp_path / "tasks.jsonl", tmp_path / "out.jsonl"
+    write_jsonl(source, [{"task": "fine"}, {"task": "flaky"}])
+    attempts = []
+
+    def handler(record, text):
+        attempts.append(text)
+        if text == "flaky" and attempts.count("flaky") == 1:
+            raise RuntimeError("backend down")
+        return "ok"
+
+    assert run_batch(source, output, handler).errors == 1
+    assert completed_indices(output) == {0}
+    report = run_batch(source, output, handler)
+    assert report.skipped == 1 and report.errors == 0
+    assert attempts.count("fine") == 1 and attempts.count("flaky") == 2
+    last = read_results(output)[-1]
+    assert last["index"] == 1 and last["output"] == "ok"
+
+
+def test_items_with_one_key_run_in_turn_without_holding_slots(tmp_path):
+    source = tmp_path / "tasks.jsonl"
+    write_jsonl(source, [{"task": f"slow {i}", "agent": "slow"} for i in range(4)]
+                + [{"task": f"fast {i}", "agent": f"fast_{i}"} for i in range(4)])
+    running, peak, finished = {}, {}, []
+    lock = threading.Lock()
+
+    def handler(record, text):
+        with lock:
+            running[record["agent"]] = running.get(record["agent"], 0) + 1
+            peak[record["agent"]] = max(peak.get(record["agent"], 0), running[record["agent"]])
+        time.sleep(0.05 if text.startswith("slow") else 0.01)
+        with lock:
+            running[record["agent"]] -= 1
+            finished.append(text)
+        return text
+
+    report = run_batch(source, tmp_path / "out.jsonl", handler, concurrency=4, key=lambda record: record["agent"])
+    assert report.processed == 8 and report.errors == 0
+    assert set(peak.values()) == {1}
+    assert [text for text in finished if text.startswith("slow")] == [f"slow {i}" for i in range(4)]
+    # The other agents' rows did not wait behind the slow agent's queue
+    assert finished.index("fast 3") < finished.index("slow 2")
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 50) == 0.0
+
+
+@patch("agents.base.generate", return_value="batched answer")
+def test_agentctl_batch_command(_, tmp_path, monkeypatch):
+    monkeypatch.setattr(memory_module, "MEMORY_DIR", tmp_path)
+    monkeypatch.setattr(agentctl, "SWARM_SNAPSHOT", str(tmp_path / "swarm.snapshot"))
+    monkeypatch.setattr(agentctl, "_swarm", None)
+    source = tmp_path / "tasks.jsonl"
+    write_jsonl(source, [{"task": "one"}, {"task": "two", "agent": "other_batcher"}])
+
+    result = CliRunner().invoke(agentctl.app, ["batch", str(source), "--agent", "batcher", "--concurrency", "2"])
+    assert result.exit_code == 0, result.stdout
+    results = read_results(tmp_path / "tasks.results.jsonl")
+    assert {r["output"] for r in results} == {"batched answer"}
+    assert '"processed": 2' in result.stdout
+    assert {"batcher", "other_batcher"} <= set(agentctl.get_swarm().list_agents())
+
+
+def test_agentctl_batch_runs_one_task_per_agent_at_a_time(tmp_path, monkeypatch):
+    from agents.base import Agent
+    monkeypatch.setattr(memory_module, "MEMORY_DIR", tmp_path)
+    monkeypatch.setattr(agentctl, "SWARM_SNAPSHOT", str(tmp_path / "swarm.snapshot"))
+    monkeypatch.setattr(agentctl, "_swarm", None)
+    running, peak, lock = {}, {}, threading.Lock()
+
+    def think(self, task):
+        with lock:
+            running[self.name] = running.get(self.name, 0) + 1
+            peak[self.name] = max(peak.get(self.name, 0), running[self.name])
+        time.sleep(0.02)
+        with lock:
+            running[self.name] -= 1
+        return "done"
+
+    monkeypatch.setattr(Agent, "think", think)
+    source = tmp_path / "tasks.jsonl"
+    write_jsonl(source, [{"task": f"t{i}", "agent": "serial_a" if i % 2 else "serial_b"} for i in range(8)])
+    result = CliRunner().invoke(agentctl.app, ["batch", str(source), "--concurrency", "4"])
+    assert result.exit_code == 0, result.stdout
+    assert peak == {"serial_a": 1, "serial_b": 1}
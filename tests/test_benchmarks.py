@@ -0,0 +1,85 @@
+import random
+import time
+import pytest
+import requests
+import core.llm
+from benchmarks.mock_ollama import parse_latency, start_mock_ollama, url_of
+from benchmarks.suite import compare, run_suite
+from core.llm import generate, stream_tokens
+
+
+@pytest.fixture
+def mock_ollama(monkeypatch):
+    servers = []
+
+    def start(**options):
+        servers.append(start_mock_ollama(**options))
+        monkeypatch.setattr(core.llm, "LLM_API_URL", url_of(servers[-1]))
+        return servers[-1]
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_latency_distributions():
+    rng = random.Random(1)
+    assert parse_latency("0.05")(rng) == parse_latency("fixed:0.05")(rng) == 0.05
+    assert all(0.01 <= parse_latency("uniform:0.01,0.02")(rng) <= 0.02 for _ in range(100))
+    assert min(parse_latency("normal:0.0,1.0")(rng) for _ in range(100)) == 0.0
+    draws = sorted(parse_latency("lognormal:0.1,0.5")(rng) for _ in range(1001))
+    assert 0.08 < draws[500] < 0.12
+    with pytest.raises(ValueError):
+        parse_latency("gamma:1,2")
+    with pytest.raises(ValueError):
+        parse_latency("uniform:0.1")
+
+
+def test_mock_streams_tokens_at_the_configured_speed(mock_ollama):
+    server = mock_ollama(latency="0.05", tokens=20, tokens_per_s=200)
+    pieces, started = [], time.perf_counter()
+    with stream_tokens(lambda piece: pieces.append((piece, time.perf_counter() - started))):
+        response = generate("Find facts about ants")
+    assert response.split()[:6] == ["mock", "answer", "to:", "Find", "facts", "about"]
+    assert len(response.split()) == len(pieces) == 20
+    assert pieces[0][1] >= 0.05 and pieces[-1][1] >= 0.05 + 19 / 200
+    assert server.requests == 1
+
+
+def test_mock_plans_the_requested_number_of_subtasks(mock_ollama):
+    mock_ollama()
+    response = generate("Split the following task into clear and actionable subtasks."
+                        "Limit the number of subtasks to 3!\nTask: research ants")
+    assert response.splitlines() == [f"Find facts about topic {i}" for i in range(3)]
+
+
+def test_mock_injects_failures(mock_ollama):
+    server = mock_ollama(failure_rate=1.0)
+    with pytest.raises(requests.HTTPError):
+        generate("Find facts")
+    mock_ollama(failure_rate=1.0, failure_mode="disconnect", tokens=10)
+    with pytest.raises(requests.ConnectionError):
+        generate("Find facts")
+    with pytest.raises(requests.RequestException), stream_tokens(lambda piece: None):
+        generate("Find facts")
+    assert server.failures == 1
+
+
+def test_suite_reports_every_case():
+    report = run_suite(["think", "orchestrate"], agents=[2], concurrency=[1, 2], ops=10, warmup=2)
+    assert [(r["benchmark"], r["concurrency"]) for r in report["results"]] == \
+           [("think", 1), ("think", 2), ("orchestrate", 1), ("orchestrate", 2)]
+    think = report["results"][0]
+    assert think["failed"] == 0 and think["llm_calls_per_op"] == 1.0
+    assert 0 < think["p50_ms"] <= think["p95_ms"] <= think["p99_ms"]
+    assert report["results"][2]["llm_calls_per_op"] > 2      # plan, classify, subtasks and summary
+    assert report["meta"]["ops"] == 10 and "commit" in report["meta"]
+    lines = compare(report, report)
+    assert len(lines) == 5 and "(+0.0%)" in lines[1]
+
+
+def test_operations_in_flight_never_share_agents():
+    report = run_suite(["think", "assign_task"], agents=[1], concurrency=[4], ops=40, warmup=4,
+                       latency="0.01")
+    assert [r["failed"] for r in report["results"]] == [0, 0]
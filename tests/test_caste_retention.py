@@ -0,0 +1,89 @@
+import json
+import os
+from collections import deque
+from unittest.mock import patch
+import pytest
+import memory.memory as memory_module
+from agents.base import Agent, Queen
+from core.caste import Caste, CasteTraits, get_caste_traits
+from core.task import Task
+from memory.archive import ColdArchive
+from memory.memory import flush_agent_memory, sweep_orphaned_memory
+
+
+def test_unknown_caste_gets_minor_traits():
+    assert get_caste_traits("unknown") is CasteTraits[Caste.MINOR]
+    assert get_caste_traits("larva")["memory"] is False
+
+
+@patch("agents.base.queue_agent_memory")
+@patch("agents.base.load_agent_memory")
+@patch("agents.base.generate", return_value="done")
+def test_ephemeral_caste_never_touches_disk(_, mock_load, mock_queue):
+    agent = Agent(name="larva_test", config={"llm": {"caste": "larva"}})
+    agent.think(Task("Do something once"))
+    mock_load.assert_not_called()
+    mock_queue.assert_not_called()
+    assert len(agent.memory) == 1
+
+
+@patch("agents.base.queue_agent_memory")
+@patch("agents.base.load_agent_memory", return_value=[{"task": str(i), "response": ""} for i in range(300)])
+@patch("agents.base.generate", return_value="done")
+def test_minor_keeps_bounded_ring_buffer(_, __, mock_queue):
+    agent = Agent(name="minor_ring", config={"llm": {"caste": "minor"}})
+    limit = CasteTraits[Caste.MINOR]["history"]
+    assert isinstance(agent.memory, deque)
+    assert len(agent.memory) == limit
+    # What does not fit is handed over for archiving, not dropped
+    assert [r["task"] for r in mock_queue.call_args.kwargs["evicted"]] == [str(i) for i in range(100)]
+    agent.think(Task("One more"))
+    assert len(agent.memory) <= limit
+    assert agent.memory[-1]["task"] == "One more"
+    assert [r["task"] for r in mock_queue.call_args.kwargs["evicted"]] == [str(i) for i in range(100, 150)]
+
+
+@patch("agents.base.generate", return_value="done")
+def test_evicted_history_is_archived_before_the_hot_file_shrinks(_, tmp_path, monkeypatch):
+    monkeypatch.setattr(memory_module, "MEMORY_DIR", tmp_path)
+    history = [{"task": f"old task {i}", "response": "", "ts": i} for i in range(210)]
+    (tmp_path / "minor_archive.json").write_text(json.dumps(history))
+    agent = Agent(name="minor_archive", config={"llm": {"caste": "minor", "reuse": {}}})
+    assert agent.search_memory("old task 5")[0][1]["task"] != "old task 5"   # not in the working set
+    for i in range(200):
+        agent.think(Task(f"new task {i}"))
+    flush_agent_memory()
+    hot = json.loads((tmp_path / "minor_archive.json").read_text())
+    cold = list(ColdArchive("minor_archive"))
+    assert [r["task"] for r in cold + hot] == [r["task"] for r in history] + [f"new task {i}" for i in range(200)]
+    assert len(hot) <= CasteTraits[Caste.MINOR]["history"]
+    assert not any(r["task"].startswith("old") for _, r in agent.search_memory("old task 5", k=200))
+
+
+@patch("agents.base.load_agent_memory", return_value=[])
+def test_queen_memory_is_durable_and_unbounded(_):
+    queen = Agent(name="queen_retention", config={"llm": {"caste": "queen"}})
+    assert queen.persistent
+    assert isinstance(queen.memory, list)
+
+
+def test_spawned_specialist_is_ephemeral():
+    queen = Queen("queen")
+    agent = queen.spawn_specialist("research")
+    assert not agent.persistent
+
+
+def test_sweep_removes_only_old_spawned_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(memory_module, "MEMORY_DIR", tmp_path)
+    old_spawn = tmp_path / "research_auto_ab12.json"
+    fresh_spawn = tmp_path / "research_auto_cd34.json"
+    kept_spawn = tmp_path / "analysis_auto_ef56.json"
+    regular = tmp_path / "analyst.json"
+    for path in (old_spawn, fresh_spawn, kept_spawn, regular):
+        path.write_text("[]")
+        os.utime(path, (1000, 1000))
+    os.utime(fresh_spawn, (5000, 5000))
+
+    removed = sweep_orphaned_memory(ttl=3000, keep=["analysis_auto_ef56"], now=5000)
+    assert removed == [old_spawn]
+    assert fresh_spawn.exists() and kept_spawn.exists() and regular.exists()
@@ -0,0 +1,182 @@
+import os
+import signal
+import time
+import pytest
+from agents.base import Queen
+from cluster.manager import ClusterManager, WorkerDied
+from cluster.protocols import MessageType
+from core.task import Task
+
+LARVA = {"task_type": "research", "llm": {"caste": "larva"}}
+
+
+@pytest.fixture
+def cluster(stub_llm, monkeypatch):
+    monkeypatch.setenv("LOG_LEVEL", "ERROR")
+    manager = ClusterManager(workers=2, threads=2, heartbeat_interval=0.1, heartbeat_timeout=5.0)
+    with manager:
+        yield manager
+
+
+def wait_until(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.02)
+
+
+def test_tasks_run_in_worker_processes(cluster):
+    names = [f"remote_{i}" for i in range(6)]
+    for name in names:
+        cluster.add_agent(name, config=LARVA)
+    assert {cluster.worker_for(name) for name in names} == {0, 1}
+
+    futures = [cluster.submit(name, Task(f"Find facts {i}")) for i, name in enumerate(names)]
+    assert [f.result(timeout=30) for f in futures] == [f"stub answer to: Find facts {i}" for i in range(6)]
+    pids = {s["pid"] for s in cluster.stats()}
+    assert len(pids) == 2 and os.getpid() not in pids
+
+
+def test_queen_orchestrates_remote_agents(cluster):
+    cluster.add_agent("remote_researcher", config=LARVA)
+    cluster.add_agent("remote_researcher_2", config=LARVA)
+    result = Queen("queen_cluster", prewarm=[]).orchestrate(Task("Research ants and bees"), cluster.agents())
+    assert list(result["results"].values()) == ["stub answer to: Find facts about ants",
+                                                "stub answer to: Find facts about bees"]
+    assert result["reassignments"] == {"Find facts about ants": 0, "Find facts about bees": 0}
+
+
+def test_dead_worker_is_restarted_and_in_flight_tasks_are_reassigned(cluster, stub_llm):
+    agent = cluster.add_agent("remote_victim", config=LARVA)
+    assert agent.think(Task("warm up"), timeout=30)
+    worker = cluster.worker_for("remote_victim")
+    old_pid = cluster.stats()[worker]["pid"]
+
+    stub_llm.delay = 1.0
+    task = Task("finishes on the new worker")
+    future = cluster.submit("remote_victim", task)
+    assert cluster.submit("remote_victim", task) is future       # same Task.id in flight: same execution
+    time.sleep(0.3)
+    os.kill(old_pid, signal.SIGKILL)
+    assert future.result(timeout=30) == "stub answer to: finishes on the new worker"
+    assert task.reassignments == 1
+    assert cluster.stats()[worker]["restarts"] == 1 and cluster.stats()[worker]["pid"] != old_pid
+
+
+def test_lost_tasks_fail_once_reassignments_run_out(cluster, stub_llm):
+    cluster.add_agent("remote_victim_2", config=LARVA)
+    assert cluster.submit("remote_victim_2", Task("warm up")).result(timeout=30)
+    cluster.max_reassignments = 0
+    stub_llm.delay = 2.0
+    future = cluster.submit("remote_victim_2", Task("never finishes"))
+    os.kill(cluster.stats()[cluster.worker_for("remote_victim_2")]["pid"], signal.SIGKILL)
+    with pytest.raises(WorkerDied):
+        future.result(timeout=10)
+
+
+def test_hung_worker_is_suspected_and_its_tasks_reassigned(cluster):
+    agent = cluster.add_agent("remote_frozen", config=LARVA)
+    assert agent.think(Task("warm up"), timeout=30)
+    worker = cluster.worker_for("remote_frozen")
+    wait_until(lambda: cluster.stats()[worker]["phi"] < 1)
+    os.kill(cluster.stats()[worker]["pid"], signal.SIGSTOP)    # alive, but silent
+
+    task = Task("answered after the restart")
+    assert agent.think(task, timeout=30) == "stub answer to: answered after the restart"
+    assert task.reassignments == 1 and cluster.stats()[worker]["restarts"] == 1
+    assert not agent.busy
+
+
+def test_scaling_out_and_in_moves_only_affected_agents_with_memory(cluster):
+    names = [f"remote_scaled_{i}" for i in range(12)]
+    for name in names:
+        cluster.add_agent(name, config=LARVA)
+    assert [f.result(timeout=30) for f in [cluster.submit(n, Task(f"Remember {n}")) for n in names]]
+    before = {name: cluster.worker_for(name) for name in names}
+
+    new = cluster.add_worker()
+    after = {name: cluster.worker_for(name) for name in names}
+    moved = [name for name in names if before[name] != after[name]]
+    assert moved and all(after[name] == new for name in moved)
+    assert len(moved) < len(names)
+
+    # A moved agent took its memory along and keeps working on the new worker
+    agent, worker = cluster.agents()[names.index(moved[0])], cluster._workers[new]
+    memory = cluster._request(worker, MessageType.EVICT, (agent.name,)).result(timeout=10)
+    assert [record["task"] for record in memory] == [f"Remember {agent.name}"]
+    cluster._register(worker, agent)
+    assert cluster.submit(agent.name, Task("next")).result(timeout=30) == "stub answer to: next"
+
+    cluster.remove_worker(new)
+    assert {name: cluster.worker_for(name) for name in names} == before
+    assert [f.result(timeout=30) for f in [cluster.submit(n, Task("again")) for n in names]]
+
+
+def test_expired_lease_runs_again_after_the_first_attempt_and_settles_once(stub_llm, monkeypatch):
+    monkeypatch.setenv("LOG_LEVEL", "ERROR")
+    # No heartbeats during the test: the lease expiry is triggered by hand below
+    manager = ClusterManager(workers=1, threads=4, heartbeat_interval=30.0, heartbeat_timeout=60.0)
+    with manager:
+        manager.add_agent("slow_leased", config=LARVA)
+        assert manager.submit("slow_leased", Task("warm up")).result(timeout=30)
+        stub_llm.delay, stub_llm.peak = 1.0, 0
+        task = Task("Find facts slowly")
+        future = manager.submit("slow_leased", task)
+        time.sleep(0.3)
+        (lease,) = manager._leases.values()
+        first_attempt = lease.request_id
+        manager._redispatch(lease, "lease expired")     # what the monitor does once the lease runs out
+        assert lease.request_id != first_attempt
+        assert future.result(timeout=30) == "stub answer to: Find facts slowly"
+        assert task.reassignments == 1
+        assert stub_llm.peak == 1       # the second attempt waited for the first on the same agent
+        assert not manager._leases
+
+
+def start_worker_thread():
+    import multiprocessing
+    import threading
+    from cluster.manager import worker_main
+
+    manager_end, worker_end = multiprocessing.Pipe()
+    worker = threading.Thread(target=worker_main, args=(0, worker_end, 2), daemon=True)
+    worker.start()
+    return manager_end, worker
+
+
+def test_worker_survives_a_malformed_frame(stub_llm):
+    from cluster.protocols import decode_frame, encode_frame
+
+    manager_end, worker = start_worker_thread()
+    manager_end.send_bytes(b"not a frame at all")
+    manager_end.send_bytes(encode_frame(MessageType.PING, 7))
+    assert manager_end.poll(5.0)
+    pong = decode_frame(manager_end.recv_bytes())
+    assert pong.type == MessageType.PONG and pong.request_id == 7
+    manager_end.send_bytes(encode_frame(MessageType.STOP, 0))
+    worker.join(5.0)
+    assert not worker.is_alive()
+
+
+def test_evict_waits_for_the_agents_running_tasks(stub_llm):
+    from cluster.protocols import decode_frame, decode_memory_sync, encode_frame, encode_json, encode_task
+
+    stub_llm.delay = 0.3
+    manager_end, worker = start_worker_thread()
+    manager_end.send_bytes(encode_frame(MessageType.REGISTER, 0, ("evictee", "assistant", encode_json(None))))
+    task = {"id": "t1", "content": "Remember the eviction", "type": None, "difficulty": None}
+    manager_end.send_bytes(encode_task(1, "evictee", task))
+    manager_end.send_bytes(encode_frame(MessageType.EVICT, 2, ("evictee",)))
+    manager_end.send_bytes(encode_frame(MessageType.PING, 3))
+
+    replies = []
+    while len(replies) < 3:
+        assert manager_end.poll(10.0)
+        replies.append(decode_frame(manager_end.recv_bytes()))
+    # Heartbeats are answered while the eviction waits; the memory follows the task's result
+    assert [frame.request_id for frame in replies] == [3, 1, 2]
+    name, memory = decode_memory_sync(replies[2])
+    assert name == "evictee" and [record["task"] for record in memory] == ["Remember the eviction"]
+    manager_end.send_bytes(encode_frame(MessageType.STOP, 0))
+    worker.join(5.0)
+    assert not worker.is_alive()
@@ -0,0 +1,104 @@
+import tracemalloc
+import agents.base as base
+from agents.base import Agent, Queen
+from core.logger import flush_logs
+from memory.memory import flush_agent_memory
+from tools.document_parser import chunk_text, parse_document
+
+MARKDOWN = """# Bees
+Honey bees live in colonies.
+
+## Dance
+""" + " ".join(f"Forager {i} returns and dances the waggle dance." for i in range(40)) + """
+
+```python
+def waggle(angle):
+    return angle
+```
+
+# Ants
+Ants follow pheromone trails.
+"""
+
+
+def test_markdown_chunks_fit_the_budget_and_keep_their_headings():
+    chunks = list(chunk_text(MARKDOWN, max_tokens=100, overlap=20, format="markdown", source="bees.md"))
+    assert len(chunks) > 3 and all(chunk.tokens <= 100 for chunk in chunks)
+    assert [chunk.id for chunk in chunks[:2]] == ["bees.md#0", "bees.md#1"]
+    assert chunks[0].text.startswith("# Bees\n\nHoney bees")
+    assert chunks[1].text.startswith("[Bees > Dance]\nForager")
+    # The overlap repeats the last sentence of the previous chunk
+    last_sentence = chunks[1].text.rsplit("Forager", 1)[1]
+    assert chunks[2].text.split("\n", 1)[1].startswith(f"Forager {last_sentence.strip()}")
+    assert "def waggle(angle):\n    return angle\n```" in chunks[-1].text
+    assert chunks[-1].text.endswith("# Ants\n\nAnts follow pheromone trails.")
+
+
+def test_html_keeps_visible_text_only():
+    html = ("<html><head><title>Insects</title><style>p {color: red}</style></head><body>"
+            "<h1>Ants</h1><p>Leafcutter &amp; army\n   <b>ants</b>.</p><script>track()</script>"
+            "<table><tr><th>Species</th><th>Size</th></tr><tr><td>Atta</td><td>large</td></tr></table>"
+            "<h2>Nests</h2><p>Underground.</p></body></html>")
+    (chunk,) = chunk_text(html, format="html")
+    assert chunk.text == ("Insects\n\n# Ants\n\nLeafcutter & army ants.\n\nSpecies | Size\n\nAtta | large\n\n"
+                          "## Nests\n\nUnderground.")
+    chunks = list(chunk_text(html, max_tokens=12, overlap=0, format="html"))
+    assert chunks[-1].text == "[Ants]\n## Nests\n\nUnderground."
+
+
+def test_csv_chunks_repeat_the_header():
+    rows = "".join(f'{i},"note, with comma {i}"\n' for i in range(40))
+    chunks = list(chunk_text("id,note\n" + rows, max_tokens=60, overlap=0, format="csv"))
+    assert len(chunks) > 2
+    assert all(chunk.text.startswith("id,note\n") and chunk.tokens <= 60 for chunk in chunks)
+    assert chunks[0].text.split("\n")[1] == '0,"note, with comma 0"'
+    assert sum(chunk.text.count("\n") for chunk in chunks) == 40
+
+
+def test_oversized_paragraph_is_split_at_sentences_then_words():
+    paragraph = " ".join(["Pheromones guide the workers to food."] * 50) + " " + "x" * 2000
+    chunks = list(chunk_text(paragraph, max_tokens=50, overlap=0))
+    assert all(chunk.tokens <= 50 for chunk in chunks)
+    assert chunks[0].text.startswith("Pheromones guide") and chunks[0].text.endswith("food.")
+    assert "".join(chunk.text for chunk in chunks if chunk.text.startswith("x")) == "x" * 2000
+
+
+def test_large_file_is_streamed_in_flat_memory(tmp_path):
+    path = tmp_path / "big.txt"
+    with open(path, "w") as f:
+        for i in range(8000):
+            f.write(f"Paragraph {i}: the colony forages for leaves, then carries them back to the nest.\n\n")
+    size = path.stat().st_size
+    chunks = parse_document(path, max_tokens=200, overlap=20)
+    next(chunks)        # opens the file
+    flush_logs()        # so rendering the queued log record is not counted
+    tracemalloc.start()
+    try:
+        count = sum(1 for _ in chunks)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert count > 100
+    assert peak < size / 4
+
+
+def test_map_reduce_processes_chunks_in_parallel_and_combines_outputs(stub_llm, monkeypatch):
+    queen = Queen("queen_documents", prewarm=[])
+    agents = [Agent(name=f"reader_{i}", config={"task_type": "research"}) for i in range(3)]
+    document = "\n\n".join(f"Section {i} describes how ant colony {i} farms fungus." for i in range(8))
+    summaries = []
+    summarize = queen.summarize_results_inline
+    monkeypatch.setattr(queen, "summarize_results_inline", lambda results: summaries.append(len(results))
+                        or summarize(results))
+    monkeypatch.setattr(base, "budget_for", lambda model=None: 100)
+
+    result = queen.map_reduce("Find facts", chunk_text(document, max_tokens=20, overlap=0, source="ants.txt"),
+                              agents)
+    assert result["chunks"] == 8
+    assert list(result["results"]) == [f"ants.txt#{i}" for i in range(8)]
+    assert [output for output in result["results"].values()] == \
+           [f"stub answer to: Find facts\n\nSection {i} describe" for i in range(8)]
+    assert result["summary"] == "stub answer to: Create a concise executive sum"
+    assert summaries == [4, 4, 2]       # combined in groups first
+    assert not any(agent.busy for agent in agents)
+    flush_agent_memory()
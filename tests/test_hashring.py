@@ -0,0 +1,42 @@
+from cluster.hashring import HashRing
+
+KEYS = [f"agent_{i}" for i in range(5000)]
+
+
+def owners(ring):
+    return {key: ring.node_for(key) for key in KEYS}
+
+
+def test_keys_spread_evenly_over_nodes():
+    ring = HashRing(range(4))
+    assert all(0.15 < share < 0.35 for share in ring.distribution().values())
+    assert set(owners(ring).values()) == {0, 1, 2, 3}
+    assert HashRing().node_for("anyone") is None
+
+
+def test_adding_a_node_only_moves_keys_to_it():
+    ring = HashRing(range(4))
+    before = owners(ring)
+    changed = ring.add_node(4)
+    after = owners(ring)
+    moved = [key for key in KEYS if before[key] != after[key]]
+    assert all(after[key] == 4 for key in moved)
+    assert 0.1 < len(moved) / len(KEYS) < 0.3       # about 1/5, not a reshuffle
+    assert {ring.slot_of(key) for key in moved} <= set(changed)
+
+
+def test_removing_a_node_only_moves_its_keys():
+    ring = HashRing(range(4))
+    before = owners(ring)
+    ring.remove_node(2)
+    after = owners(ring)
+    assert [k for k in KEYS if before[k] != after[k]] == [k for k in KEYS if before[k] == 2]
+    assert 2 not in after.values() and ring.nodes == [0, 1, 3]
+
+
+def test_copy_is_independent_and_placement_is_deterministic():
+    ring = HashRing(["a", "b"])
+    copy = ring.copy()
+    copy.add_node("c")
+    assert "c" not in ring and len(copy) == 3
+    assert owners(HashRing(["a", "b"])) == owners(ring)
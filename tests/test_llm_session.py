@@ -0,0 +1,40 @@
+from unittest.mock import MagicMock
+import pytest
+import core.llm as llm
+from core.llm import LLMSession, generate
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    """Fake Ollama endpoint recording every payload."""
+    payloads = []
+
+    def post(url, json=None, headers=None, timeout=None):
+        payloads.append(json)
+        response = MagicMock()
+        response.json.return_value = {"response": "answer", "context": [1, 2, 3], "prompt_eval_count": 2}
+        return response
+
+    session = MagicMock()
+    session.post.side_effect = post
+    monkeypatch.setattr(llm, "_http", lambda: session)
+    return payloads
+
+
+def test_every_call_sends_the_same_system_prompt(backend):
+    session = LLMSession(keep_alive="30m")
+    assert generate("first", system="You are terse.", model="m", session=session) == "answer"
+    assert generate("second", system="You are terse.", model="m", session=session) == "answer"
+
+    assert [payload["prompt"] for payload in backend] == ["first", "second"]     # no extra priming request
+    for payload in backend:
+        assert payload["system"] == "You are terse."
+        assert "context" not in payload
+        assert payload["keep_alive"] == "30m"
+    assert session.as_dict() == {"calls": 2, "prompt_tokens": 4}
+
+
+def test_plain_call_sends_keep_alive(backend):
+    generate("task", system="sys", model="m")
+    assert backend[0]["keep_alive"] == llm.LLM_KEEP_ALIVE
+    assert backend[0]["system"] == "sys"
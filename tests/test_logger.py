@@ -0,0 +1,68 @@
+import logging
+import queue
+import core.logger as logger_module
+from core.logger import AgentFileHandler, DroppingQueueHandler, flush_logs, get_logger
+
+
+def make_record(agent, message="hello"):
+    record = logging.LogRecord("agent", logging.INFO, __file__, 1, message, None, None)
+    record.agent = agent
+    return record
+
+
+def test_agent_loggers_share_one_queue_handler():
+    first = get_logger("agent", agent_name="log_share_a")
+    second = get_logger("agent", agent_name="log_share_b")
+    assert len(first.handlers) == 1
+    assert first.handlers[0] is second.handlers[0]
+    assert isinstance(first.handlers[0], logging.handlers.QueueHandler)
+
+
+def test_records_carry_agent_field():
+    captured = []
+    logger = get_logger("agent", agent_name="log_field")
+    handler = logging.Handler()
+    handler.emit = captured.append
+    logger.addHandler(handler)
+    try:
+        logger.info("stamped")
+    finally:
+        logger.removeHandler(handler)
+    assert captured[0].agent == "log_field"
+    assert get_logger("log_plain").filters[0].agent == "-"
+
+
+def test_file_handler_bounds_open_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(logger_module, "LOG_DIR", tmp_path)
+    handler = AgentFileHandler(max_open=2)
+    for agent in ["a", "b", "c", "a", "-"]:
+        handler.handle(make_record(agent, f"from {agent}"))
+    assert handler.open_files() == 2
+    handler.close()
+    assert (tmp_path / "a.log").read_text().count("from a") == 2
+    assert "from c" in (tmp_path / "c.log").read_text()
+    assert "from -" in (tmp_path / "interactions.log").read_text()
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = DroppingQueueHandler(queue.Queue(1))
+    handler.handle(make_record("x"))
+    handler.handle(make_record("x"))
+    assert handler.dropped == 1
+
+
+def test_records_are_queued_unformatted():
+    handler = DroppingQueueHandler(queue.Queue())
+    record = make_record("x")
+    record.args = {"n": 3}
+    record.msg = "%(n)d ants"
+    handler.handle(record)
+    queued = handler.queue.get_nowait()
+    assert queued is record and queued.args == {"n": 3} and queued.getMessage() == "3 ants"
+
+
+def test_flush_logs_writes_agent_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(logger_module, "LOG_DIR", tmp_path)
+    get_logger("agent", agent_name="log_flush").info("queued line")
+    flush_logs()
+    assert "queued line" in (tmp_path / "log_flush.log").read_text()
@@ -0,0 +1,76 @@
+import json
+import pytest
+import memory.memory as memory_module
+from memory.archive import ColdArchive, SegmentReader, archive_agent_memory, write_segment
+
+
+def make_entries(n, start=1000.0):
+    return [{"task": f"task {i}", "response": f"response {i} " * 20, "ts": start + i} for i in range(n)]
+
+
+@pytest.mark.parametrize("codec", ["zlib", "lzma"])
+def test_segment_roundtrip_and_random_access(tmp_path, codec):
+    entries = make_entries(200)
+    path = tmp_path / "000000.seg"
+    raw_size = write_segment(path, entries, codec=codec, block_entries=16)
+    assert path.stat().st_size < raw_size
+
+    reader = SegmentReader(path)
+    assert len(reader) == 200
+    assert (reader.t_min, reader.t_max) == (1000.0, 1199.0)
+    assert len(reader.blocks) == 13
+    assert reader.entry(0) == entries[0]
+    assert reader.entry(137) == entries[137]
+    assert list(reader) == entries
+
+
+def test_entry_reads_only_its_block(tmp_path, monkeypatch):
+    path = tmp_path / "000000.seg"
+    write_segment(path, make_entries(100), block_entries=10)
+    reader = SegmentReader(path)
+    read = []
+    original = reader.read_block
+    monkeypatch.setattr(reader, "read_block", lambda no: (read.append(no), original(no))[1])
+    assert reader.entry(55)["task"] == "task 55"
+    assert read == [5]
+    assert [e["ts"] for e in reader.entries_between(1021, 1023)] == [1021, 1022, 1023]
+    assert read == [5, 2]
+
+
+def test_invalid_segment_is_rejected(tmp_path):
+    path = tmp_path / "bad.seg"
+    path.write_bytes(b"not a segment at all")
+    with pytest.raises(ValueError):
+        SegmentReader(path)
+
+
+def test_archive_agent_memory_moves_old_entries(tmp_path, monkeypatch):
+    monkeypatch.setattr(memory_module, "MEMORY_DIR", tmp_path)
+    legacy = [{"task": f"old {i}", "response": "legacy answer " * 30} for i in range(120)]
+    (tmp_path / "legacy.json").write_text(json.dumps(legacy, indent=2))
+
+    report = archive_agent_memory("legacy", keep_hot=20)
+    assert report["archived"] == 100
+    assert report["bytes_after"] < report["bytes_before"]
+    assert json.loads((tmp_path / "legacy.json").read_text()) == legacy[100:]
+
+    archive = ColdArchive("legacy")
+    assert list(archive) == legacy[:100]
+    assert archive.entries_between(0, 10**10) == []     # legacy entries carry no timestamps
+
+    archive_agent_memory("legacy", keep_hot=10)
+    assert sorted(p.name for p in archive.path.iterdir()) == ["000000.seg"]     # merged into the small segment
+    assert list(archive) == legacy[:110]
+
+
+def test_many_small_evictions_roll_over_into_few_segments(tmp_path, monkeypatch):
+    import memory.archive as archive_module
+    monkeypatch.setattr(archive_module, "SEGMENT_ROLL_BYTES", 8 * 1024)
+    archive = ColdArchive("rolling", root=tmp_path)
+    entries = make_entries(2000)
+    for first in range(0, len(entries), 50):     # a minor agent evicts 50 entries at a time
+        archive.append(entries[first:first + 50])
+    segments = archive.segments()
+    assert 1 < len(segments) <= -(-archive.size() // (8 * 1024)) + 1     # by size, not one per append (40)
+    assert all(p.stat().st_size >= 8 * 1024 for p in sorted(archive.path.glob("*.seg"))[:-1])
+    assert list(archive) == entries
@@ -0,0 +1,150 @@
+import json
+from collections import deque
+import threading
+import pytest
+import memory.memory as memory_module
+from memory.archive import ColdArchive
+from memory.memory import MemoryWriter, Durability
+
+
+@pytest.fixture
+def memory_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(memory_module, "MEMORY_DIR", tmp_path)
+    return tmp_path
+
+
+def read_memory(memory_dir, name):
+    with open(memory_dir / f"{name}.json") as f:
+        return json.load(f)
+
+
+def test_submit_does_not_write_until_flush(memory_dir):
+    writer = MemoryWriter(durability="none", batch_size=100, flush_interval=60)
+    memory = [{"task": "t1", "response": "r1"}]
+    writer.submit("lazy", memory)
+    assert not (memory_dir / "lazy.json").exists()
+    assert writer.pending() == 1
+
+    writer.flush()
+    assert read_memory(memory_dir, "lazy") == memory
+    assert writer.pending() == 0
+    writer.close()
+
+
+def test_batch_size_triggers_coalesced_write(memory_dir, monkeypatch):
+    writes = []
+    original = memory_module._save_memory
+    monkeypatch.setattr(memory_module, "_save_memory",
+                        lambda name, mem, fsync=False, path=None: (writes.append(name), original(name, mem, fsync, path)))
+    writer = MemoryWriter(durability="none", batch_size=3, flush_interval=60)
+    memory = []
+    for i in range(3):
+        memory.append({"task": f"t{i}", "response": f"r{i}"})
+        writer.submit("batched", memory)
+    writer.close()
+    assert writes == ["batched"]
+    assert len(read_memory(memory_dir, "batched")) == 3
+
+
+def test_interval_trigger_flushes_in_background(memory_dir):
+    writer = MemoryWriter(durability="interval", batch_size=100, flush_interval=0.05)
+    writer.submit("timed", [{"task": "t", "response": "r"}])
+    for _ in range(100):
+        if (memory_dir / "timed.json").exists():
+            break
+        threading.Event().wait(0.02)
+    assert (memory_dir / "timed.json").exists()
+    writer.close()
+
+
+def test_always_durability_fsyncs_every_write(memory_dir, monkeypatch):
+    synced = []
+    monkeypatch.setattr(memory_module.os, "fsync", lambda fd: synced.append(fd))
+    writer = MemoryWriter(durability=Durability.ALWAYS, batch_size=1, flush_interval=60)
+    writer.submit("durable", [{"task": "t", "response": "r"}])
+    writer.close()
+    assert synced
+
+
+def test_backpressure_times_out_when_buffer_is_full(memory_dir, monkeypatch):
+    writer = MemoryWriter(durability="none", batch_size=100, flush_interval=60, max_pending=2)
+    gate = threading.Event()
+    original = writer._write
+    monkeypatch.setattr(writer, "_write", lambda batch, force_fsync=False: (gate.wait(), original(batch, force_fsync)))
+    writer.submit("a", [])
+    writer.submit("b", [])
+    with pytest.raises(TimeoutError):
+        writer.submit("c", [], timeout=0.05)
+    gate.set()
+    writer.close()
+    assert writer.pending() == 0
+
+
+def test_saves_of_one_agent_are_written_in_queued_order(memory_dir, monkeypatch):
+    archived = []
+    original = memory_module._persist
+    monkeypatch.setattr(memory_module, "_persist", lambda agent_name, path, memory, evicted=(), fsync=False: (
+        archived.extend(entry["task"] for entry in evicted), original(agent_name, path, memory, evicted, fsync)))
+    writer = MemoryWriter(durability="none", batch_size=1, flush_interval=60, hot_entries=0)
+    flusher_waits = threading.Event()
+
+    class SlowLock:
+        """Holds the background flusher up the first time it reaches the write lock."""
+        def __init__(self):
+            self._lock = threading.Lock()
+
+        def __enter__(self):
+            if threading.current_thread().name == "memory-writer" and not flusher_waits.is_set():
+                flusher_waits.set()
+                threading.Event().wait(0.2)
+            self._lock.acquire()
+
+        def __exit__(self, *exc):
+            self._lock.release()
+
+    writer._io_lock = SlowLock()
+    memory = [{"task": "kept", "response": "r"}]
+    writer.submit("ordered", memory, evicted=[{"task": "first", "response": "r"}])
+    assert flusher_waits.wait(2.0)
+    writer.submit("ordered", memory, evicted=[{"task": "second", "response": "r"}])
+    writer.flush("ordered")
+    writer.close()
+    assert archived == ["first", "second"]
+
+
+def test_submit_after_close_writes_synchronously(memory_dir):
+    writer = MemoryWriter(durability="none")
+    writer.close()
+    writer.submit("late", [{"task": "t", "response": "r"}])
+    assert read_memory(memory_dir, "late")[0]["task"] == "t"
+
+
+def test_destination_is_resolved_when_queued(tmp_path, monkeypatch):
+    first, second = tmp_path / "first", tmp_path / "second"
+    monkeypatch.setattr(memory_module, "MEMORY_DIR", first)
+    writer = MemoryWriter(durability="none", batch_size=100, flush_interval=60)
+    writer.submit("moved", [{"task": "t", "response": "r"}])
+    monkeypatch.setattr(memory_module, "MEMORY_DIR", second)
+    writer.close()
+    assert read_memory(first, "moved")[0]["task"] == "t"
+    assert not (second / "moved.json").exists()
+
+
+def test_submit_after_close_writes_a_deque(memory_dir):
+    writer = MemoryWriter(durability="none")
+    writer.close()
+    writer.submit("bounded", deque([{"task": "t", "response": "r"}], maxlen=5))
+    assert read_memory(memory_dir, "bounded") == [{"task": "t", "response": "r"}]
+
+
+def test_hot_memory_past_the_threshold_moves_to_the_archive(memory_dir):
+    writer = MemoryWriter(durability="none", batch_size=100, flush_interval=60, hot_entries=10)
+    memory = []
+    for i in range(25):
+        memory.append({"task": f"t{i}", "response": "r", "ts": i})
+        writer.submit("growing", memory)
+    writer.close()
+    hot = read_memory(memory_dir, "growing")
+    cold = list(ColdArchive("growing"))
+    assert len(hot) <= 10 and memory == hot
+    assert [e["task"] for e in cold + hot] == [f"t{i}" for i in range(25)]
@@ -0,0 +1,130 @@
+import io
+import json
+import time
+import requests
+from agents.base import Agent, Queen
+from cli.repl import OrchestrationPrinter
+from core.llm import LLMSession, generate, stream_tokens
+from core.task import Task
+
+RESEARCH = {"task_type": "research"}
+
+
+def _sse(response):
+    """Parse a text/event-stream response into (event, data, seconds since the request) tuples."""
+    started, events, name = time.monotonic(), [], None
+    for line in response.iter_lines(chunk_size=1, decode_unicode=True):
+        if line.startswith("event: "):
+            name = line[len("event: "):]
+        elif line.startswith("data: "):
+            events.append((name, json.loads(line[len("data: "):]), time.monotonic() - started))
+    return events
+
+
+def test_generate_streams_pieces_and_returns_the_whole_response(stub_llm):
+    pieces, session = [], LLMSession()
+    with stream_tokens(pieces.append):
+        response = generate("Find facts about ants", system="You are a researcher.", session=session)
+    assert response == "stub answer to: Find facts about ants"
+    assert pieces == ["stub ", "answer ", "to: ", "Find ", "facts ", "about ", "ants"]
+    assert session.calls == 1
+    assert generate("Find facts") == "stub answer to: Find facts"
+
+
+def test_orchestrate_stream_emits_progress_events(stub_llm):
+    queen = Queen("queen_stream", prewarm=[])
+    agents = [Agent(name=f"stream_researcher_{i}", config=RESEARCH) for i in range(2)]
+    events = list(queen.orchestrate_stream(Task("Research ants and bees"), agents))
+
+    kinds = [event["event"] for event in events]
+    assert kinds[0] == "plan" and kinds[-2:] == ["summary", "done"]
+    assert events[0]["subtasks"] == ["Find facts about ants", "Find facts about bees"]
+    for index in (0, 1):
+        own = [event for event in events if event.get("index") == index]
+        assert own[0]["event"] == "assigned" and own[-1]["event"] == "subtask_done"
+        streamed = "".join(event["text"] for event in own if event["event"] == "token")
+        assert streamed == own[-1]["output"] == f"stub answer to: {events[0]['subtasks'][index]}"
+    assert events[-1]["result"]["results"] == {"Find facts about ants": "stub answer to: Find facts about ants",
+                                               "Find facts about bees": "stub answer to: Find facts about bees"}
+    assert events[-1]["result"]["summary"] == events[-2]["summary"]
+
+
+def test_closing_the_stream_does_not_wait_for_running_subtasks(stub_llm):
+    queen = Queen("queen_closed", prewarm=[])
+    agents = [Agent(name=f"closed_researcher_{i}", config=RESEARCH) for i in range(2)]
+    events = queen.orchestrate_stream(Task("Research ants and bees"), agents)
+    assert next(events)["event"] == "plan"
+    stub_llm.delay = 0.8
+    assert next(event for event in events if event["event"] == "assigned")
+    started = time.monotonic()
+    events.close()
+    assert time.monotonic() - started < 0.4
+    while any(agent.busy for agent in agents):     # let the running calls land in this test's memory dir
+        time.sleep(0.05)
+
+
+def test_orchestrate_is_the_drained_stream(stub_llm):
+    queen = Queen("queen_drained", prewarm=[])
+    result = queen.orchestrate(Task("Research ants and bees"), [Agent(name="drained_researcher", config=RESEARCH)],
+                               force=True)
+    assert set(result) == {"results", "summary", "reassignments"}
+    assert list(result["results"]) == ["Find facts about ants", "Find facts about bees"]
+
+
+def test_api_streams_orchestration_as_server_sent_events(stub_llm, api):
+    url, _ = api()
+    requests.post(f"{url}/agents", json={"name": "researcher", "config": RESEARCH})
+    stub_llm.delay = 0.2
+    response = requests.post(f"{url}/orchestrate", json={"task": "Research ants and bees", "force": True},
+                             headers={"Accept": "text/event-stream"}, stream=True)
+    assert response.headers["Content-Type"] == "text/event-stream"
+    events = _sse(response)
+    names = [name for name, _, _ in events]
+    assert names[0] == "plan" and names[-1] == "done" and "token" in names and "subtask_done" in names
+    assert all(data["event"] == name for name, data, _ in events)
+    # The plan arrives long before the subtasks and the summary are done
+    assert events[-1][2] - events[0][2] > 0.3
+    assert list(events[-1][1]["result"]["results"]) == ["Find facts about ants", "Find facts about bees"]
+
+
+def test_api_stream_reports_deadline_as_error_event(stub_llm, api):
+    url, server = api()
+    requests.post(f"{url}/agents", json={"name": "researcher", "config": RESEARCH})
+    stub_llm.delay = 0.4
+    response = requests.post(f"{url}/orchestrate", json={"task": "Research ants", "timeout": 0.5, "stream": True},
+                             stream=True)
+    events = _sse(response)
+    assert events[-1][0] == "error" and events[-1][1]["status"] == 504
+    assert "done" not in [name for name, _, _ in events]
+    assert server.timed_out == 1
+
+
+def test_repl_printer_follows_one_subtask_at_a_time():
+    out = io.StringIO()
+    printer = OrchestrationPrinter(out)
+    events = [
+        {"event": "plan", "subtasks": ["ants", "bees"]},
+        {"event": "assigned", "index": 0, "agent": "a"},
+        {"event": "assigned", "index": 1, "agent": "b"},
+        {"event": "token", "index": 1, "text": "Bees "},
+        {"event": "token", "index": 0, "text": "Ants "},
+        {"event": "token", "index": 1, "text": "dance."},
+        {"event": "token", "index": 0, "text": "dig."},
+        {"event": "subtask_done", "index": 0, "agent": "a", "output": "Ants dig.", "elapsed": 1.0},
+        {"event": "subtask_done", "index": 1, "agent": "b", "output": "Bees dance.", "elapsed": 1.5},
+        {"event": "summary", "summary": "Insects."},
+    ]
+    for event in events:
+        printer.handle(event)
+    text = out.getvalue()
+    assert "[1] b: Bees dance.\n[1] done by b in 1.5s" in text
+    assert "[0] a: Ants dig.\n[0] done by a in 1.0s" in text
+    assert text.index("[1] b: Bees") < text.index("[0] a: Ants") < text.index("[SUMMARY]\nInsects.")
+
+
+def test_repl_printer_shows_why_an_orchestration_ended_early():
+    out = io.StringIO()
+    printer = OrchestrationPrinter(out)
+    for event in Queen("queen_alone", prewarm=[]).orchestrate_stream(Task("Research ants"), []):
+        printer.handle(event)
+    assert out.getvalue() == "[ERROR] No agents available.\n"
@@ -0,0 +1,122 @@
+import random
+import threading
+import time
+import pytest
+from typer.testing import CliRunner
+from agents.base import Agent
+from cli.agentctl import app
+from core.batch import percentile
+from core.task import Task
+from core.timer import BUCKETS, Histogram, Profiler, Timer, profiler
+
+
+@pytest.fixture
+def profiling():
+    profiler.clear()
+    profiler.enable()
+    yield profiler
+    profiler.disable()
+    profiler.clear()
+
+
+def test_timer_measures_a_with_block():
+    with Timer() as timer:
+        time.sleep(0.02)
+    elapsed = timer.elapsed()
+    time.sleep(0.02)
+    assert 0.02 <= elapsed == timer.elapsed() < 0.04
+
+
+def test_histogram_percentiles_are_close_in_fixed_memory():
+    rng = random.Random(7)
+    values = sorted(int(rng.lognormvariate(8, 1.5)) for _ in range(20000))
+    histogram = Histogram()
+    for value in values:
+        histogram.record(value)
+    histogram.record(10 ** 12)      # beyond the range, counted as the largest value
+    assert len(histogram.counts) == BUCKETS
+    for q in (50, 90, 99):
+        exact = percentile(values, q)
+        assert exact <= histogram.percentile(q) <= exact * 1.016 + 1
+    assert histogram.count == 20001 and histogram.min == values[0] and histogram.max == 2 ** 32 - 1
+
+    other = Histogram()
+    other.record(5)
+    histogram.merge(other)
+    assert histogram.min == 5 and histogram.count == 20002
+    assert Histogram.from_dict(histogram.as_dict()).percentile(99) == histogram.percentile(99)
+
+
+def test_disabled_profiler_records_nothing():
+    quiet = Profiler()
+    assert quiet.phase("a") is quiet.phase("b", agent="x")
+    with quiet.phase("a"):
+        pass
+    assert quiet.snapshot() == {}
+
+
+def test_phases_nest_and_start_a_tree_per_agent():
+    local = Profiler()
+    local.enable()
+    with local.phase("orchestrate", agent="queen"):
+        with local.phase("plan"):
+            time.sleep(0.01)
+        with local.phase("think", agent="worker"):
+            with local.phase("llm.http"):
+                time.sleep(0.01)
+    assert set(local.snapshot()) == {("queen", ("orchestrate",)), ("queen", ("orchestrate", "plan")),
+                                     ("worker", ("think",)), ("worker", ("think", "llm.http"))}
+    report = local.report()
+    assert report.index("queen") < report.index("  orchestrate") < report.index("    plan") < report.index("worker")
+    assert "    llm.http" in local.report("worker") and "queen" not in local.report("worker")
+
+
+def test_aggregation_is_thread_safe():
+    local = Profiler()
+    local.enable()
+
+    def work():
+        for _ in range(500):
+            with local.phase("think", agent="worker"), local.phase("clean"):
+                pass
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    snapshot = local.snapshot()
+    assert snapshot[("worker", ("think",))].count == snapshot[("worker", ("think", "clean"))].count == 4000
+
+
+def test_think_is_profiled_phase_by_phase(stub_llm, profiling):
+    agent = Agent(name="profiled_researcher", config={"task_type": "research"})
+    for i in range(3):
+        agent.think(Task(f"Find facts about ants {i}"))
+    phases = {path: histogram.count for (owner, path), histogram in profiling.snapshot().items()
+              if owner == "profiled_researcher"}
+    assert phases[("think",)] == 3
+    for name in ("reuse.lookup", "llm.generate", "clean", "memory.save", "log"):
+        assert phases[("think", name)] >= 3
+    assert phases[("think", "llm.generate", "llm.wait")] == phases[("think", "llm.generate", "llm.http")] >= 3
+
+
+def test_think_records_no_phases_while_profiling_is_off(stub_llm):
+    profiler.clear()
+    Agent(name="unprofiled_researcher", config={"task_type": "research"}).think(Task("Find facts about bees"))
+    assert not profiler.snapshot()
+
+
+def test_report_command_reads_an_exported_profile(tmp_path):
+    local = Profiler()
+    local.enable()
+    for _ in range(10):
+        with local.phase("think", agent="researcher"), local.phase("llm.http"):
+            pass
+    path = local.export(tmp_path / "profile.json")
+    result = CliRunner().invoke(app, ["profile", str(path), "--agent", "researcher"])
+    assert result.exit_code == 0
+    lines = result.output.splitlines()
+    assert lines[0] == "researcher" and lines[2].split()[:2] == ["think", "10"]
+    assert lines[3].split()[:2] == ["llm.http", "10"]
+    assert CliRunner().invoke(app, ["profile", str(tmp_path / "missing.json")]).exit_code == 1
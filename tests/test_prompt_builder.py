@@ -0,0 +1,76 @@
+from unittest.mock import patch
+import pytest
+import core.prompt_builder as prompt_builder
+from core.prompt_builder import PromptBuilder, count_tokens, estimate_tokens, set_tokenizer
+from core.task import Task
+from tools.classifier import classify_task
+
+
+def test_estimate_is_close_to_word_count():
+    assert estimate_tokens("") == 0
+    assert 6 <= estimate_tokens("Summarize the main risks, please.") <= 10
+    assert estimate_tokens("a, b, c") == 5
+    assert estimate_tokens("x" * 400) == 100
+
+
+def test_pluggable_tokenizer():
+    set_tokenizer(lambda text: len(text))
+    try:
+        assert count_tokens("abc") == 3
+    finally:
+        set_tokenizer(None)
+    assert count_tokens("abc") == estimate_tokens("abc")
+
+
+def test_prompt_under_budget_is_unchanged():
+    builder = PromptBuilder(budget=100).add("Header", shrink="keep").add("Body text")
+    assert builder.build() == "Header\nBody text"
+
+
+def test_lower_priority_sections_shrink_first():
+    builder = (
+        PromptBuilder(budget=60)
+        .add("Keep this header.", shrink="keep")
+        .add("optional " * 50, name="optional", shrink="drop")
+        .add("important " * 40, name="important", priority=1)
+    )
+    prompt = builder.build()
+    assert builder.dropped == ["optional"]
+    assert "optional" not in prompt
+    assert prompt.startswith("Keep this header.")
+    assert count_tokens(prompt) <= 60
+
+
+def test_equal_priority_sections_get_equal_shares():
+    builder = PromptBuilder(budget=80)
+    for i in range(4):
+        builder.add(f"result{i} " + "word " * 100)
+    builder.add("short one")
+    prompt = builder.build()
+    assert count_tokens(prompt) <= 80
+    assert "short one" in prompt
+    assert all(f"result{i}" in prompt for i in range(4))
+
+
+def test_compress_runs_before_truncation():
+    builder = PromptBuilder(budget=20).add("long " * 100, compress=lambda text: "compressed")
+    assert builder.build() == "compressed"
+
+
+def test_budget_is_configured_per_model(monkeypatch):
+    monkeypatch.setattr(prompt_builder, "_budgets", prompt_builder._parse_budgets("qwen:8b=8192, tiny=512"))
+    assert prompt_builder.budget_for("qwen:8b") == 8192
+    assert prompt_builder.budget_for("tiny") == 512
+    assert prompt_builder.budget_for("other") == prompt_builder.PROMPT_TOKEN_BUDGET
+    assert PromptBuilder(model="tiny", reserved=12).budget == 500
+
+
+@patch("tools.classifier.generate", return_value="research")
+def test_classifier_compresses_large_mapping(mock_generate, monkeypatch):
+    monkeypatch.setattr(prompt_builder, "PROMPT_TOKEN_BUDGET", 200)
+    mapping = {f"type{i}": [f"keyword{i}_{j}" for j in range(50)] for i in range(5)}
+    mapping["research"] = ["find"]
+    assert classify_task(Task("Find the facts"), mapping) == "research"
+    prompt = mock_generate.call_args.kwargs["prompt"]
+    assert "- type0\n" in prompt and "keyword0_0" not in prompt
+    assert prompt.endswith("Find the facts")
@@ -0,0 +1,105 @@
+import asyncio
+import pytest
+from cluster.protocols import (HEADER, MessageType, ProtocolError, connect, decode_frame, decode_memory_sync,
+                               decode_task, encode_frame, encode_memory_sync, encode_task, serve, server_address, text)
+
+
+def test_frame_roundtrip_slices_payload_without_copying():
+    data = encode_frame(MessageType.RESULT, 42, ("héllo", b"\x00\x01"))
+    frame = decode_frame(data)
+    assert (frame.type, frame.request_id) == (MessageType.RESULT, 42)
+    first, second = frame.fields()
+    assert text(first) == "héllo" and bytes(second) == b"\x00\x01"
+    assert first.obj is data        # a view into the received buffer, not a copy
+
+
+def test_task_and_memory_sync_roundtrip():
+    task = {"id": "4f9c1a52-1b6e-4f61-8d7e-5b8f6f0ad7c1", "content": "Find facts", "type": "research",
+            "difficulty": None}
+    frame = decode_frame(encode_task(7, "researcher", task))
+    assert decode_task(frame) == ("researcher", task)
+    assert decode_task(decode_frame(encode_task(8, "a", {**task, "id": "custom-id"})))[1]["id"] == "custom-id"
+
+    entries = [{"task": "t", "response": "r" * 500}]
+    data = encode_memory_sync(9, "researcher", entries)
+    assert len(data) < 200
+    assert decode_memory_sync(decode_frame(data)) == ("researcher", entries)
+
+
+def test_malformed_frames_are_rejected():
+    data = bytearray(encode_frame(MessageType.PING, 1))
+    with pytest.raises(ProtocolError, match="Truncated"):
+        decode_frame(data[:HEADER.size - 1])
+    data[2] = 99        # version
+    with pytest.raises(ProtocolError, match="version"):
+        decode_frame(data)
+    with pytest.raises(ProtocolError, match="does not match"):
+        decode_frame(encode_frame(MessageType.RESULT, 1, ("x",)) + b"extra")
+
+
+async def _pipelined(address):
+    async def handler(frame):
+        (field,) = frame.fields()
+        delay = float(text(field))
+        await asyncio.sleep(delay)
+        return MessageType.RESULT, (f"slept {delay}",)
+
+    server = await serve(address, handler)
+    client = await connect(server_address(server))
+    try:
+        order = []
+
+        async def call(delay):
+            frame = await client.request(MessageType.TASK, (str(delay),))
+            order.append(text(frame.fields()[0]))
+
+        await asyncio.gather(call(0.2), call(0.0), call(0.1))
+        return order
+    finally:
+        await client.close()
+        server.close()
+        await server.wait_closed()
+
+
+def test_pipelined_requests_over_tcp_complete_out_of_order():
+    order = asyncio.run(_pipelined("tcp://127.0.0.1:0"))
+    assert order == ["slept 0.0", "slept 0.1", "slept 0.2"]
+
+
+def test_pipelined_requests_over_unix_socket(tmp_path):
+    order = asyncio.run(_pipelined(f"unix://{tmp_path}/agents.sock"))
+    assert order == ["slept 0.0", "slept 0.1", "slept 0.2"]
+
+
+def test_handler_errors_become_error_frames(tmp_path):
+    async def scenario():
+        async def handler(frame):
+            raise KeyError("missing")
+
+        address = f"unix://{tmp_path}/errors.sock"
+        server = await serve(address, handler)
+        client = await connect(address)
+        frame = await client.request(MessageType.TASK, ("x",))
+        await client.close()
+        server.close()
+        return frame
+
+    frame = asyncio.run(scenario())
+    assert frame.type == MessageType.ERROR and "KeyError" in text(frame.fields()[0])
+
+
+def test_requests_fail_fast_once_the_connection_is_lost(tmp_path):
+    async def scenario():
+        async def hang_up(reader, writer):
+            writer.close()
+
+        address = f"unix://{tmp_path}/lost.sock"
+        server = await asyncio.start_unix_server(hang_up, f"{tmp_path}/lost.sock")
+        client = await connect(address)
+        await asyncio.wait_for(client._receiver, 2.0)
+        with pytest.raises(ConnectionError):
+            await asyncio.wait_for(client.request(MessageType.TASK, ("x",)), 2.0)
+        await client.close()
+        server.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,78 @@
+import time
+import pytest
+from agents.base import Agent, Queen
+from cluster.detector import PhiAccrualDetector
+from core.llm import DeadlineExceeded, deadline
+from core.task import Task
+
+RESEARCH = {"task_type": "research"}
+
+
+class DeadBackendAgent(Agent):
+    __slots__ = ()
+
+    def think(self, task, system_override=None):
+        raise ConnectionError("backend is down")
+
+
+@pytest.fixture
+def queen(stub_llm):
+    return Queen("queen_reassign", prewarm=[])
+
+
+def test_failed_subtask_is_reassigned_to_another_agent(queen):
+    agents = [DeadBackendAgent(name="dead_researcher", config=RESEARCH), Agent(name="researcher", config=RESEARCH)]
+    subtask = Task("Find facts about ants", task_type="research")
+    result = queen._run_subtask(subtask, agents, force=False)
+    assert result["executor"].name == "researcher"
+    assert result["output"] == "stub answer to: Find facts about ants"
+    assert subtask.reassignments == 1
+    assert not any(agent.busy for agent in agents)
+
+
+def test_subtask_gives_up_after_max_reassignments(queen):
+    queen.max_reassignments = 1
+    agents = [DeadBackendAgent(name=f"dead_{i}", config=RESEARCH) for i in range(3)]
+    subtask = Task("Find facts about bees", task_type="research")
+    result = queen._run_subtask(subtask, agents, force=False)
+    assert result["executor"] is None
+    assert result["output"].startswith("[ERROR] Subtask failed after 1 reassignments")
+
+
+def test_expired_lease_moves_subtask_on(queen, stub_llm):
+    stub_llm.delay = 0.5
+    queen.subtask_lease = 0.2
+    agent = Agent(name="slow_researcher", config=RESEARCH)
+    subtask = Task("Find facts about wasps", task_type="research")
+    started = time.monotonic()
+    result = queen._run_subtask(subtask, [agent], force=False)
+    assert time.monotonic() - started < 0.45        # did not wait for the slow answer
+    assert subtask.reassignments == 1 and not agent.busy
+    assert result == {"executor": None, "output": "No suitable agent available."}   # nobody else to take it
+
+
+def test_callers_deadline_is_not_retried(queen, stub_llm):
+    stub_llm.delay = 0.5
+    with pytest.raises(DeadlineExceeded):
+        with deadline(time.monotonic() + 0.2):
+            queen._run_subtask(Task("Find facts", task_type="research"),
+                               [Agent(name="researcher_a", config=RESEARCH)], force=False)
+
+
+def test_orchestrate_reports_reassignments(queen):
+    result = queen.orchestrate(Task("Research ants and bees"), [Agent(name="researcher", config=RESEARCH),
+                                                                Agent(name="researcher_2", config=RESEARCH)])
+    assert result["reassignments"] == {"Find facts about ants": 0, "Find facts about bees": 0}
+
+
+def test_phi_rises_with_silence_relative_to_heartbeat_rhythm():
+    regular = PhiAccrualDetector(min_std=0.05, acceptable_pause=0.0, first_interval=0.1)
+    jittery = PhiAccrualDetector(min_std=0.05, acceptable_pause=0.0, first_interval=0.1)
+    for i in range(50):
+        regular.heartbeat(i * 0.1)
+        jittery.heartbeat(i * 0.1 + (0.3 if i % 2 else 0.0))
+    last = 4.9
+    assert regular.phi(last + 0.05) < 1 < regular.phi(last + 0.3)
+    assert regular.suspect(last + 1.0)
+    assert jittery.phi(last + 0.6) < regular.phi(last + 0.6)     # jitter earns more slack
+    assert PhiAccrualDetector().phi(123.0) == 0.0       # no heartbeat yet
@@ -0,0 +1,78 @@
+import os
+import pytest
+from core.registry import FileRegistry, freeze
+
+
+def write(path, text, mtime):
+    path.write_text(text)
+    os.utime(path, (mtime, mtime))
+
+
+def test_parses_once_until_file_changes(tmp_path):
+    registry = FileRegistry()
+    path = tmp_path / "prompt.txt"
+    write(path, "v1", 1000)
+    calls = []
+    parser = lambda p: (calls.append(p), p.read_text())[1]
+
+    assert registry.get(path, parser) == "v1"
+    assert registry.get(path, parser) == "v1"
+    assert len(calls) == 1
+
+    write(path, "v2", 2000)
+    assert registry.get(path, parser) == "v2"
+    assert len(calls) == 2
+
+
+def test_missing_file_uses_default_or_raises(tmp_path):
+    registry = FileRegistry()
+    path = tmp_path / "missing.txt"
+    assert registry.get(path, lambda p: p.read_text(), default="") == ""
+    with pytest.raises(FileNotFoundError):
+        registry.get(path, lambda p: p.read_text())
+
+
+def test_cached_objects_are_immutable():
+    frozen = freeze({"llm": {"caste": "minor"}, "tags": ["a", "b"]})
+    assert frozen["llm"].get("caste") == "minor"
+    assert frozen["tags"] == ("a", "b")
+    with pytest.raises(TypeError):
+        frozen["llm"]["caste"] = "queen"
+
+
+def test_poll_invalidates_and_notifies(tmp_path):
+    registry = FileRegistry()
+    path = tmp_path / "config.yaml"
+    write(path, "a", 1000)
+    registry.get(path, lambda p: p.read_text())
+    changed = []
+    registry.subscribe(changed.append)
+
+    assert registry.poll() == []
+    write(path, "b", 2000)
+    assert registry.poll() == [path]
+    assert changed == [path]
+
+
+def test_watcher_applies_prompt_edits(tmp_path):
+    registry = FileRegistry()
+    path = tmp_path / "agent.txt"
+    read = lambda p: p.read_text()
+    write(path, "old prompt", 1000)
+    assert registry.get(path, read) == "old prompt"
+    registry.start_watcher(interval=0.01)
+    try:
+        write(path, "new prompt", 2000)
+        for _ in range(200):
+            if registry.get(path, read) == "new prompt":
+                break
+            registry._stop.wait(0.01)
+        assert registry.get(path, read) == "new prompt"
+    finally:
+        registry.stop_watcher()
+
+
+def test_agent_configs_are_shared():
+    from core.agent_config import load_agent_config
+    assert load_agent_config("analyst") is load_agent_config("analyst")
+    assert load_agent_config("analyst")["llm"]["caste"] == "minor"
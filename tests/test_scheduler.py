@@ -0,0 +1,125 @@
+import threading
+import time
+import pytest
+import requests
+import core.llm
+import core.scheduler
+from agents.base import Agent, Queen
+from core.llm import DeadlineExceeded
+from core.scheduler import Scheduler, TaskShed
+from core.task import Priority, Task
+
+
+def _wait_for(condition, timeout: float = 5.0):
+    stop = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < stop, "condition not reached"
+        time.sleep(0.005)
+
+
+def _queue(scheduler: Scheduler, waiters: list[tuple]) -> tuple[list, list]:
+    """Start one thread per (name, priority, deadline) that records its admission, queued behind a held slot."""
+    admitted, threads, queued = [], [], scheduler.stats()["waiting"]
+
+    def run(name, priority, at):
+        scheduler.acquire(priority, at)
+        admitted.append(name)
+        scheduler.release(0.0)
+
+    for name, priority, at in waiters:
+        threads.append(threading.Thread(target=run, args=(name, priority, at)))
+        threads[-1].start()
+        _wait_for(lambda: scheduler.stats()["waiting"] == queued + len(threads))
+    return admitted, threads
+
+
+def test_waiting_work_is_admitted_by_priority_then_earliest_deadline():
+    scheduler = Scheduler(slots=1, aging=0)
+    scheduler.acquire()
+    now = time.monotonic()
+    admitted, threads = _queue(scheduler, [("low", Priority.LOW, None),
+                                           ("high, late", Priority.HIGH, now + 60),
+                                           ("normal", Priority.NORMAL, None),
+                                           ("high, soon", Priority.HIGH, now + 30),
+                                           ("high, no deadline", Priority.HIGH, None)])
+    scheduler.release(0.0)
+    for thread in threads:
+        thread.join()
+    assert admitted == ["high, soon", "high, late", "high, no deadline", "normal", "low"]
+    assert scheduler.stats()["admitted"] == 6 and scheduler.stats()["active"] == 0
+
+
+def test_aging_lets_waiting_bulk_work_overtake_newer_work():
+    scheduler = Scheduler(slots=1, aging=0.2)
+    scheduler.acquire()
+    admitted, threads = _queue(scheduler, [("low", Priority.LOW, None)])
+    time.sleep(0.25)       # one aging step: the low priority work now counts as normal
+    more, more_threads = _queue(scheduler, [("normal", Priority.NORMAL, None)])
+    scheduler.release(0.0)
+    for thread in threads + more_threads:
+        thread.join()
+    assert admitted + more == ["low", "normal"]
+    assert scheduler.stats()["aged"] == 1
+
+
+def test_work_that_cannot_meet_its_deadline_is_shed_early():
+    scheduler = Scheduler(slots=1, aging=0)
+    scheduler.acquire()
+    scheduler.release(0.5)     # a slot is held for about 0.5s
+    scheduler.acquire()
+    with pytest.raises(TaskShed):
+        scheduler.acquire(Priority.HIGH, time.monotonic() + 0.2)
+
+    # Still waiting 0.5s before its deadline, it gives up without waiting for the slot
+    started = time.monotonic()
+    with pytest.raises(TaskShed):
+        scheduler.acquire(Priority.HIGH, started + 0.8)
+    assert 0.25 < time.monotonic() - started < 0.6
+    stats = scheduler.stats()
+    assert stats["shed"] == 2 and stats["waiting"] == 0 and stats["active"] == 1
+
+
+def test_interactive_task_overtakes_queued_bulk_tasks(stub_llm, monkeypatch):
+    monkeypatch.setattr(core.scheduler, "scheduler", Scheduler(slots=1, aging=0))
+    stub_llm.delay = 0.2
+    finished = []
+
+    def think(name: str, priority: int):
+        Agent(name=f"scheduled_{name}", config={"task_type": "research"}).think(
+            Task(f"Find facts about {name}", priority=priority))
+        finished.append(name)
+
+    threads = []
+    for name, priority in [("bulk_0", Priority.LOW), ("bulk_1", Priority.LOW), ("bulk_2", Priority.LOW),
+                           ("user", Priority.HIGH)]:
+        threads.append(threading.Thread(target=think, args=(name, priority)))
+        threads[-1].start()
+        _wait_for(lambda: sum(core.scheduler.scheduler.stats()[key] for key in ("active", "waiting"))
+                  == len(threads))
+    for thread in threads:
+        thread.join()
+    assert finished == ["bulk_0", "user", "bulk_1", "bulk_2"]
+
+
+def test_subtasks_inherit_priority_and_deadline(stub_llm):
+    at = time.monotonic() + 60
+    subtasks = Queen("queen_scheduled", prewarm=[]).split_task(
+        Task("Research ants and bees", priority=Priority.HIGH, deadline=at), 2)
+    assert [(subtask.priority, subtask.deadline) for subtask in subtasks] == [(Priority.HIGH, at)] * 2
+
+
+def test_expired_task_never_reaches_the_backend(stub_llm):
+    agent = Agent(name="scheduled_late", config={"task_type": "research"})
+    with pytest.raises(DeadlineExceeded):
+        agent.think(Task("Find facts", deadline=time.monotonic() - 1))
+    assert not agent.busy
+
+
+def test_api_takes_a_priority(stub_llm, api):
+    url, _ = api()
+    requests.post(f"{url}/agents", json={"name": "researcher", "config": {"task_type": "research"}})
+    assert requests.post(f"{url}/agents/researcher/assign",
+                         json={"task": "Find facts", "priority": "urgent"}).status_code == 400
+    response = requests.post(f"{url}/agents/researcher/assign", json={"task": "Find facts", "priority": "high"})
+    assert response.status_code == 200
+    assert requests.get(f"{url}/health").json()["scheduler"]["admitted"] >= 1
@@ -0,0 +1,89 @@
+import random
+import pytest
+import tools.search as search
+from agents.base import Agent
+from core.task import Task
+from tools.search import SearchIndex, tokenize
+
+WORDS = ("ant bee wasp termite colony queen forage nectar pollen nest larva worker drone hive scout trail "
+         "pheromone soil leaf fungus garden swarm dance waggle comb wax honey sting mandible").split()
+
+
+def _corpus(count, seed=7):
+    rng = random.Random(seed)
+    return [(f"doc{i}", " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 40))), {"n": i})
+            for i in range(count)]
+
+
+def test_tokenize_drops_stopwords_and_folds_plurals():
+    assert tokenize("The ants are foraging in the GRASS for flowers and seeds") == \
+           ["ant", "foraging", "grass", "flower", "seed"]
+
+
+def test_ranks_matching_documents_and_reopens_from_disk(tmp_path):
+    with SearchIndex(tmp_path) as index:
+        index.add("Honey bees communicate the direction of food with a waggle dance.", "bees", {"path": "b.md"})
+        index.add("Leafcutter ants grow a fungus garden on chewed leaves.", "ants")
+        index.add("Termites build mounds with ventilation shafts.", "termites")
+        assert [hit.id for hit in index.search("how do bees dance")] == ["bees"]     # buffered documents are found
+        index.flush()
+
+    with SearchIndex(tmp_path) as index:
+        assert len(index) == 3 and len(index.segments) == 1
+        hits = index.search("ants leaves fungus", k=2)
+        assert hits[0].id == "ants" and hits[0].text.startswith("Leafcutter")
+        assert index.search("waggle")[0].meta == {"path": "b.md"}
+        assert index.search("unrelated words only") == []
+
+
+def test_early_termination_matches_exhaustive_scoring(tmp_path):
+    with SearchIndex(tmp_path, buffer_size=2000) as index:
+        index.add_many(_corpus(3000))
+        index.flush()
+        for query in ("queen larva", "waggle dance honey comb", "ant trail pheromone scout"):
+            exhaustive = index.search(query, k=5, early_termination=False)
+            scored = index.last_scored
+            fast = index.search(query, k=5)
+            assert [(hit.id, round(hit.score, 9)) for hit in fast] == \
+                   [(hit.id, round(hit.score, 9)) for hit in exhaustive]
+            assert index.last_scored < scored
+
+
+def test_segments_merge_without_changing_results(tmp_path):
+    documents = _corpus(500, seed=3)
+    with SearchIndex(tmp_path, merge_factor=4, buffer_size=50) as index:
+        index.add_many(documents)
+        index.flush()
+        assert 1 < len(index.segments) <= 4 + 1
+        before = [(hit.id, round(hit.score, 9)) for hit in index.search("colony nest swarm", k=10)]
+        index.merge(force=True)
+        assert len(index.segments) == 1 and len(index) == 500
+        assert [(hit.id, round(hit.score, 9)) for hit in index.search("colony nest swarm", k=10)] == before
+        assert index.segments[0].document(0)["id"] == "doc0"
+    files = sorted(path.name for path in tmp_path.iterdir())
+    assert len(files) == 2 and files[0].endswith(".bm25") and files[1] == "segments.json"   # merged segments deleted
+
+
+def test_reader_picks_up_segments_written_by_another_index(tmp_path):
+    reader = SearchIndex(tmp_path)
+    assert reader.search("hive") == []
+    with SearchIndex(tmp_path) as writer:
+        writer.add("A hive of bees", "hive")
+        writer.flush()
+    assert reader.refresh()
+    assert [hit.id for hit in reader.search("hive")] == ["hive"]
+    reader.close()
+
+
+def test_research_agent_prompt_includes_retrieved_passages(stub_llm, tmp_path, monkeypatch):
+    monkeypatch.setattr(search, "SEARCH_INDEX_DIR", tmp_path / "index")
+    monkeypatch.setattr(search, "_shared", None)
+    researcher = Agent(name="library_researcher", config={"task_type": "research"})
+    assert researcher.think(Task("How do bees communicate?")) == "stub answer to: How do bees communicate?"
+
+    with SearchIndex(tmp_path / "index") as index:
+        index.add("Honey bees communicate with a waggle dance.", "bees.md#0")
+        index.flush()
+    researcher.memory.clear()
+    assert researcher.think(Task("How do bees communicate?")) == "stub answer to: Relevant passages from the loc"
+    monkeypatch.setattr(search, "_shared", None)
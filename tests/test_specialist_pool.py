@@ -0,0 +1,136 @@
+import threading
+import time
+from unittest.mock import patch
+from agents.base import Queen
+from core.pool import SpecialistPool
+from core.task import Task, TaskMapping
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeAgent:
+    def __init__(self, name, task_type):
+        self.name = name
+        self.task_type = task_type
+        self.system_prompt = ""
+
+
+def make_pool(**kwargs):
+    created = []
+
+    def factory(task_type):
+        agent = FakeAgent(f"{task_type}_{len(created)}", task_type)
+        created.append(agent)
+        return agent
+
+    return SpecialistPool(factory, **kwargs), created
+
+
+def test_prewarmed_specialist_is_reused():
+    pool, created = make_pool(min_idle=1, max_size=3)
+    assert pool.prewarm(["research", "analysis"]) == 2
+    first = pool.acquire("research")
+    assert first is created[0]
+    pool.release(first)
+    assert pool.acquire("research") in (first, created[2])
+    assert pool.stats.hits == 2
+    assert pool.stats.rejections == 0
+
+
+def test_max_size_bounds_specialists_per_type():
+    pool, _ = make_pool(min_idle=1, max_size=2)
+    taken = [pool.acquire("research"), pool.acquire("research")]
+    assert all(taken)
+    assert pool.acquire("research") is None
+    assert pool.stats.rejections == 1
+    pool.release(taken[0])
+    assert pool.acquire("research") is taken[0]
+
+
+def test_idle_specialists_retire_after_ttl_but_keep_min_idle():
+    clock = FakeClock()
+    pool, _ = make_pool(min_idle=1, max_size=3, idle_ttl=10, clock=clock)
+    agents = [pool.acquire("research") for _ in range(3)]
+    for agent in agents:
+        pool.release(agent)
+    clock.now = 11
+    retired = pool.evict_idle()
+    assert len(retired) == 2
+    assert pool.stats.evictions == 2
+    assert pool.snapshot()["pools"]["research"] == {"idle": 1, "in_use": 0}
+
+
+def test_release_retires_idle_specialists_past_the_ttl():
+    clock = FakeClock()
+    pool, _ = make_pool(min_idle=0, max_size=3, idle_ttl=10, clock=clock)
+    first, second = pool.acquire("research"), pool.acquire("research")
+    pool.release(first)
+    clock.now = 11
+    pool.release(second)
+    assert pool.snapshot()["pools"]["research"] == {"idle": 1, "in_use": 0}
+    assert pool.stats.evictions == 1
+
+
+def test_slow_factory_does_not_block_other_task_types():
+    gate, started = threading.Event(), threading.Event()
+
+    def factory(task_type):
+        if task_type == "slow":
+            started.set()
+            gate.wait(5)
+        return FakeAgent(f"{task_type}_{threading.get_ident()}", task_type)
+
+    pool = SpecialistPool(factory, min_idle=0, max_size=1)
+    slow = threading.Thread(target=pool.acquire, args=("slow",))
+    slow.start()
+    started.wait(5)
+    assert pool.acquire("fast") is not None
+    assert pool.acquire("slow") is None         # its only slot is reserved by the spawn in progress
+    gate.set()
+    slow.join()
+    assert pool.snapshot()["pools"]["slow"] == {"idle": 0, "in_use": 1}
+
+
+def test_queen_prewarms_only_what_it_is_given():
+    assert Queen("queen_cold", prewarm=[]).pool.stats.spawns == 0
+    assert Queen("queen_warm", prewarm=["research"]).pool.stats.spawns == 1
+
+
+def test_queen_prewarms_every_task_type_in_the_background_by_default():
+    queen = Queen("queen_default")
+    task_types = TaskMapping().get_all_types()
+    deadline = time.monotonic() + 5
+    while queen.pool.stats.spawns < len(task_types) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert set(queen.pool.snapshot()["pools"]) == set(task_types)
+
+
+def test_queen_prewarm_setting_can_turn_it_off(monkeypatch):
+    monkeypatch.setattr("core.pool.POOL_PREWARM", "")
+    queen = Queen("queen_unwarmed")
+    time.sleep(0.05)
+    assert queen.pool.stats.spawns == 0
+
+
+@patch("tools.classifier.generate", return_value="research")
+@patch("agents.base.generate")
+def test_orchestrate_without_agents_uses_pooled_specialists(mock_generate, _):
+    mock_generate.side_effect = lambda prompt, system="", **kw: (
+        "Find sources\nFind more sources" if prompt.startswith("Split") else "done")
+    queen = Queen("queen_pool", prewarm=["research"])
+    assert queen.pool.stats.spawns == 1
+
+    for _ in range(2):
+        result = queen.orchestrate(Task("Research a topic"), [], force=True)
+        assert list(result["results"].values()) == ["done", "done"]
+
+    stats = queen.pool.snapshot()
+    assert stats["hits"] >= 2
+    assert stats["pools"]["research"]["in_use"] == 0
+    assert len(queen.spawned_agents) <= queen.get_spawn_limit()
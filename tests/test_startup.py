@@ -0,0 +1,62 @@
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+# Extra import time `agentctl` may add on top of Typer itself, in microseconds.
+AGENTCTL_IMPORT_BUDGET_US = 50_000
+HEAVY_MODULES = ("requests", "rich", "yaml", "dotenv", "agents.base", "core.llm")
+
+
+def run_python(code: str, *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *flags, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+
+
+def cumulative_import_times(stderr: str) -> dict[str, int]:
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        times.setdefault(module.strip(), int(cumulative))
+    return times
+
+
+def test_agentctl_import_stays_within_budget():
+    times = cumulative_import_times(run_python("import cli.agentctl", "-X", "importtime").stderr)
+    own_time = times["cli.agentctl"] - times.get("typer", 0)
+    assert own_time < AGENTCTL_IMPORT_BUDGET_US, f"agentctl adds {own_time}us of imports"
+    assert not set(HEAVY_MODULES) & set(times)
+
+
+def test_list_command_does_not_load_agent_stack():
+    result = run_python(
+        "import sys\n"
+        "from typer.testing import CliRunner\n"
+        "from cli.agentctl import app\n"
+        "CliRunner().invoke(app, ['list'])\n"
+        f"print(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    assert result.stdout.strip().splitlines()[-1] == "[]"
+
+
+def test_importing_library_has_no_side_effects(tmp_path):
+    code = (
+        "import sys, os\n"
+        f"sys.path.insert(0, {str(ROOT)!r})\n"
+        "import core.logger, memory.memory, core.agent_config, core.task, core.swarm\n"
+        "import logging\n"
+        "print(os.path.exists('logs'), bool(logging.getLogger('memory').handlers))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False False"
+
+
+def test_agent_module_loads_search_documents_and_pool_on_first_use():
+    result = run_python(
+        "import sys\n"
+        "import agents.base\n"
+        "print(sorted(m for m in ('tools.search', 'tools.document_parser', 'core.pool') if m in sys.modules))"
+    )
+    assert result.stdout.strip().splitlines()[-1] == "[]"
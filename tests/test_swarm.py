@@ -11,3 +11,11 @@ def test_swarm_register_and_get():
     agent2 = swarm.get("other")
     assert agent2.name == "other"
     assert "other" in swarm.list_agents()
+
+
+def test_swarm_get_builds_an_agent_once_under_concurrency():
+    from concurrent.futures import ThreadPoolExecutor
+    swarm = Swarm()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        agents = list(pool.map(lambda _: swarm.get("racer"), range(32)))
+    assert all(agent is agents[0] for agent in agents)
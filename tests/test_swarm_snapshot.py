@@ -0,0 +1,107 @@
+import time
+from unittest.mock import patch
+import pytest
+from typer.testing import CliRunner
+from agents.base import Agent, Queen
+from core.swarm import SNAPSHOT_HEADER, SNAPSHOT_MAGIC, Swarm, read_snapshot_names
+import cli.agentctl as agentctl
+
+
+def test_snapshot_roundtrip_keeps_definitions(tmp_path):
+    swarm = Swarm()
+    swarm.register("snap_analyst", "analyst")
+    swarm.add(Agent(name="snap_custom", role="custom", config={"task_type": "research", "llm": {"caste": "major"},
+                                                            "reuse": {"enabled": True}}))
+    swarm.add(Agent(name="research_auto_beef", role="research",
+                              config={"task_type": "research", "llm": {"caste": "larva"}}, spawned=True))
+    path = tmp_path / "swarm.snapshot"
+    assert swarm.snapshot(path) == 3
+
+    restored = Swarm()
+    with patch("agents.base.load_agent_config") as mock_config, patch("agents.base.load_agent_memory") as mock_memory:
+        assert restored.restore(path) == 3
+        mock_config.assert_not_called()
+        mock_memory.assert_not_called()
+    assert restored.list_agents() == swarm.list_agents() == read_snapshot_names(path)
+    custom = restored.get("snap_custom")
+    assert (custom.role, custom.task_type, custom.llm_config["caste"]) == ("custom", "research", "major")
+    assert custom.reuse_config["enabled"] is True
+    assert restored.get("research_auto_beef").spawned
+
+
+def test_restore_rejects_foreign_files(tmp_path):
+    path = tmp_path / "junk"
+    path.write_bytes(b"x" * 64)
+    with pytest.raises(ValueError):
+        Swarm().restore(path)
+
+
+def test_restore_thousands_of_agents_quickly(tmp_path):
+    swarm = Swarm()
+    config = {"task_type": "analysis", "llm": {"caste": "minor"}}
+    for i in range(5000):
+        swarm.add(Agent(name=f"bulk_{i}", config=config))
+    path = tmp_path / "bulk.snapshot"
+    swarm.snapshot(path)
+
+    started = time.perf_counter()
+    restored = Swarm()
+    restored.restore(path)
+    elapsed = time.perf_counter() - started
+    assert len(restored.agents) == 5000
+    assert restored.get("bulk_0")._profile is restored.get("bulk_4999")._profile
+    assert elapsed < 0.5
+
+
+def test_autosave_writes_periodically(tmp_path):
+    swarm = Swarm()
+    swarm.register("autosaved")
+    path = tmp_path / "auto.snapshot"
+    swarm.start_autosave(path, interval=0.01)
+    for _ in range(200):
+        if path.exists():
+            break
+        time.sleep(0.01)
+    swarm.stop_autosave()
+    assert path.exists()
+
+
+def test_agentctl_create_then_list_across_processes(tmp_path, monkeypatch):
+    monkeypatch.setattr(agentctl, "SWARM_SNAPSHOT", str(tmp_path / "swarm.snapshot"))
+    runner = CliRunner()
+    monkeypatch.setattr(agentctl, "_swarm", None)
+    assert runner.invoke(agentctl.app, ["create", "persisted_bob", "--role", "analyst"]).exit_code == 0
+
+    monkeypatch.setattr(agentctl, "_swarm", None)   # a fresh process
+    result = runner.invoke(agentctl.app, ["list"])
+    assert "persisted_bob" in result.stdout
+
+
+def test_restore_rebuilds_queens_and_agents_with_changed_configs(tmp_path):
+    swarm = Swarm()
+    swarm.add(Queen("snap_queen", prewarm=["research", "analysis"]))
+    swarm.add(Agent(name="snap_edited", role="analyst", config={"task_type": "analysis"}))
+    path = tmp_path / "swarm.snapshot"
+    swarm.snapshot(path)
+
+    restored = Swarm()
+    edited = {"task_type": "research", "llm": {"caste": "major"}}
+    with patch("core.agent_config.config_signature",
+               side_effect=lambda name: (1, 1) if name == "snap_edited" else (-1, 0)), \
+         patch("agents.base.load_agent_config", return_value=edited):
+        assert restored.restore(path) == 2
+    queen = restored.get("snap_queen")
+    assert isinstance(queen, Queen)
+    assert sorted(a.task_type for a in queen.spawned_agents) == ["analysis", "research"]
+    agent = restored.get("snap_edited")
+    assert (agent.role, agent.task_type, agent.llm_config["caste"]) == ("analyst", "research", "major")
+
+
+def test_agentctl_ignores_a_snapshot_in_an_old_format(tmp_path, monkeypatch):
+    path = tmp_path / "swarm.snapshot"
+    path.write_bytes(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, 1, 0, 0))
+    monkeypatch.setattr(agentctl, "SWARM_SNAPSHOT", str(path))
+    monkeypatch.setattr(agentctl, "_swarm", None)
+    result = CliRunner().invoke(agentctl.app, ["create", "upgraded_bob"])
+    assert result.exit_code == 0 and "[WARN]" in result.stdout
+    assert read_snapshot_names(path) == ["upgraded_bob"]
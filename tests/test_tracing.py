@@ -0,0 +1,91 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+import pytest
+from agents.base import Agent, Queen
+from core.task import Task
+from core.tracing import Tracer, tracer as global_tracer
+
+
+@pytest.fixture
+def enabled_tracer():
+    global_tracer.clear()
+    global_tracer.enable()
+    yield global_tracer
+    global_tracer.disable()
+    global_tracer.clear()
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer()
+    with tracer.span("noop", task_id="x") as span:
+        span.set(agent="a")
+    assert tracer.spans() == []
+    fn = lambda: 1
+    assert tracer.wrap(fn) is fn
+
+
+def test_nested_spans_inherit_attributes():
+    tracer = Tracer()
+    tracer.enable()
+    with tracer.span("outer", task_id="t1"):
+        with tracer.span("inner", agent="bob"):
+            pass
+    inner, outer = tracer.spans()
+    assert inner["args"]["parent_id"] == outer["args"]["span_id"]
+    assert inner["args"]["task_id"] == "t1"
+    assert inner["args"]["agent"] == "bob"
+    assert outer["ts"] <= inner["ts"] and inner["dur"] <= outer["dur"]
+
+
+def test_wrap_propagates_context_to_thread_pool():
+    tracer = Tracer()
+    tracer.enable()
+
+    def work():
+        with tracer.span("child"):
+            pass
+
+    with tracer.span("parent", task_id="t2"):
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            for future in [pool.submit(tracer.wrap(work)) for _ in range(2)]:
+                future.result()
+    parent = next(e for e in tracer.spans() if e["name"] == "parent")
+    children = [e for e in tracer.spans() if e["name"] == "child"]
+    assert len(children) == 2
+    assert all(c["args"]["parent_id"] == parent["args"]["span_id"] for c in children)
+    assert all(c["args"]["task_id"] == "t2" for c in children)
+
+
+def test_span_records_errors():
+    tracer = Tracer()
+    tracer.enable()
+    with pytest.raises(RuntimeError):
+        with tracer.span("boom"):
+            raise RuntimeError("fail")
+    assert tracer.spans()[0]["args"]["error"] == "RuntimeError"
+
+
+@patch("agents.base.queue_agent_memory")
+@patch("tools.classifier.generate", return_value="research")
+@patch("agents.base.generate")
+def test_orchestrate_trace_exports_chrome_format(mock_generate, _, __, enabled_tracer, tmp_path):
+    mock_generate.side_effect = lambda prompt, system=None, **kw: (
+        "Find papers\nRead papers" if prompt.startswith("Split") else "done"
+    )
+    queen = Queen("queen")
+    agents = [Agent(name=f"trace_researcher_{i}", config={"task_type": "research"}) for i in range(2)]
+    task = Task("Find and read papers")
+    queen.orchestrate(task, agents)
+
+    path = enabled_tracer.export(tmp_path / "trace.json")
+    events = json.loads(path.read_text())["traceEvents"]
+    spans = [e for e in events if e["ph"] == "X"]
+    names = {e["name"] for e in spans}
+    assert {"orchestrate", "split_task", "subtask", "define_task_type", "assign_task",
+            "think", "llm.generate", "memory.save", "summarize_results_inline"} <= names
+    thinks = [e for e in spans if e["name"] == "think"]
+    assert {e["args"]["agent"] for e in thinks} <= {a.name for a in agents}
+    subtask_ids = {e["args"]["task_id"] for e in spans if e["name"] == "subtask"}
+    assert {e["args"]["task_id"] for e in thinks} == subtask_ids
+    assert any(e["ph"] == "M" for e in events)
@@ -1,9 +1,10 @@
 from core.llm import generate
-from core.logger import get_logger
+from core.logger import LazyLogger
+from core.prompt_builder import PromptBuilder
 from typing import Dict, List
 from core.task import Task
 
-logger = get_logger("classifier")
+logger = LazyLogger("classifier")
 
 def classify_task(task: Task, mapping: Dict[str, List[str]]) -> str:
     """
@@ -25,17 +26,21 @@ def classify_task(task: Task, mapping: Dict[str, List[str]]) -> str:
                 return category
         return "generic"
 
-    # Prepare the prompt
-    prompt_lines = ["Here is a list of task categories and their associated keywords:",]
-    for category, keywords in mapping.items():
-        prompt_lines.append(f"- {category}: {', '.join(keywords)}")
-    prompt_lines.append("""
+    # Prepare the prompt; over budget, the keywords go first, then the task is cut
+    builder = PromptBuilder()
+    builder.add("Here is a list of task categories and their associated keywords:", shrink="keep")
+    builder.add(
+        "\n".join(f"- {category}: {', '.join(keywords)}" for category, keywords in mapping.items()),
+        name="mapping",
+        compress=lambda _: "\n".join(f"- {category}" for category in mapping),
+    )
+    builder.add("""
 Based on the mapping above, classify the following task into one of the categories.
 Return only the category name.
 Task:
-""")
-    prompt_lines.append(task.content)
-    prompt = "\n".join(prompt_lines)
+""", shrink="keep")
+    builder.add(task.content, name="task", priority=1)
+    prompt = builder.build()
     logger.info(f"Classifying task: {task.content}")
     response = generate(prompt=prompt).strip().lower()
     
@@ -0,0 +1,399 @@
+import csv
+import io
+import os
+import re
+from collections import deque
+from functools import partial
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import IO, Iterable, Iterator
+
+from core.logger import LazyLogger
+from core.prompt_builder import count_tokens
+
+logger = LazyLogger("document_parser")
+
+DOCUMENT_CHUNK_TOKENS = int(os.getenv("DOCUMENT_CHUNK_TOKENS", "1024"))
+# Tokens at the end of a chunk repeated at the start of the next, so no passage loses its lead-in
+DOCUMENT_CHUNK_OVERLAP = int(os.getenv("DOCUMENT_CHUNK_OVERLAP", "64"))
+
+# Characters read at a time, and the most a block grows before it is handed on
+READ_SIZE = 1 << 16
+
+FORMATS = {".md": "markdown", ".markdown": "markdown", ".html": "html", ".htm": "html", ".csv": "csv",
+           ".tsv": "tsv"}
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)(?:\s+#+)?\s*$")
+_FENCE = re.compile(r"^\s*(`{3,}|~{3,})")
+_LINE_BREAK = re.compile(r"\n+")
+_SENTENCE_END = re.compile(r"(?<=[.!?;:])\s+")
+_WHITESPACE = re.compile(r"\s+")
+
+Block = tuple[str, str]     # text, and the context a chunk starting with it is prefixed with (or None)
+
+
+class Chunk:
+    """A piece of a document that fits a prompt."""
+    __slots__ = ("index", "text", "tokens", "source")
+
+    def __init__(self, index: int, text: str, tokens: int, source: str = None):
+        self.index = index
+        self.text = text
+        self.tokens = tokens
+        self.source = source
+
+    @property
+    def id(self) -> str:
+        return f"{self.source}#{self.index}" if self.source else str(self.index)
+
+    def __repr__(self):
+        return f"Chunk({self.id!r}, tokens={self.tokens}, text={self.text[:40]!r})"
+
+
+def detect_format(path) -> str:
+    """Return the format of a file from its suffix: markdown, html, csv, tsv or text."""
+    return FORMATS.get(Path(path).suffix.lower(), "text")
+
+
+def _lines(stream: IO[str]) -> Iterator[str]:
+    # Bounded reads, so a file without line breaks is not read in one piece
+    return iter(partial(stream.readline, READ_SIZE), "")
+
+
+def _trail_context(trail: list[tuple[int, str]]) -> str | None:
+    return f"[{' > '.join(title for _, title in trail)}]" if trail else None
+
+
+def _text_blocks(stream: IO[str]) -> Iterator[Block]:
+    """Paragraphs, i.e. runs of non-blank lines."""
+    paragraph, size = [], 0
+    for line in _lines(stream):
+        if line.strip():
+            paragraph.append(line)
+            size += len(line)
+            if size < READ_SIZE:
+                continue
+        if paragraph:
+            yield "".join(paragraph).strip(), None
+            paragraph, size = [], 0
+    if paragraph:
+        yield "".join(paragraph).strip(), None
+
+
+def _markdown_blocks(stream: IO[str]) -> Iterator[Block]:
+    """Paragraphs, headings and fenced code blocks; each carries the headings it is under."""
+    trail = []          # (level, title) of the enclosing headings
+    paragraph, size, fence = [], 0, None
+
+    def flush():
+        nonlocal paragraph, size
+        text = "".join(paragraph).strip("\n") if fence else "".join(paragraph).strip()
+        paragraph, size = [], 0
+        return text
+
+    for line in _lines(stream):
+        if fence:
+            paragraph.append(line)
+            size += len(line)
+            closed = line.strip().startswith(fence)
+            if closed or size >= READ_SIZE:
+                yield flush(), _trail_context(trail)
+                if closed:
+                    fence = None
+            continue
+        match = _FENCE.match(line)
+        heading = _HEADING.match(line)
+        if match or heading or not line.strip():
+            if paragraph:
+                yield flush(), _trail_context(trail)
+            if match:
+                fence = match.group(1)
+                paragraph, size = [line], len(line)
+            elif heading:
+                level = len(heading.group(1))
+                trail = [(lvl, title) for lvl, title in trail if lvl < level]
+                yield line.strip(), _trail_context(trail)
+                trail.append((level, heading.group(2)))
+            continue
+        paragraph.append(line)
+        size += len(line)
+        if size >= READ_SIZE:
+            yield flush(), _trail_context(trail)
+    if paragraph:
+        yield flush(), _trail_context(trail)
+
+
+class _HTMLBlocks(HTMLParser):
+    """Collects the visible text of block elements as they close."""
+    BLOCK_TAGS = {"address", "article", "aside", "blockquote", "body", "br", "caption", "dd", "div", "dl", "dt",
+                  "figcaption", "footer", "form", "header", "hr", "li", "main", "nav", "ol", "p", "pre", "section",
+                  "table", "title", "tr", "ul", "h1", "h2", "h3", "h4", "h5", "h6"}
+    CELL_TAGS = {"td", "th"}
+    SKIP_TAGS = {"script", "style", "noscript", "template", "svg"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks = deque()
+        self._parts, self._size = [], 0
+        self._skip = self._pre = 0
+        self._in_row = False    # a cell of the current table row was opened
+        self._heading = None    # level of the heading being read
+        self._trail = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip += 1
+        elif tag in self.CELL_TAGS:
+            if self._in_row:
+                self._parts.append(" | ")     # a table row becomes one line
+            self._in_row = True
+        elif tag in self.BLOCK_TAGS:
+            self._flush()
+            if tag[0] == "h" and tag[1:].isdigit():
+                self._heading = int(tag[1])
+            elif tag == "pre":
+                self._pre += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+        elif tag in self.BLOCK_TAGS:
+            if self._heading and tag == f"h{self._heading}":
+                level, title = self._heading, _WHITESPACE.sub(" ", "".join(self._parts)).strip()
+                self._parts, self._size, self._heading = [], 0, None
+                if title:
+                    self._trail = [(lvl, text) for lvl, text in self._trail if lvl < level]
+                    self.blocks.append((f"{'#' * level} {title}", _trail_context(self._trail)))
+                    self._trail.append((level, title))
+                return
+            self._flush()
+            if tag == "pre":
+                self._pre = max(0, self._pre - 1)
+
+    def handle_data(self, data):
+        if self._skip:
+            return
+        self._parts.append(data if self._pre else _WHITESPACE.sub(" ", data))
+        self._size += len(data)
+        if self._size >= READ_SIZE and not self._heading:
+            self._flush()
+
+    def _flush(self):
+        text = "".join(self._parts)
+        text = text.strip("\n") if self._pre else _WHITESPACE.sub(" ", text).strip()
+        self._parts, self._size, self._in_row = [], 0, False
+        if text:
+            self.blocks.append((text, _trail_context(self._trail)))
+
+    def close(self):
+        super().close()
+        self._heading = None
+        self._flush()
+
+
+def _html_blocks(stream: IO[str]) -> Iterator[Block]:
+    """Text of block elements, without scripts and styles; each carries the headings it is under."""
+    parser = _HTMLBlocks()
+    for data in iter(partial(stream.read, READ_SIZE), ""):
+        parser.feed(data)
+        while parser.blocks:
+            yield parser.blocks.popleft()
+    parser.close()
+    yield from parser.blocks
+
+
+def _csv_blocks(stream: IO[str], delimiter: str = ",") -> Iterator[Block]:
+    """One block per row; every chunk starts with the header row."""
+    reader = csv.reader(stream, delimiter=delimiter)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=delimiter, lineterminator="")
+
+    def line(row: list[str]) -> str:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(row)
+        return buffer.getvalue()
+
+    header = next(reader, None)
+    if header is None:
+        return
+    context = line(header)
+    for row in reader:
+        if any(cell.strip() for cell in row):
+            yield line(row), context
+
+
+def iter_blocks(stream: IO[str], format: str = "text") -> Iterator[Block]:
+    """Stream the structural blocks (paragraphs, rows, ...) of a document.
+
+    Args:
+        stream (IO[str]): Text stream; CSV streams should be opened with newline="".
+        format (str, optional): text, markdown, html, csv or tsv. Defaults to "text".
+
+    Returns:
+        Iterator[Block]: (text, context) pairs, where context (or None) is what a chunk
+            starting with the block is prefixed with: the enclosing headings, or the CSV header.
+    """
+    if format == "markdown":
+        return _markdown_blocks(stream)
+    if format == "html":
+        return _html_blocks(stream)
+    if format in ("csv", "tsv"):
+        return _csv_blocks(stream, "\t" if format == "tsv" else ",")
+    if format != "text":
+        raise ValueError(f"Unknown document format '{format}'")
+    return _text_blocks(stream)
+
+
+def _pack(units: Iterable[str], limit: int, joiner: str) -> Iterator[str]:
+    """Join consecutive units while they fit `limit` tokens; longer units are cut."""
+    joiner_tokens = count_tokens(joiner)
+    group, size = [], 0
+    for unit in units:
+        tokens = count_tokens(unit)
+        if tokens > limit:
+            if group:
+                yield joiner.join(group)
+                group, size = [], 0
+            yield from _cut(unit, limit)
+            continue
+        if group and size + joiner_tokens + tokens > limit:
+            yield joiner.join(group)
+            group, size = [], 0
+        size += tokens + (joiner_tokens if group else 0)
+        group.append(unit)
+    if group:
+        yield joiner.join(group)
+
+
+def _cut(text: str, limit: int) -> Iterator[str]:
+    """Split a text over `limit` tokens at line breaks, then sentences, then words, then characters."""
+    for boundary, joiner in ((_LINE_BREAK, "\n"), (_SENTENCE_END, " "), (_WHITESPACE, " ")):
+        units = [unit for unit in boundary.split(text.strip()) if unit.strip()]
+        if len(units) > 1:
+            yield from _pack(units, limit, joiner)
+            return
+    text = text.strip()
+    while text:
+        # Longest prefix within the limit; the token count grows monotonically with the length
+        low, high = 1, len(text)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if count_tokens(text[:mid]) <= limit:
+                low = mid
+            else:
+                high = mid - 1
+        yield text[:low]
+        text = text[low:]
+
+
+def _tail(text: str, tokens: int) -> str:
+    """The last sentences of a text that fit `tokens` tokens, or else its last words."""
+    for boundary in (_SENTENCE_END, _WHITESPACE):
+        units = [unit for unit in boundary.split(text.strip()) if unit]
+        low, high = 0, len(units)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if count_tokens(" ".join(units[-mid:])) <= tokens:
+                low = mid
+            else:
+                high = mid - 1
+        if low:
+            return " ".join(units[-low:])
+    return ""
+
+
+def chunk_blocks(blocks: Iterable[Block], max_tokens: int = DOCUMENT_CHUNK_TOKENS,
+                 overlap: int = DOCUMENT_CHUNK_OVERLAP, separator: str = "\n\n", source: str = None) -> Iterator[Chunk]:
+    """Pack blocks into chunks of at most `max_tokens` tokens.
+
+    Blocks are kept whole where they fit and split at sentences, words or, as a
+    last resort, characters where they don't. Each chunk after the first starts
+    with up to `overlap` tokens from the end of the previous one, and with the
+    context (headings, CSV header) of its first new block. Only the chunk being
+    built is held in memory.
+
+    Args:
+        blocks (Iterable[Block]): (text, context) pairs, e.g. from `iter_blocks`
+        max_tokens (int, optional): Token budget of a chunk. Defaults to DOCUMENT_CHUNK_TOKENS.
+        overlap (int, optional): Tokens repeated from the previous chunk; at most half
+            the budget. Defaults to DOCUMENT_CHUNK_OVERLAP.
+        separator (str, optional): Joins blocks within a chunk. Defaults to "\\n\\n".
+        source (str, optional): Document name, for chunk ids. Defaults to None.
+
+    Returns:
+        Iterator[Chunk]: Chunks in document order
+    """
+    if max_tokens <= 0:
+        raise ValueError("max_tokens must be positive")
+    overlap = max(0, min(overlap, max_tokens // 2))
+    separator_tokens = count_tokens(separator)
+    pieces, sizes = [], []      # the chunk being built; the first `carried` come from the previous chunk
+    carried, used, context, index = 0, 0, None, 0
+
+    def emit() -> Chunk:
+        body = separator.join(pieces)
+        text = f"{context}\n{body}" if context else body
+        return Chunk(index, text, count_tokens(text), source)
+
+    for text, block_context in blocks:
+        context_tokens = count_tokens(block_context) + 1 if block_context else 0
+        # Room for a piece after the context, the overlap and their separators
+        limit = max(1, max_tokens - context_tokens - overlap - 2 * separator_tokens)
+        tokens = count_tokens(text)
+        for piece, tokens in (((piece, count_tokens(piece)) for piece in _cut(text, limit)) if tokens > limit
+                              else ((text, tokens),)):
+            if len(pieces) > carried and used + separator_tokens + tokens > max_tokens:
+                yield emit()
+                index += 1
+                # Carry whole pieces from the end, or the tail of the last one
+                keep, kept = 0, 0
+                while keep < len(pieces) and kept + sizes[-1 - keep] + separator_tokens <= overlap:
+                    kept += sizes[-1 - keep] + separator_tokens
+                    keep += 1
+                if keep:
+                    pieces, sizes = pieces[-keep:], sizes[-keep:]
+                else:
+                    tail = _tail(pieces[-1], overlap) if overlap else ""
+                    pieces, sizes = ([tail], [count_tokens(tail)]) if tail else ([], [])
+                carried = len(pieces)
+            if len(pieces) == carried:
+                context = block_context
+                used = (context_tokens + sum(sizes) + separator_tokens * max(0, len(sizes) - 1))
+            used += tokens + (separator_tokens if pieces else 0)
+            pieces.append(piece)
+            sizes.append(tokens)
+    if len(pieces) > carried:
+        yield emit()
+
+
+def parse_document(path, max_tokens: int = DOCUMENT_CHUNK_TOKENS, overlap: int = DOCUMENT_CHUNK_OVERLAP,
+                   format: str = None) -> Iterator[Chunk]:
+    """Stream a file as prompt-sized chunks.
+
+    The file is read in bounded pieces as the chunks are consumed, so memory use
+    does not grow with its size.
+
+    Args:
+        path (str | Path): Plain text, Markdown, HTML or CSV/TSV file
+        max_tokens (int, optional): Token budget of a chunk. Defaults to DOCUMENT_CHUNK_TOKENS.
+        overlap (int, optional): Tokens repeated from the previous chunk. Defaults to DOCUMENT_CHUNK_OVERLAP.
+        format (str, optional): Overrides the format detected from the suffix.
+
+    Returns:
+        Iterator[Chunk]: Chunks in document order, with ids "<path>#<index>"
+    """
+    format = format or detect_format(path)
+    tabular = format in ("csv", "tsv")
+    logger.debug(f"[PARSE] Chunking {path} as {format}")
+    with open(path, encoding="utf-8", errors="replace", newline="" if tabular else None) as stream:
+        yield from chunk_blocks(iter_blocks(stream, format), max_tokens, overlap,
+                                separator="\n" if tabular else "\n\n", source=str(path))
+
+
+def chunk_text(text: str, max_tokens: int = DOCUMENT_CHUNK_TOKENS, overlap: int = DOCUMENT_CHUNK_OVERLAP,
+               format: str = "text", source: str = None) -> Iterator[Chunk]:
+    """Chunk a document already in memory, e.g. one pasted into a task."""
+    tabular = format in ("csv", "tsv")
+    stream = io.StringIO(text, newline="" if tabular else "\n")
+    return chunk_blocks(iter_blocks(stream, format), max_tokens, overlap,
+                        separator="\n" if tabular else "\n\n", source=source)
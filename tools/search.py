@@ -0,0 +1,557 @@
+import bisect
+import heapq
+import itertools
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, Iterator
+from core.logger import LazyLogger
+from memory.vector_store import STOPWORDS, TOKEN_PATTERN
+
+logger = LazyLogger("search")
+
+SEARCH_INDEX_DIR = Path(os.getenv("SEARCH_INDEX_DIR", "data/search_index"))
+SEARCH_MERGE_FACTOR = int(os.getenv("SEARCH_MERGE_FACTOR", "8"))
+SEARCH_BUFFER_DOCS = int(os.getenv("SEARCH_BUFFER_DOCS", "1000"))
+# Passages retrieved into the prompt of research tasks; 0 turns retrieval off
+SEARCH_CONTEXT_K = int(os.getenv("SEARCH_CONTEXT_K", "3"))
+
+SEGMENT_VERSION = 1
+# magic, version, reserved, documents, terms, total tokens, then the offsets of the sections
+# (in file order: lengths, store, store index, postings, terms)
+SEGMENT_HEADER = struct.Struct("<4sHHIIQQQQQQ")
+TERM_ENTRY = struct.Struct("<IIIQI")        # df, max tf, min doc length, postings offset, postings size
+BLOCK_ENTRY = struct.Struct("<II")          # last doc id in the block, end of its data
+BLOCK_SIZE = 128
+MANIFEST = "segments.json"
+END = sys.maxsize
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase words without stopwords, with a light plural folding ("risks" -> "risk")."""
+    tokens = []
+    for word in TOKEN_PATTERN.findall(text.lower()):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+def _varint(value: int, out: bytearray):
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _encode_postings(docs: list[int], tfs: list[int]) -> bytes:
+    """Encode a posting list as a block skip table followed by varint (doc gap, tf) blocks."""
+    data, table = bytearray(), bytearray()
+    previous = 0
+    for start in range(0, len(docs), BLOCK_SIZE):
+        for doc, tf in zip(docs[start:start + BLOCK_SIZE], tfs[start:start + BLOCK_SIZE]):
+            _varint(doc - previous, data)
+            _varint(tf, data)
+            previous = doc
+        table += BLOCK_ENTRY.pack(previous, len(data))
+    return struct.pack("<I", len(table) // BLOCK_ENTRY.size) + table + data
+
+
+def _decode_block(data: memoryview, start: int, end: int, doc: int) -> tuple[list[int], list[int]]:
+    docs, tfs = [], []
+    value = shift = 0
+    is_doc = True
+    for byte in data[start:end]:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        if is_doc:
+            doc += value
+            docs.append(doc)
+        else:
+            tfs.append(value)
+        is_doc = not is_doc
+        value = shift = 0
+    return docs, tfs
+
+
+def _decode_postings(data: memoryview) -> tuple[list[int], list[int]]:
+    cursor = _Cursor(data)
+    docs, tfs = [], []
+    for block in range(len(cursor.lasts)):
+        cursor._load(block)
+        docs += cursor.docs
+        tfs += cursor.tfs
+    return docs, tfs
+
+
+class _Cursor:
+    """Iterates one posting list, decoding only the blocks it lands on."""
+    __slots__ = ("data", "lasts", "ends", "block", "docs", "tfs", "i", "doc", "idf", "bound")
+
+    def __init__(self, postings: memoryview, idf: float = 0.0, bound: float = 0.0):
+        (blocks,) = struct.unpack_from("<I", postings)
+        table = 4 + blocks * BLOCK_ENTRY.size
+        entries = list(BLOCK_ENTRY.iter_unpack(postings[4:table]))
+        self.data = postings[table:]
+        self.lasts = [last for last, _ in entries]
+        self.ends = [end for _, end in entries]
+        self.idf = idf
+        self.bound = bound
+        self.block = -1
+        self.doc = END
+        if blocks:
+            self._load(0)
+
+    def _load(self, block: int):
+        start = self.ends[block - 1] if block else 0
+        previous = self.lasts[block - 1] if block else 0
+        self.block = block
+        self.docs, self.tfs = _decode_block(self.data, start, self.ends[block], previous)
+        self.i = 0
+        self.doc = self.docs[0]
+
+    @property
+    def tf(self) -> int:
+        return self.tfs[self.i]
+
+    def next(self):
+        self.i += 1
+        if self.i < len(self.docs):
+            self.doc = self.docs[self.i]
+        elif self.block + 1 < len(self.lasts):
+            self._load(self.block + 1)
+        else:
+            self.doc = END
+
+    def advance(self, target: int):
+        """Move to the first doc >= target, skipping whole blocks without decoding them."""
+        if self.doc >= target:
+            return
+        if target > self.lasts[self.block]:
+            block = bisect.bisect_left(self.lasts, target, self.block + 1)
+            if block == len(self.lasts):
+                self.doc = END
+                return
+            self._load(block)
+        self.i = bisect.bisect_left(self.docs, target, self.i)
+        self.doc = self.docs[self.i]
+
+
+def _write_segment(path: Path, lengths: array, records: Iterable[bytes],
+                   postings: Iterable[tuple[str, list[int], list[int]]]) -> None:
+    """Write an immutable segment file.
+
+    Args:
+        path (Path): Segment file; written to a temporary name first and renamed into place
+        lengths (array): Token count of every document, by local doc id
+        records (Iterable[bytes]): Stored JSON record of every document, in doc id order
+        postings (Iterable[tuple[str, list[int], list[int]]]): (term, doc ids, term frequencies),
+            in term order
+    """
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(bytes(SEGMENT_HEADER.size))
+        lengths_offset = f.tell()
+        f.write(lengths.tobytes())
+        store_offset = f.tell()
+        offsets, position = array("Q", [0]), 0
+        for record in records:
+            f.write(record)
+            position += len(record)
+            offsets.append(position)
+        f.write(bytes(-f.tell() % 8))
+        store_index_offset = f.tell()
+        f.write(offsets.tobytes())
+        postings_offset = f.tell()
+        terms = []
+        for term, docs, tfs in postings:
+            data = _encode_postings(docs, tfs)
+            terms.append((term, len(docs), max(tfs), min(lengths[d] for d in docs), f.tell() - postings_offset,
+                          len(data)))
+            f.write(data)
+        terms_offset = f.tell()
+        for term, *entry in terms:
+            encoded = term.encode("utf-8")
+            f.write(struct.pack("<H", len(encoded)) + encoded + TERM_ENTRY.pack(*entry))
+        f.seek(0)
+        f.write(SEGMENT_HEADER.pack(b"BM25", SEGMENT_VERSION, 0, len(lengths), len(terms), sum(lengths),
+                                    lengths_offset, store_index_offset, store_offset, postings_offset, terms_offset))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class Segment:
+    """A read-only segment file, memory-mapped; postings are decoded straight from the map."""
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        (magic, version, _, self.doc_count, term_count, self.total_tokens, lengths, store_index, store,
+         postings, terms) = SEGMENT_HEADER.unpack_from(view)
+        if magic != b"BM25" or version != SEGMENT_VERSION:
+            raise ValueError(f"{self.path} is not a version {SEGMENT_VERSION} search segment")
+        self.lengths = view[lengths:lengths + 4 * self.doc_count].cast("I")
+        self._store_index = view[store_index:store_index + 8 * (self.doc_count + 1)].cast("Q")
+        self._store = view[store:store_index]
+        self._postings = view[postings:terms]
+        self._views = [view, self.lengths, self._store_index, self._store, self._postings]
+        self.terms = {}     # term -> (df, max tf, min doc length, offset, size)
+        offset = terms
+        for _ in range(term_count):
+            (size,) = struct.unpack_from("<H", view, offset)
+            term = str(view[offset + 2:offset + 2 + size], "utf-8")
+            offset += 2 + size
+            self.terms[term] = TERM_ENTRY.unpack_from(view, offset)
+            offset += TERM_ENTRY.size
+
+    def postings(self, term: str) -> memoryview:
+        _, _, _, offset, size = self.terms[term]
+        return self._postings[offset:offset + size]
+
+    def record(self, doc: int) -> memoryview:
+        return self._store[self._store_index[doc]:self._store_index[doc + 1]]
+
+    def document(self, doc: int) -> dict:
+        return json.loads(str(self.record(doc), "utf-8"))
+
+    def close(self):
+        for view in reversed(self._views):
+            view.release()
+        self._map.close()
+        self._file.close()
+
+
+class Hit:
+    """One search result."""
+    __slots__ = ("score", "id", "text", "meta")
+
+    def __init__(self, score: float, id: str, text: str, meta: dict):
+        self.score = score
+        self.id = id
+        self.text = text
+        self.meta = meta
+
+    def as_dict(self) -> dict:
+        return {"id": self.id, "score": round(self.score, 4), "text": self.text, "meta": self.meta}
+
+    def __repr__(self):
+        return f"Hit({self.id!r}, {self.score:.3f})"
+
+
+class SearchIndex:
+    """Incremental BM25 full-text index stored as immutable on-disk segments.
+
+    Added documents are buffered in memory and written out as a new segment
+    by `flush`; a manifest lists the live segments and is replaced atomically,
+    so a reader never sees a half-written index. Once more than `merge_factor`
+    segments exist, the smallest ones are merged into one, keeping lookups
+    to a handful of files.
+
+    Each segment stores a term dictionary, per-document lengths, the stored
+    documents and the postings, which are read through a memory map: a query
+    only touches the pages of the posting lists it needs. Posting lists are
+    varint-coded in blocks of BLOCK_SIZE documents behind a skip table, and
+    top-k queries use MaxScore: once the k-th best score is known, terms that
+    cannot lift a document above it on their own are only probed for
+    documents found through the other terms, skipping whole blocks.
+    """
+    def __init__(self, path=SEARCH_INDEX_DIR, merge_factor: int = SEARCH_MERGE_FACTOR,
+                 buffer_size: int = SEARCH_BUFFER_DOCS, k1: float = 1.2, b: float = 0.75):
+        """Open or create an index.
+
+        Args:
+            path (str | Path, optional): Index directory. Defaults to SEARCH_INDEX_DIR.
+            merge_factor (int, optional): Segments allowed before the smallest are merged.
+                Defaults to SEARCH_MERGE_FACTOR.
+            buffer_size (int, optional): Documents buffered before they are flushed to a segment.
+                Defaults to SEARCH_BUFFER_DOCS.
+            k1 (float, optional): BM25 term frequency saturation. Defaults to 1.2.
+            b (float, optional): BM25 document length normalization. Defaults to 0.75.
+        """
+        self.path = Path(path)
+        self.merge_factor = merge_factor
+        self.buffer_size = buffer_size
+        self.k1 = k1
+        self.b = b
+        self.last_scored = 0        # Documents fully scored by the last query
+        self._buffer = []           # (record, length, term counts)
+        self._lock = threading.RLock()
+        self._segments = []
+        self._next = 1
+        self._manifest_mtime = None
+        self.refresh()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return sum(s.doc_count for s in self._segments) + len(self._buffer)
+
+    @property
+    def segments(self) -> list[Segment]:
+        return list(self._segments)
+
+    def refresh(self) -> bool:
+        """Reopen the index if another process changed its manifest.
+
+        Returns:
+            bool: True if the segments were reloaded
+        """
+        manifest = self.path / MANIFEST
+        try:
+            mtime = manifest.stat().st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._manifest_mtime:
+            return False
+        with self._lock:
+            data = json.loads(manifest.read_text(encoding="utf-8"))
+            current = {s.path.name: s for s in self._segments}
+            self._segments = [current.pop(name, None) or Segment(self.path / name) for name in data["segments"]]
+            for segment in current.values():
+                segment.close()
+            self._next = data["next"]
+            self._manifest_mtime = mtime
+        return True
+
+    def add(self, text: str, doc_id: str = None, meta: dict = None) -> None:
+        """Add a document; it becomes searchable at the next flush or search.
+
+        Args:
+            text (str): Document text
+            doc_id (str, optional): Identifier returned with hits. Defaults to the document's position.
+            meta (dict, optional): JSON-serializable data returned with hits
+        """
+        tokens = tokenize(text)
+        record = {"id": doc_id if doc_id is not None else str(len(self)), "text": text}
+        if meta:
+            record["meta"] = meta
+        with self._lock:
+            self._buffer.append((json.dumps(record, ensure_ascii=False).encode("utf-8"), len(tokens),
+                                 Counter(tokens)))
+            if len(self._buffer) >= self.buffer_size:
+                self.flush()
+
+    def add_many(self, documents: Iterable[tuple[str, str, dict]]) -> int:
+        """Add (doc_id, text, meta) triples and flush. Returns the number added."""
+        count = 0
+        for doc_id, text, meta in documents:
+            self.add(text, doc_id, meta)
+            count += 1
+        self.flush()
+        return count
+
+    def flush(self) -> None:
+        """Write buffered documents to a new segment, merging segments if there are too many."""
+        with self._lock:
+            if not self._buffer:
+                return
+            buffer, self._buffer = self._buffer, []
+            postings = {}
+            for doc, (_, _, counts) in enumerate(buffer):
+                for term, tf in counts.items():
+                    entry = postings.get(term)
+                    if entry is None:
+                        entry = postings[term] = ([], [])
+                    entry[0].append(doc)
+                    entry[1].append(tf)
+            self.path.mkdir(parents=True, exist_ok=True)
+            path = self._new_segment_path()
+            _write_segment(path, array("I", (length for _, length, _ in buffer)),
+                           (record for record, _, _ in buffer),
+                           ((term, *postings[term]) for term in sorted(postings)))
+            self._segments.append(Segment(path))
+            self._commit()
+            logger.debug(f"[SEARCH] Flushed {len(buffer)} documents to {path.name}")
+            if len(self._segments) > self.merge_factor:
+                self.merge()
+
+    def merge(self, force: bool = False) -> None:
+        """Merge segments: the `merge_factor` smallest ones, or all of them with `force`.
+
+        The merged segment keeps document order, so posting lists are joined
+        by offsetting doc ids instead of re-tokenizing any text.
+        """
+        with self._lock:
+            if force:
+                self.flush()
+            if len(self._segments) < 2:
+                return
+            by_size = sorted(range(len(self._segments)), key=lambda i: self._segments[i].doc_count)
+            chosen = sorted(by_size if force else by_size[:self.merge_factor])
+            sources = [self._segments[i] for i in chosen]
+            bases, total = [], 0
+            for segment in sources:
+                bases.append(total)
+                total += segment.doc_count
+
+            def merged_postings() -> Iterator[tuple[str, list[int], list[int]]]:
+                previous = None
+                for term in heapq.merge(*(sorted(s.terms) for s in sources)):
+                    if term == previous:
+                        continue
+                    previous = term
+                    docs, tfs = [], []
+                    for segment, base in zip(sources, bases):
+                        if term in segment.terms:
+                            segment_docs, segment_tfs = _decode_postings(segment.postings(term))
+                            docs += (base + doc for doc in segment_docs)
+                            tfs += segment_tfs
+                    yield term, docs, tfs
+
+            lengths = array("I")
+            for segment in sources:
+                lengths.extend(segment.lengths)
+            path = self._new_segment_path()
+            _write_segment(path, lengths, (bytes(s.record(doc)) for s in sources for doc in range(s.doc_count)),
+                           merged_postings())
+            # The merged segment takes the place of the first source, keeping global document order
+            kept = [s for i, s in enumerate(self._segments) if i not in chosen[1:]]
+            kept[kept.index(sources[0])] = Segment(path)
+            self._segments = kept
+            self._commit()
+            for segment in sources:
+                segment.close()
+                segment.path.unlink()
+            logger.info(f"[SEARCH] Merged {len(sources)} segments into {path.name} ({total} documents)")
+
+    def search(self, query: str, k: int = 10, early_termination: bool = True) -> list[Hit]:
+        """Return the k documents with the highest BM25 score for a query.
+
+        Args:
+            query (str): Query text
+            k (int, optional): Number of hits. Defaults to 10.
+            early_termination (bool, optional): Use MaxScore to skip documents that cannot
+                make the top k. Turning it off scores every matching document, with the same result.
+
+        Returns:
+            list[Hit]: Best first
+        """
+        with self._lock:
+            self.flush()
+            segments = list(self._segments)
+            documents = sum(s.doc_count for s in segments)
+            terms = list(dict.fromkeys(tokenize(query)))
+            if not documents or not terms or k <= 0:
+                return []
+            average_length = sum(s.total_tokens for s in segments) / documents
+            idf = {}
+            for term in terms:
+                df = sum(s.terms[term][0] for s in segments if term in s.terms)
+                if df:
+                    idf[term] = math.log(1 + (documents - df + 0.5) / (df + 0.5))
+
+            top = []        # min-heap of (score, -global doc, segment index, local doc)
+            scored, base = 0, 0
+            k1, b = self.k1, self.b
+            for number, segment in enumerate(segments):
+                lengths = segment.lengths
+                cursors = []
+                for term, weight in idf.items():
+                    if term in segment.terms:
+                        _, max_tf, min_length, _, _ = segment.terms[term]
+                        bound = weight * max_tf * (k1 + 1) / (max_tf + k1 * (1 - b + b * min_length / average_length))
+                        cursors.append(_Cursor(segment.postings(term), weight, bound))
+                cursors.sort(key=lambda c: c.bound)
+                # upper[i]: the most terms 0..i can add together
+                upper = list(itertools.accumulate(c.bound for c in cursors))
+                threshold = top[0][0] if len(top) == k else -1.0
+                essential = 0
+                if early_termination:
+                    while essential < len(cursors) and upper[essential] <= threshold:
+                        essential += 1
+                while essential < len(cursors):
+                    doc = min(c.doc for c in cursors[essential:])
+                    if doc == END:
+                        break
+                    norm = k1 * (1 - b + b * lengths[doc] / average_length)
+                    score = 0.0
+                    for cursor in cursors[essential:]:
+                        if cursor.doc == doc:
+                            tf = cursor.tf
+                            score += cursor.idf * tf * (k1 + 1) / (tf + norm)
+                            cursor.next()
+                    for i in range(essential - 1, -1, -1):
+                        if score + upper[i] <= threshold:
+                            break       # even every remaining term could not lift it into the top k
+                        cursor = cursors[i]
+                        cursor.advance(doc)
+                        if cursor.doc == doc:
+                            tf = cursor.tf
+                            score += cursor.idf * tf * (k1 + 1) / (tf + norm)
+                    scored += 1
+                    if len(top) < k:
+                        heapq.heappush(top, (score, -(base + doc), number, doc))
+                    elif score > top[0][0]:
+                        heapq.heapreplace(top, (score, -(base + doc), number, doc))
+                    else:
+                        continue
+                    if len(top) == k and early_termination:
+                        threshold = top[0][0]
+                        while essential < len(cursors) and upper[essential] <= threshold:
+                            essential += 1
+                base += segment.doc_count
+            self.last_scored = scored
+            hits = []
+            for score, _, number, doc in sorted(top, reverse=True):
+                record = segments[number].document(doc)
+                hits.append(Hit(score, record["id"], record["text"], record.get("meta", {})))
+            return hits
+
+    def close(self) -> None:
+        """Flush buffered documents and unmap every segment."""
+        with self._lock:
+            self.flush()
+            for segment in self._segments:
+                segment.close()
+            self._segments = []
+
+    def _new_segment_path(self) -> Path:
+        path = self.path / f"seg_{self._next:06d}.bm25"
+        self._next += 1
+        return path
+
+    def _commit(self):
+        manifest = self.path / MANIFEST
+        tmp = manifest.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"version": SEGMENT_VERSION, "next": self._next,
+                                   "segments": [s.path.name for s in self._segments]}), encoding="utf-8")
+        os.replace(tmp, manifest)
+        self._manifest_mtime = manifest.stat().st_mtime_ns
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_search_index() -> SearchIndex | None:
+    """Return the index at SEARCH_INDEX_DIR, opened once per process, or None if none was built.
+
+    Segments added or merged by another process (e.g. `agentctl index`) are picked up on the next call.
+    """
+    global _shared
+    if _shared is None:
+        if not (SEARCH_INDEX_DIR / MANIFEST).exists():
+            return None
+        with _shared_lock:
+            if _shared is None:
+                _shared = SearchIndex(SEARCH_INDEX_DIR)
+    else:
+        _shared.refresh()
+    return _shared